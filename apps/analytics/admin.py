@@ -0,0 +1,25 @@
+from django.contrib import admin
+
+from .models import QuestionStats, QuestionStatsBucket
+
+
+class QuestionStatsBucketInline(admin.TabularInline):
+    model = QuestionStatsBucket
+    extra = 0
+    readonly_fields = ("key", "count")
+
+
+@admin.register(QuestionStats)
+class QuestionStatsAdmin(admin.ModelAdmin):
+    list_display = ("question", "survey", "response_count", "updated_at")
+    list_filter = ("survey",)
+    readonly_fields = (
+        "survey",
+        "question",
+        "response_count",
+        "value_sum",
+        "value_min",
+        "value_max",
+        "updated_at",
+    )
+    inlines = [QuestionStatsBucketInline]
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.services import rebuild_survey_stats
+from apps.surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the pre-aggregated question stats from completed submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--survey",
+            type=int,
+            action="append",
+            dest="surveys",
+            help="Only rebuild the given survey ID (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        survey_ids = options["surveys"] or Survey.objects.values_list("id", flat=True)
+
+        for survey_id in survey_ids:
+            rebuild_survey_stats(survey_id)
+            self.stdout.write(f"Rebuilt stats for survey {survey_id}")
+
+        self.stdout.write(self.style.SUCCESS("Question stats rebuilt successfully!"))
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('surveys', '0002_survey_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response_count', models.PositiveIntegerField(default=0, verbose_name='Response count')),
+                ('value_sum', models.FloatField(default=0, verbose_name='Sum')),
+                ('value_min', models.FloatField(blank=True, null=True, verbose_name='Minimum')),
+                ('value_max', models.FloatField(blank=True, null=True, verbose_name='Maximum')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='surveys.question')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats', to='surveys.survey')),
+            ],
+            options={
+                'verbose_name': 'Question Stats',
+                'verbose_name_plural': 'Question Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStatsBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Key')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+                ('stats', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='analytics.questionstats')),
+            ],
+            options={
+                'verbose_name': 'Question Stats Bucket',
+                'verbose_name_plural': 'Question Stats Buckets',
+                'unique_together': {('stats', 'key')},
+            },
+        ),
+    ]
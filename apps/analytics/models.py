@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from apps.surveys.models import Question, Survey
+
+
+class QuestionStats(models.Model):
+    """
+    Pre-aggregated answer statistics of a question over completed submissions.
+
+    Maintained incrementally when a submission is completed, so reading the
+    stats of a survey costs O(questions) instead of O(submissions).
+    """
+
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, related_name="question_stats"
+    )
+    question = models.OneToOneField(
+        Question, on_delete=models.CASCADE, related_name="stats"
+    )
+    response_count = models.PositiveIntegerField(_("Response count"), default=0)
+    # Numeric questions only
+    value_sum = models.FloatField(_("Sum"), default=0)
+    value_min = models.FloatField(_("Minimum"), null=True, blank=True)
+    value_max = models.FloatField(_("Maximum"), null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Question Stats")
+        verbose_name_plural = _("Question Stats")
+
+    def __str__(self):
+        return f"Stats for question {self.question_id}"
+
+
+class QuestionStatsBucket(models.Model):
+    """
+    A counter of one answer bucket: a choice value for choice questions,
+    a value range for numbers, or a month for dates.
+    """
+
+    stats = models.ForeignKey(
+        QuestionStats, on_delete=models.CASCADE, related_name="buckets"
+    )
+    key = models.CharField(_("Key"), max_length=255)
+    count = models.PositiveIntegerField(_("Count"), default=0)
+
+    class Meta:
+        verbose_name = _("Question Stats Bucket")
+        verbose_name_plural = _("Question Stats Buckets")
+        unique_together = ("stats", "key")
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
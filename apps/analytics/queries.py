@@ -0,0 +1,185 @@
+"""
+Analytics queries executed in PostgreSQL over the `Answer.value` JSONB column.
+
+Only the aggregated result table is sent back to Python. Checkbox answers
+(JSON arrays) are expanded with `jsonb_array_elements_text`, so every choice
+counts as its own value.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max, Q
+
+from apps.submissions.models import Answer, Submission
+
+ANSWER_TABLE = Answer._meta.db_table
+SUBMISSION_TABLE = Submission._meta.db_table
+
+# Completed submissions of the survey, narrowed down by the filters
+SUBMISSIONS_CTE = f"""
+    subs AS (
+        SELECT s.id
+        FROM {SUBMISSION_TABLE} s
+        WHERE s.survey_id = %s AND s.status = %s {{filters}}
+    )
+"""
+
+# Answer filters, evaluated against the typed shadow columns of `Answer`
+FILTER_SQL = f"""
+    AND EXISTS (
+        SELECT 1 FROM {ANSWER_TABLE} f
+        WHERE f.submission_id = s.id
+        AND f.question_id = %s
+        AND {{condition}}
+    )
+"""
+
+# By operator; equality is matched on the column the question type fills (see
+# `AnalyticsQuerySerializer`), so the indexes on the typed columns apply
+FILTER_CONDITIONS = {
+    "eq_choice": "f.choice_values @> ARRAY[%s]::varchar[]",
+    "eq_date": "f.date_value = %s",
+    "eq_number": "f.num_value = %s",
+    "eq_text": "f.text_value = %s",
+    "gt": "f.num_value > %s",
+    "gte": "f.num_value >= %s",
+    "lt": "f.num_value < %s",
+    "lte": "f.num_value <= %s",
+}
+
+# One row per (submission, value) of a question, arrays expanded
+VALUES_CTE = f"""
+    {{name}} AS (
+        SELECT a.submission_id, v.value
+        FROM {ANSWER_TABLE} a
+        JOIN subs ON subs.id = a.submission_id
+        CROSS JOIN LATERAL jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(a.value) = 'array'
+            THEN a.value ELSE jsonb_build_array(a.value) END
+        ) AS v(value)
+        WHERE a.question_id = %s
+    )
+"""
+
+NUMBERS_CTE = f"""
+    n AS (
+        SELECT a.submission_id, a.num_value AS value
+        FROM {ANSWER_TABLE} a
+        JOIN subs ON subs.id = a.submission_id
+        WHERE a.question_id = %s AND a.num_value IS NOT NULL
+    )
+"""
+
+
+def _submissions_cte(survey_id, filters):
+    params = [survey_id, Submission.Status.COMPLETED]
+    conditions = []
+    for question_id, operator, value in filters:
+        condition = FILTER_CONDITIONS[operator]
+        conditions.append(FILTER_SQL.format(condition=condition))
+        params += [question_id, value]
+    return SUBMISSIONS_CTE.format(filters="".join(conditions)), params
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def crosstab(survey_id, row_question, column_question=None, filters=()):
+    """
+    Count completed submissions per answer value of `row_question`, broken
+    down by the answer value of `column_question` when given.
+
+    Returns a list of `[row_value, column_value, count]` (or
+    `[row_value, count]`) rows.
+    """
+    subs_sql, params = _submissions_cte(survey_id, filters)
+    ctes = [subs_sql, VALUES_CTE.format(name="r")]
+    params.append(row_question)
+
+    if column_question is None:
+        select = """
+            SELECT r.value, COUNT(DISTINCT r.submission_id)
+            FROM r
+            GROUP BY r.value
+            ORDER BY r.value
+        """
+    else:
+        ctes.append(VALUES_CTE.format(name="c"))
+        params.append(column_question)
+        select = """
+            SELECT r.value, c.value, COUNT(DISTINCT r.submission_id)
+            FROM r
+            JOIN c ON c.submission_id = r.submission_id
+            GROUP BY r.value, c.value
+            ORDER BY r.value, c.value
+        """
+
+    sql = "WITH " + ",".join(ctes) + select
+    return [list(row) for row in _fetch(sql, params)]
+
+
+def numeric_summary(survey_id, question, group_by=None, filters=()):
+    """
+    Aggregate the numeric answers of `question` (count, sum, mean, min, max
+    and median), optionally grouped by the answer value of `group_by`.
+    """
+    subs_sql, params = _submissions_cte(survey_id, filters)
+    ctes = [subs_sql, NUMBERS_CTE]
+    params.append(question)
+
+    aggregates = """
+        COUNT(*), SUM(n.value), AVG(n.value), MIN(n.value), MAX(n.value),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY n.value)
+    """
+    if group_by is None:
+        select = f"SELECT NULL, {aggregates} FROM n"
+    else:
+        ctes.append(VALUES_CTE.format(name="g"))
+        params.append(group_by)
+        select = f"""
+            SELECT g.value, {aggregates}
+            FROM n
+            JOIN g ON g.submission_id = n.submission_id
+            GROUP BY g.value
+            ORDER BY g.value
+        """
+
+    sql = "WITH " + ",".join(ctes) + select
+    return [
+        [group, count] + [None if v is None else float(v) for v in values]
+        for group, count, *values in _fetch(sql, params)
+    ]
+
+
+def cached_result(survey, name, params, compute):
+    """
+    Cache an analytics result under the survey version and the submission
+    watermark, so new completions, answer writes (which touch the submission),
+    archiving or survey edits invalidate it.
+    """
+    watermark = Submission.objects.filter(
+        survey=survey, status=Submission.Status.COMPLETED
+    ).aggregate(
+        last=Max("completed_at"),
+        changed=Max("updated_at"),
+        total=Count("id"),
+        archived=Count("id", filter=Q(archive__isnull=False)),
+    )
+    version = [survey.updated_at, *(watermark[key] for key in sorted(watermark))]
+    digest = hashlib.md5(
+        json.dumps([version, params], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    cache_key = f"analytics_{name}_{survey.id}_{digest}"
+
+    result = cache.get(cache_key)
+    if result is None:
+        result = compute()
+        cache.set(cache_key, result, settings.ANALYTICS_CACHE_TTL)
+    return result
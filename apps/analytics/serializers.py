@@ -0,0 +1,135 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+
+from apps.submissions.models import typed_values
+from apps.surveys.models import Question
+
+from .models import QuestionStats
+
+
+class QuestionStatsSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source="question.question_type")
+    identifier = serializers.CharField(source="question.identifier")
+    mean = serializers.SerializerMethodField()
+    buckets = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuestionStats
+        fields = [
+            "question",
+            "identifier",
+            "type",
+            "response_count",
+            "value_sum",
+            "value_min",
+            "value_max",
+            "mean",
+            "buckets",
+            "updated_at",
+        ]
+
+    def get_mean(self, obj: QuestionStats) -> float | None:
+        if obj.value_min is None or not obj.response_count:
+            return None
+        return obj.value_sum / obj.response_count
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_buckets(self, obj: QuestionStats):
+        # Served from the prefetch cache, no query per question
+        return {bucket.key: bucket.count for bucket in obj.buckets.all()}
+
+
+class AnswerFilterField(serializers.CharField):
+    """
+    Parses a `<question_id>:<value>` (equality) or
+    `<question_id>:<gt|gte|lt|lte>:<number>` filter into
+    `[question_id, operator, value]`.
+    """
+
+    operators = ("eq", "gt", "gte", "lt", "lte")
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        question_id, separator, answer = value.partition(":")
+        if not separator or not question_id.isdigit():
+            raise serializers.ValidationError(
+                'Filters must look like "<question_id>:<value>".'
+            )
+
+        operator, separator, operand = answer.partition(":")
+        if not separator or operator not in self.operators:
+            return [int(question_id), "eq", answer]
+        if operator == "eq":
+            return [int(question_id), operator, operand]
+
+        try:
+            return [int(question_id), operator, float(operand)]
+        except ValueError:
+            raise serializers.ValidationError(
+                f'"{operator}" filters need a numeric value.'
+            ) from None
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    filter = serializers.ListField(
+        child=AnswerFilterField(), required=False, default=list
+    )
+
+    question_fields = ()
+
+    # Equality filter operator by the typed `Answer` column it compares
+    equality_operators = {
+        "choice_values": "eq_choice",
+        "date_value": "eq_date",
+        "num_value": "eq_number",
+        "text_value": "eq_text",
+    }
+
+    def validate(self, attrs):
+        question_ids = {attrs[f] for f in self.question_fields if attrs.get(f)}
+        question_ids.update(question_id for question_id, _, _ in attrs["filter"])
+
+        question_types = dict(
+            Question.objects.filter(
+                section__survey=self.context["survey"], id__in=question_ids
+            ).values_list("id", "question_type")
+        )
+        if len(question_types) != len(question_ids):
+            raise serializers.ValidationError(
+                "All questions must belong to the survey."
+            )
+
+        attrs["filter"] = [
+            self.typed_filter(question_types[question_id], question_id, *rest)
+            for question_id, *rest in attrs["filter"]
+        ]
+        return attrs
+
+    def typed_filter(self, question_type, question_id, operator, value):
+        """Match an equality filter on the typed column of the question type."""
+        if operator != "eq":
+            return [question_id, operator, value]
+
+        for column, typed_value in typed_values(question_type, value).items():
+            if typed_value is not None:
+                if column == "choice_values":
+                    typed_value = typed_value[0]
+                return [question_id, self.equality_operators[column], typed_value]
+        raise serializers.ValidationError(
+            f'"{value}" is not a valid answer to question {question_id}.'
+        )
+
+
+class CrossTabQuerySerializer(AnalyticsQuerySerializer):
+    rows = serializers.IntegerField()
+    columns = serializers.IntegerField(required=False)
+
+    question_fields = ("rows", "columns")
+
+
+class NumericSummaryQuerySerializer(AnalyticsQuerySerializer):
+    question = serializers.IntegerField()
+    group_by = serializers.IntegerField(required=False)
+
+    question_fields = ("question", "group_by")
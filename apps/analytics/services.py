@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import date
+from functools import reduce
+from itertools import chain
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from apps.core.query_budget import allow_repeats
+from apps.submissions.archive import archived_answer_rows
+from apps.submissions.models import Answer, Submission
+from apps.surveys.models import Question
+
+from .models import QuestionStats, QuestionStatsBucket
+
+CHOICE_TYPES = (
+    Question.QuestionType.RADIO,
+    Question.QuestionType.DROPDOWN,
+    Question.QuestionType.CHECKBOX,
+)
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bucket_keys(question_type, value) -> list:
+    """Return the stats buckets an answer value falls into."""
+    if question_type in CHOICE_TYPES:
+        values = value if isinstance(value, list) else [value]
+        # A checkbox answer counts once per distinct choice
+        return list(dict.fromkeys(str(v) for v in values if v not in (None, "")))
+
+    if question_type == Question.QuestionType.NUMBER:
+        number = to_number(value)
+        if number is None:
+            return []
+        width = settings.ANALYTICS_NUMBER_BUCKET_WIDTH
+        return [f"{(number // width) * width:g}"]
+
+    if question_type == Question.QuestionType.DATE:
+        try:
+            return [date.fromisoformat(str(value)).strftime("%Y-%m")]
+        except ValueError:
+            return []
+
+    return []
+
+
+def record_submission_stats(submission_id):
+    """
+    Add a completed submission to the stats of its survey's questions.
+
+    Counters are bumped with atomic `F()` updates, so concurrent completions
+    do not lose increments. Each submission is counted at most once.
+    """
+    with transaction.atomic():
+        claimed = Submission.objects.filter(
+            id=submission_id,
+            status=Submission.Status.COMPLETED,
+            stats_recorded=False,
+        ).update(stats_recorded=True)
+        if not claimed:
+            return
+
+        answers = list(
+            Answer.objects.filter(submission_id=submission_id).values_list(
+                "question_id",
+                "question__question_type",
+                "question__section__survey_id",
+                "value",
+            )
+        )
+        if not answers:
+            return
+
+        QuestionStats.objects.bulk_create(
+            [
+                QuestionStats(survey_id=survey_id, question_id=question_id)
+                for question_id, _, survey_id, _ in answers
+            ],
+            ignore_conflicts=True,
+        )
+        stats_ids = dict(
+            QuestionStats.objects.filter(
+                question_id__in=[a[0] for a in answers]
+            ).values_list("question_id", "id")
+        )
+
+        QuestionStats.objects.filter(id__in=stats_ids.values()).update(
+            response_count=F("response_count") + 1
+        )
+
+        buckets = {}
+        for question_id, question_type, _, value in answers:
+            stats_id = stats_ids[question_id]
+            keys = bucket_keys(question_type, value)
+            if keys:
+                buckets[stats_id] = keys
+
+            number = to_number(value)
+            if question_type == Question.QuestionType.NUMBER and number is not None:
+                number = Value(number)
+                QuestionStats.objects.filter(id=stats_id).update(
+                    value_sum=F("value_sum") + number,
+                    value_min=Least(Coalesce(F("value_min"), number), number),
+                    value_max=Greatest(Coalesce(F("value_max"), number), number),
+                )
+
+        if buckets:
+            QuestionStatsBucket.objects.bulk_create(
+                [
+                    QuestionStatsBucket(stats_id=stats_id, key=key)
+                    for stats_id, keys in buckets.items()
+                    for key in keys
+                ],
+                ignore_conflicts=True,
+            )
+            condition = reduce(
+                or_,
+                (
+                    Q(stats_id=stats_id, key__in=keys)
+                    for stats_id, keys in buckets.items()
+                ),
+            )
+            QuestionStatsBucket.objects.filter(condition).update(count=F("count") + 1)
+
+
+@transaction.atomic
+def rebuild_survey_stats(survey_id):
+    """
+    Recompute the stats of a survey from all of its completed submissions,
+    including the answers moved to archives.
+    """
+    completed = Submission.objects.filter(
+        survey_id=survey_id, status=Submission.Status.COMPLETED
+    )
+    # Claim every completed submission first so pending incremental updates
+    # for them become no-ops instead of being counted twice.
+    completed.update(stats_recorded=True)
+    QuestionStats.objects.filter(survey_id=survey_id).delete()
+
+    stats = {}
+    counters = defaultdict(int)
+    answers = Answer.objects.filter(submission__in=completed).values_list(
+        "question_id", "question__question_type", "value"
+    )
+    for question_id, question_type, value in chain(
+        answers.iterator(chunk_size=5000), archived_answer_rows(completed)
+    ):
+        item = stats.get(question_id)
+        if item is None:
+            item = stats[question_id] = QuestionStats(
+                survey_id=survey_id, question_id=question_id
+            )
+        item.response_count += 1
+
+        number = to_number(value)
+        if question_type == Question.QuestionType.NUMBER and number is not None:
+            item.value_sum += number
+            if item.value_min is None or number < item.value_min:
+                item.value_min = number
+            if item.value_max is None or number > item.value_max:
+                item.value_max = number
+
+        for key in bucket_keys(question_type, value):
+            counters[question_id, key] += 1
+
+    QuestionStats.objects.bulk_create(stats.values())
+    with allow_repeats():
+        QuestionStatsBucket.objects.bulk_create(
+            [
+                QuestionStatsBucket(stats=stats[question_id], key=key, count=count)
+                for (question_id, key), count in counters.items()
+            ],
+            batch_size=1000,
+        )
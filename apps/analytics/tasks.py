@@ -0,0 +1,16 @@
+import logging
+
+from config.celery import app
+
+from .services import record_submission_stats
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(bind=True, max_retries=3)
+def update_question_stats(self, submission_id):
+    try:
+        record_submission_stats(submission_id)
+    except Exception as e:
+        logger.error(f"Error updating stats for submission {submission_id}: {e}")
+        raise self.retry(exc=e) from e
@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.submissions.models import Answer, Submission
+from apps.surveys.models import Question, Section, Survey
+from apps.users.models import User
+
+
+class AnalyticsQueryViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        manager = User.objects.create_user(
+            username="manager", role=User.Role.SURVEY_MANAGER
+        )
+        self.survey = Survey.objects.create(title="Survey", created_by=manager)
+        section = Section.objects.create(survey=self.survey, title="Section")
+        self.color = Question.objects.create(
+            section=section, text="Color", question_type=Question.QuestionType.RADIO
+        )
+        self.age = Question.objects.create(
+            section=section, text="Age", question_type=Question.QuestionType.NUMBER
+        )
+        for color, age in (("red", 20), ("red", 40), ("blue", 40)):
+            submission = Submission.objects.create(
+                survey=self.survey,
+                status=Submission.Status.COMPLETED,
+                completed_at=timezone.now(),
+            )
+            Answer.objects.create(
+                submission=submission, question=self.color, value=color
+            )
+            Answer.objects.create(submission=submission, question=self.age, value=age)
+        self.client.force_authenticate(manager)
+        self.url = reverse("analytics:crosstab", args=[self.survey.id])
+
+    def test_filters_restrict_the_counted_submissions(self):
+        response = self.client.get(
+            self.url, {"rows": self.color.id, "filter": [f"{self.age.id}:gte:30"]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data["rows"]), [["blue", 1], ["red", 1]])
+
+    def test_equality_filters_match_the_typed_answer(self):
+        response = self.client.get(
+            self.url,
+            {
+                "rows": self.age.id,
+                "filter": [f"{self.age.id}:40", f"{self.color.id}:red"],
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rows"], [["40", 1]])
+
+    def test_equality_filters_on_numbers_use_the_index(self):
+        query = {"rows": self.color.id, "filter": [f"{self.age.id}:40"]}
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, query)
+        sql = next(q["sql"] for q in queries if q["sql"].startswith("WITH"))
+
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        self.assertNotIn("#>>", sql)
+        self.assertIn("answer_num_value_idx", plan)
+
+    def test_equality_filters_need_a_valid_answer(self):
+        response = self.client.get(
+            self.url, {"rows": self.color.id, "filter": [f"{self.age.id}:many"]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_on_other_surveys_questions_are_rejected(self):
+        response = self.client.get(
+            self.url, {"rows": self.color.id, "filter": ["999999:red"]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_results_are_cached_until_a_submission_changes(self):
+        answer = Answer.objects.filter(question=self.color, value="blue").get()
+        query = {"rows": self.color.id}
+        self.client.get(self.url, query)
+
+        Answer.objects.filter(id=answer.id).update(value="red")
+        cached = self.client.get(self.url, query)
+        # As an answer write does (see `SubmissionSerializer.update`)
+        Submission.objects.filter(id=answer.submission_id).update(
+            updated_at=timezone.now()
+        )
+        fresh = self.client.get(self.url, query)
+
+        self.assertEqual(sorted(cached.data["rows"]), [["blue", 1], ["red", 2]])
+        self.assertEqual(fresh.data["rows"], [["red", 3]])
+
+    def test_numeric_summary_groups_by_another_question(self):
+        url = reverse("analytics:numeric-summary", args=[self.survey.id])
+        response = self.client.get(
+            url, {"question": self.age.id, "group_by": self.color.id}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["rows"],
+            [["blue", 1, 40, 40, 40, 40, 40], ["red", 2, 60, 30, 20, 40, 30]],
+        )
@@ -0,0 +1,17 @@
+from django.urls import path
+
+from .views import CrossTabView, NumericSummaryView, SurveyStatsView
+
+app_name = "analytics"
+
+urlpatterns = [
+    path(
+        "surveys/<int:survey_id>/stats/", SurveyStatsView.as_view(), name="survey-stats"
+    ),
+    path("surveys/<int:survey_id>/crosstab/", CrossTabView.as_view(), name="crosstab"),
+    path(
+        "surveys/<int:survey_id>/numeric-summary/",
+        NumericSummaryView.as_view(),
+        name="numeric-summary",
+    ),
+]
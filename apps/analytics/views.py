@@ -0,0 +1,173 @@
+import csv
+from itertools import chain
+
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.throttling import ActionBasedThrottle
+from apps.submissions.models import Submission
+from apps.surveys.models import Survey
+from apps.users.permissions import IsAnalyst, IsSurveyManager
+
+from .models import QuestionStats
+from .queries import cached_result, crosstab, numeric_summary
+from .serializers import (
+    CrossTabQuerySerializer,
+    NumericSummaryQuerySerializer,
+    QuestionStatsSerializer,
+)
+
+FILTER_PARAMETER = OpenApiParameter(
+    name="filter",
+    type=OpenApiTypes.STR,
+    many=True,
+    description=(
+        "Only count submissions with this answer, as `<question_id>:<value>`, "
+        "or with a numeric answer in range, as `<question_id>:<gt|gte|lt|lte>:"
+        "<number>`. Can be repeated."
+    ),
+)
+OUTPUT_PARAMETER = OpenApiParameter(
+    name="output",
+    type=OpenApiTypes.STR,
+    enum=["json", "csv"],
+    description="Use `csv` to stream the result table as a CSV file.",
+)
+
+
+class Echo:
+    """Pseudo-buffer that returns what `csv.writer` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+@extend_schema(
+    summary="Survey Question Stats",
+    description=(
+        "Pre-aggregated answer statistics of each question over the completed "
+        "submissions of a survey: choice counts, numeric aggregates and "
+        "histogram buckets."
+    ),
+    responses={200: QuestionStatsSerializer(many=True)},
+)
+class SurveyStatsView(APIView):
+    permission_classes = [IsSurveyManager | IsAnalyst]
+
+    def get(self, request, survey_id):
+        stats = (
+            QuestionStats.objects.filter(survey_id=survey_id)
+            .select_related("question")
+            .prefetch_related("buckets")
+            .order_by("question__section__order", "question__order")
+        )
+        return Response(QuestionStatsSerializer(stats, many=True).data)
+
+
+class AnalyticsQueryView(APIView):
+    """
+    Base view for analytics computed in the database. Results are cached per
+    survey version and submission watermark.
+
+    Answers moved to archive files are not counted; the number of completed
+    submissions left out is returned as `archived_submissions` (the
+    `X-Archived-Submissions` header for CSV output).
+    """
+
+    permission_classes = [IsSurveyManager | IsAnalyst]
+    throttle_classes = [ActionBasedThrottle]
+    throttle_map = {
+        "get": "slow_get",
+    }
+    name = None
+    columns = ()
+    query_serializer_class = None
+    # Query function, called with the survey id, the `query_arguments` taken
+    # from the validated parameters and the filters
+    query = None
+    query_arguments = ()
+
+    def run_query(self, survey_id, params):
+        arguments = [params.get(name) for name in self.query_arguments]
+        return self.query(survey_id, *arguments, filters=params["filter"])
+
+    def get_columns(self, params):
+        return list(self.columns)
+
+    def get(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id)
+        serializer = self.query_serializer_class(
+            data=request.query_params, context={"survey": survey}
+        )
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        rows = cached_result(
+            survey, self.name, params, lambda: self.run_query(survey.id, params)
+        )
+        columns = self.get_columns(params)
+        archived = Submission.objects.filter(
+            survey=survey,
+            status=Submission.Status.COMPLETED,
+            archive__isnull=False,
+        ).count()
+
+        if request.query_params.get("output") == "csv":
+            writer = csv.writer(Echo())
+            return StreamingHttpResponse(
+                (writer.writerow(row) for row in chain([columns], rows)),
+                content_type="text/csv",
+                headers={
+                    "Content-Disposition": (
+                        f'attachment; filename="{self.name}_{survey.id}.csv"'
+                    ),
+                    "X-Archived-Submissions": str(archived),
+                },
+            )
+
+        return Response(
+            {"columns": columns, "rows": rows, "archived_submissions": archived}
+        )
+
+
+@extend_schema(
+    summary="Cross-tabulation",
+    description=(
+        "Count completed submissions per answer of the `rows` question, broken "
+        "down by the answer of the `columns` question when given. Checkbox "
+        "answers count once per selected choice."
+    ),
+    parameters=[CrossTabQuerySerializer, FILTER_PARAMETER, OUTPUT_PARAMETER],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class CrossTabView(AnalyticsQueryView):
+    name = "crosstab"
+    query_serializer_class = CrossTabQuerySerializer
+    query = staticmethod(crosstab)
+    query_arguments = ("rows", "columns")
+
+    def get_columns(self, params):
+        if params.get("columns"):
+            return ["row", "column", "count"]
+        return ["row", "count"]
+
+
+@extend_schema(
+    summary="Numeric Summary",
+    description=(
+        "Aggregate the numeric answers of a question over completed submissions, "
+        "optionally grouped by the answer of another question."
+    ),
+    parameters=[NumericSummaryQuerySerializer, FILTER_PARAMETER, OUTPUT_PARAMETER],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class NumericSummaryView(AnalyticsQueryView):
+    name = "numeric_summary"
+    columns = ("group", "count", "sum", "mean", "min", "max", "median")
+    query_serializer_class = NumericSummaryQuerySerializer
+    query = staticmethod(numeric_summary)
+    query_arguments = ("question", "group_by")
@@ -0,0 +1,108 @@
+import asyncio
+import email.policy
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+class AsyncSMTPSender:
+    """
+    Sends emails over up to `concurrency` SMTP sessions driven by asyncio, so
+    one worker process overlaps the network round trips of many messages.
+
+    Sessions use the SMTP settings of Django's SMTP backend (`EMAIL_HOST`,
+    `EMAIL_PORT`, credentials and TLS), which keyword arguments can override.
+    Requires `aiosmtplib`.
+    """
+
+    def __init__(self, concurrency=None, limiter=None, **kwargs):
+        import aiosmtplib
+
+        self.smtp = aiosmtplib
+        # Errors after which the SMTP session can no longer be used
+        self.connection_errors = (
+            aiosmtplib.SMTPServerDisconnected,
+            aiosmtplib.SMTPTimeoutError,
+            ConnectionError,
+        )
+        self.backend = get_connection(SMTP_BACKEND, **kwargs)
+        self.concurrency = concurrency or settings.INVITATION_SEND_CONCURRENCY
+        self.limiter = limiter
+
+    def send_messages(self, messages, on_result=None) -> list:
+        """
+        Send `messages` and return the error (or None) of each message, in
+        order; `on_result(index, error)` is called as each one completes.
+        Errors while connecting are raised, as with `send_messages`.
+        """
+        if not messages:
+            return []
+        return asyncio.run(self._send_all(list(messages), on_result))
+
+    async def _send_all(self, messages, on_result=None):
+        results = [None] * len(messages)
+        queue = asyncio.Queue()
+        for item in enumerate(messages):
+            queue.put_nowait(item)
+
+        sessions = min(self.concurrency, len(messages))
+        try:
+            async with asyncio.TaskGroup() as group:
+                for _ in range(sessions):
+                    group.create_task(self._worker(queue, results, on_result))
+        except ExceptionGroup as e:
+            # Raise the connection error itself, like the synchronous path
+            raise e.exceptions[0] from None
+        return results
+
+    def _client(self):
+        backend = self.backend
+        return self.smtp.SMTP(
+            hostname=backend.host,
+            port=backend.port,
+            username=backend.username or None,
+            password=backend.password or None,
+            use_tls=bool(backend.use_ssl),
+            start_tls=bool(backend.use_tls),
+            timeout=backend.timeout,
+            client_cert=backend.ssl_certfile,
+            client_key=backend.ssl_keyfile,
+        )
+
+    async def _worker(self, queue, results, on_result=None):
+        session = None
+        try:
+            while not queue.empty():
+                index, message = queue.get_nowait()
+                if self.limiter is not None:
+                    await self.limiter.aacquire()
+                if session is None:
+                    session = self._client()
+                    await session.connect()
+
+                try:
+                    await self._send(session, message)
+                except Exception as e:
+                    results[index] = e
+                    if isinstance(e, self.connection_errors):
+                        session.close()
+                        session = None
+                if on_result is not None:
+                    on_result(index, results[index])
+        finally:
+            if session is not None and session.is_connected:
+                with suppress(Exception):
+                    await session.quit()
+
+    async def _send(self, session, message):
+        recipients = [self.backend.prep_address(a) for a in message.recipients()]
+        if not recipients:
+            return
+        await session.sendmail(
+            self.backend.prep_address(message.from_email),
+            recipients,
+            message.message(policy=email.policy.SMTP).as_bytes(),
+        )
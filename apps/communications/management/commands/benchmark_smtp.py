@@ -0,0 +1,114 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.communications.async_sender import AsyncSMTPSender
+from apps.communications.services import build_invitation_message, send_messages
+from apps.communications.smtp_sink import SinkHandler, free_port
+
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures invitation sending throughput of one process against an SMTP "
+        "server, comparing one connection per email, a reused connection and "
+        "concurrent asyncio sessions. Starts a local aiosmtpd sink unless --host "
+        "is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=500)
+        parser.add_argument("--host", help="SMTP host (defaults to a local sink).")
+        parser.add_argument("--port", type=int, default=1025)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="SMTP sessions of the asyncio sender.",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0,
+            help="Milliseconds the local sink waits before accepting a message.",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        controller = None
+        host, port = options["host"], options["port"]
+
+        if not host:
+            try:
+                from aiosmtpd.controller import Controller
+            except ImportError:
+                raise CommandError(
+                    "aiosmtpd is required for the local SMTP sink "
+                    "(see requirements/local.txt)."
+                ) from None
+
+            host, port = "127.0.0.1", free_port()
+            handler = SinkHandler(options["latency"] / 1000)
+            controller = Controller(handler, hostname=host, port=port)
+            controller.start()
+
+        try:
+            messages = self.build_messages(count)
+            results = {
+                "per_message": self.run_per_message(messages, host, port),
+                "reused": self.run_reused(messages, host, port),
+                "async": self.run_async(messages, host, port, options["concurrency"]),
+            }
+        finally:
+            if controller:
+                controller.stop()
+
+        for mode, elapsed in results.items():
+            self.stdout.write(
+                f"{mode:<12} {count} emails in {elapsed:.2f}s "
+                f"({count / elapsed:.0f} emails/s)"
+            )
+        for mode in ("reused", "async"):
+            speedup = results["per_message"] / results[mode]
+            self.stdout.write(self.style.SUCCESS(f"{mode}: {speedup:.1f}x"))
+
+    def build_messages(self, count):
+        # Stand-ins for the models, so no database is needed
+        batch = SimpleNamespace(
+            survey=SimpleNamespace(
+                id=1, title="Benchmark Survey", description="Throughput benchmark"
+            )
+        )
+        return [
+            build_invitation_message(
+                batch,
+                SimpleNamespace(email=f"user{i}@example.com", token=uuid.uuid4()),
+            )
+            for i in range(count)
+        ]
+
+    def run_per_message(self, messages, host, port):
+        start = time.perf_counter()
+        for message in messages:
+            get_connection(SMTP_BACKEND, host=host, port=port).send_messages([message])
+        return time.perf_counter() - start
+
+    def run_reused(self, messages, host, port):
+        start = time.perf_counter()
+        with get_connection(SMTP_BACKEND, host=host, port=port) as connection:
+            errors = send_messages(connection, messages)
+        if any(errors):
+            raise CommandError(f"{sum(map(bool, errors))} emails failed to send.")
+        return time.perf_counter() - start
+
+    def run_async(self, messages, host, port, concurrency):
+        sender = AsyncSMTPSender(concurrency=concurrency, host=host, port=port)
+        start = time.perf_counter()
+        errors = sender.send_messages(messages)
+        if any(errors):
+            raise CommandError(f"{sum(map(bool, errors))} emails failed to send.")
+        return time.perf_counter() - start
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:15
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    InvitationBatch = apps.get_model('communications', 'InvitationBatch')
+    batches = InvitationBatch.objects.annotate(
+        total=Count('invitations'),
+        sent=Count(
+            'invitations', filter=Q(invitations__status__in=['sent', 'clicked'])
+        ),
+        failed=Count('invitations', filter=Q(invitations__status='failed')),
+    )
+    for batch in batches.iterator():
+        batch.total_count = batch.total
+        batch.sent_count = batch.sent
+        batch.failed_count = batch.failed
+        batch.save(update_fields=['total_count', 'sent_count', 'failed_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitationbatch',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='invitationbatch',
+            name='sent_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='invitationbatch',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
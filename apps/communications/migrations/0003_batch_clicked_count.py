@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_clicked_count(apps, schema_editor):
+    InvitationBatch = apps.get_model('communications', 'InvitationBatch')
+    Invitation = apps.get_model('communications', 'Invitation')
+    clicked = (
+        Invitation.objects.filter(batch=OuterRef('pk'), status='clicked')
+        .values('batch')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    InvitationBatch.objects.filter(invitations__status='clicked').update(
+        clicked_count=Subquery(clicked)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0002_batch_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitationbatch',
+            name='clicked_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_clicked_count, migrations.RunPython.noop),
+    ]
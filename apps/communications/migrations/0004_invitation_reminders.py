@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0003_batch_clicked_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitation',
+            name='last_reminded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='reminder_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0004_invitation_reminders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invitation',
+            name='reminder_count',
+            field=models.PositiveSmallIntegerField(db_default=0, default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0005_invitation_reminder_count_db_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitationbatch',
+            name='upload',
+            field=models.FileField(blank=True, editable=False, upload_to='uploads/invitations/'),
+        ),
+        migrations.AlterField(
+            model_name='invitationbatch',
+            name='status',
+            field=models.CharField(choices=[('importing', 'Importing'), ('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -1,7 +1,10 @@
 import uuid
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models import F
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
 from apps.surveys.models import Survey
@@ -9,6 +12,7 @@ from apps.surveys.models import Survey
 
 class InvitationBatch(models.Model):
     class Status(models.TextChoices):
+        IMPORTING = "importing", _("Importing")
         PENDING = "pending", _("Pending")
         PROCESSING = "processing", _("Processing")
         COMPLETED = "completed", _("Completed")
@@ -27,6 +31,15 @@ class InvitationBatch(models.Model):
         max_length=20, choices=Status.choices, default=Status.PENDING
     )
     metadata = models.JSONField(default=dict, blank=True)
+    # Uploaded recipient file, until `ingest_invitation_upload` has read it
+    upload = models.FileField(
+        upload_to="uploads/invitations/", blank=True, editable=False
+    )
+    # Progress counters, maintained by the send tasks
+    total_count = models.PositiveIntegerField(default=0, editable=False)
+    sent_count = models.PositiveIntegerField(default=0, editable=False)
+    failed_count = models.PositiveIntegerField(default=0, editable=False)
+    clicked_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -38,6 +51,56 @@ class InvitationBatch(models.Model):
     def __str__(self):
         return f"Batch for {self.survey.title} ({self.created_at})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.status_cache_key(self.id))
+
+    @staticmethod
+    def status_cache_key(batch_id):
+        return f"invitation_batch_status_{batch_id}"
+
+    @classmethod
+    def record_progress(cls, batch_id, sent=0, failed=0, clicked=0):
+        """Atomically add sent/failed/clicked invitations to the batch counters."""
+        cls.objects.filter(id=batch_id).update(
+            sent_count=F("sent_count") + sent,
+            failed_count=F("failed_count") + failed,
+            clicked_count=F("clicked_count") + clicked,
+            updated_at=now(),
+        )
+        cache.delete(cls.status_cache_key(batch_id))
+
+    @classmethod
+    def get_cached_status(cls, batch_id):
+        """Return the progress of a batch (None if it doesn't exist)."""
+        cache_key = cls.status_cache_key(batch_id)
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            return cached_data
+
+        batch = cls.objects.filter(id=batch_id).first()
+        if batch is None:
+            return None
+        data = batch.get_status()
+        cache.set(cache_key, data, settings.INVITATION_BATCH_STATUS_CACHE_TTL)
+        return data
+
+    def get_status(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total_count,
+            "sent": self.sent_count,
+            "failed": self.failed_count,
+            "clicked": self.clicked_count,
+            "pending": max(self.total_count - self.sent_count - self.failed_count, 0),
+            "duplicates": self.metadata.get("duplicates", 0),
+            "invalid": self.metadata.get("invalid", 0),
+            "error": self.metadata.get("error"),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
 
 class Invitation(models.Model):
     class Status(models.TextChoices):
@@ -63,6 +126,10 @@ class Invitation(models.Model):
     )
     sent_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True)
+    reminder_count = models.PositiveSmallIntegerField(
+        default=0, db_default=0, editable=False
+    )
+    last_reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = _("Invitation")
@@ -10,9 +10,8 @@ class InvitationBatchSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_by", "status", "created_at", "updated_at"]
 
 
-class BulkInvitationSerializer(serializers.Serializer):
+class InvitationTargetSerializer(serializers.Serializer):
     survey_id = serializers.IntegerField()
-    emails = serializers.ListField(child=serializers.EmailField())
 
     def validate_survey_id(self, value):
         from apps.surveys.models import Survey
@@ -20,3 +19,27 @@ class BulkInvitationSerializer(serializers.Serializer):
         if not Survey.objects.filter(id=value).exists():
             raise serializers.ValidationError("Survey does not exist.")
         return value
+
+
+class BulkInvitationSerializer(InvitationTargetSerializer):
+    emails = serializers.ListField(child=serializers.EmailField())
+
+
+class InvitationUploadSerializer(InvitationTargetSerializer):
+    """Recipient list uploaded as a CSV or NDJSON file."""
+
+    FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=["csv", "ndjson"], required=False)
+
+    def validate(self, attrs):
+        if "format" not in attrs:
+            name = attrs["file"].name.lower()
+            extension = name[name.rfind(".") :] if "." in name else ""
+            if extension not in self.FORMATS:
+                raise serializers.ValidationError(
+                    {"format": "Unknown file type, use .csv or .ndjson."}
+                )
+            attrs["format"] = self.FORMATS[extension]
+        return attrs
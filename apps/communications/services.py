@@ -0,0 +1,359 @@
+import codecs
+import csv
+import json
+import logging
+import smtplib
+from collections import Counter
+from contextlib import suppress
+from datetime import timedelta
+from itertools import batched
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMultiAlternatives
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.template.loader import render_to_string
+from django.utils.timezone import now
+
+from apps.core.query_budget import allow_repeats
+from apps.core.redis_client import get_redis
+from apps.submissions.models import Submission
+
+from .models import Invitation, InvitationBatch
+
+logger = logging.getLogger(__name__)
+
+# Redis set of invitation ids clicked since the last flush
+CLICK_BUFFER_KEY = "invitation_clicks"
+
+EMAIL_MAX_LENGTH = Invitation._meta.get_field("email").max_length
+
+# Errors after which the SMTP session can no longer be used
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+# Stands in for the invitation token while the email bodies are rendered;
+# alphanumeric so template autoescaping leaves it untouched.
+TOKEN_PLACEHOLDER = "INVITATIONTOKENPLACEHOLDER"
+
+
+def invitation_context(survey, token, reminder=False):
+    return {
+        "is_reminder": reminder,
+        "survey_title": survey.title,
+        "survey_description": survey.description,
+        "action_url": f"{settings.SITE_URL}/surveys/render/{survey.id}/?token={token}",
+        "current_year": now().year,
+    }
+
+
+def render_invitation(context):
+    text_content = render_to_string(
+        "communications/emails/invitation_email.txt", context
+    )
+    html_content = render_to_string(
+        "communications/emails/invitation_email.html", context
+    )
+    return text_content, html_content
+
+
+def build_invitation_message(batch, invitation, bodies=None, reminder=False):
+    """
+    Build the invitation (or reminder) email of `invitation`. The bodies are
+    rendered for the recipient unless pre-rendered `(text, html)` bodies are
+    given.
+    """
+    survey = batch.survey
+    if bodies is None:
+        context = invitation_context(survey, invitation.token, reminder)
+        context["email"] = invitation.email
+        bodies = render_invitation(context)
+    text_content, html_content = bodies
+
+    subject = f"Invitation to participate in {survey.title}"
+    if reminder:
+        subject = f"Reminder: {subject}"
+
+    msg = EmailMultiAlternatives(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[invitation.email],
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+class InvitationRenderer:
+    """
+    Builds the invitation emails of a batch.
+
+    The templates only differ per recipient by the token in the action URL,
+    so they are rendered once with `TOKEN_PLACEHOLDER` and each recipient's
+    token is substituted into the result. Set `per_recipient` (or
+    `INVITATION_RENDER_PER_RECIPIENT`) to render the templates for every
+    recipient instead, e.g. for templates customised per email address.
+    """
+
+    def __init__(self, batch, per_recipient=None, reminder=False):
+        self.batch = batch
+        self.reminder = reminder
+        if per_recipient is None:
+            per_recipient = settings.INVITATION_RENDER_PER_RECIPIENT
+        self.per_recipient = per_recipient
+        self._bodies = None
+
+    def bodies(self, token):
+        if self.per_recipient:
+            return None
+        if self._bodies is None:
+            context = invitation_context(
+                self.batch.survey, TOKEN_PLACEHOLDER, self.reminder
+            )
+            self._bodies = render_invitation(context)
+            if not all(TOKEN_PLACEHOLDER in body for body in self._bodies):
+                # The templates don't carry the token verbatim, so the
+                # shared bodies can't be personalised by substitution
+                self.per_recipient = True
+                return None
+        token = str(token)
+        return tuple(body.replace(TOKEN_PLACEHOLDER, token) for body in self._bodies)
+
+    def build(self, invitation):
+        return build_invitation_message(
+            self.batch, invitation, self.bodies(invitation.token), self.reminder
+        )
+
+
+def send_messages(connection, messages, limiter=None, on_result=None) -> list:
+    """
+    Send `messages` over one reused email connection and return the error
+    (or None) of each message, in order. A `limiter` token is acquired
+    before each message, and `on_result(index, error)` is called once each
+    message is sent or failed.
+
+    The connection is (re)opened lazily, so a session dropped by the server
+    only fails the message in flight; the next one reconnects. Errors while
+    opening the connection are raised, as nothing can be sent.
+    """
+    errors = []
+    for index, message in enumerate(messages):
+        if limiter is not None:
+            limiter.acquire()
+        connection.open()
+        try:
+            connection.send_messages([message])
+        except Exception as e:
+            errors.append(e)
+            if isinstance(e, CONNECTION_ERRORS):
+                with suppress(Exception):
+                    connection.close()
+        else:
+            errors.append(None)
+        if on_result is not None:
+            on_result(index, errors[-1])
+    return errors
+
+
+def read_upload_emails(upload, file_format):
+    """
+    Yield the addresses of a CSV or NDJSON upload one line at a time, without
+    loading the file in memory. Unreadable entries are yielded as None.
+
+    CSV files use the "email" column when there is a header row, otherwise the
+    first column. NDJSON lines are either strings or objects with an "email".
+    """
+    upload.seek(0)
+    lines = codecs.iterdecode(upload, "utf-8-sig")
+
+    if file_format == "ndjson":
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield item.get("email") if isinstance(item, dict) else item
+        return
+
+    column = 0
+    for index, row in enumerate(csv.reader(lines)):
+        if not row:
+            continue
+        if index == 0:
+            header = [cell.strip().lower() for cell in row]
+            if "email" in header:
+                column = header.index("email")
+                continue
+        yield row[column] if column < len(row) else None
+
+
+def ingest_invitations(batch, emails, batch_size=None, on_progress=None) -> dict:
+    """
+    Create the invitations of `batch` from an iterable of addresses.
+
+    Addresses are validated, normalized and deduplicated as they are read,
+    and inserted `batch_size` rows per transaction (with the model's
+    defaults; addresses already in the batch are skipped), so memory stays
+    bounded by the set of distinct addresses. `on_progress(counts)` is called
+    in the transaction of each chunk. Returns the accepted, duplicate and
+    invalid counts.
+    """
+    batch_size = batch_size or settings.INVITATION_INGEST_BATCH_SIZE
+    counts = {"accepted": 0, "duplicates": 0, "invalid": 0}
+    seen = set()
+
+    def accepted():
+        for value in emails:
+            email = value.strip().lower() if isinstance(value, str) else ""
+            try:
+                if len(email) > EMAIL_MAX_LENGTH:
+                    raise ValidationError("Email address too long.")
+                validate_email(email)
+            except ValidationError:
+                counts["invalid"] += 1
+                continue
+            if email in seen:
+                counts["duplicates"] += 1
+                continue
+            seen.add(email)
+            counts["accepted"] += 1
+            yield email
+
+    with allow_repeats():
+        for chunk in batched(accepted(), batch_size):
+            with transaction.atomic():
+                Invitation.objects.bulk_create(
+                    (Invitation(batch=batch, email=email) for email in chunk),
+                    batch_size=batch_size,
+                    ignore_conflicts=True,
+                )
+                if on_progress is not None:
+                    on_progress(counts)
+    return counts
+
+
+def get_invitation_metadata(token):
+    """
+    Return the invitation id and survey of a token (None for unknown tokens),
+    cached so repeated clicks don't hit the database.
+    """
+    cache_key = f"invitation_token_{token}"
+    data = cache.get(cache_key)
+    if data is None:
+        invitation = (
+            Invitation.objects.select_related("batch__survey")
+            .filter(token=token)
+            .first()
+        )
+        if invitation is None:
+            return None
+        survey = invitation.batch.survey
+        data = {
+            "invitation_id": invitation.id,
+            "survey_id": survey.id,
+            "survey_title": survey.title,
+        }
+        cache.set(cache_key, data, settings.INVITATION_TOKEN_CACHE_TTL)
+    return data
+
+
+def record_click(invitation_id):
+    """
+    Buffer a click in Redis; `flush_clicks` writes the buffered clicks in bulk.
+    Falls back to a direct write when Redis is unavailable.
+    """
+    try:
+        get_redis().sadd(CLICK_BUFFER_KEY, invitation_id)
+    except redis.RedisError as e:
+        logger.warning(f"Click buffer unavailable, writing click directly: {e}")
+        apply_clicks([invitation_id])
+
+
+@transaction.atomic
+def apply_clicks(invitation_ids) -> int:
+    """Mark invitations as clicked and bump their batches' click counters."""
+    clicked = list(
+        Invitation.objects.select_for_update()
+        .filter(id__in=invitation_ids)
+        .exclude(status=Invitation.Status.CLICKED)
+        .values_list("id", "batch_id")
+    )
+    Invitation.objects.filter(id__in=[pk for pk, _ in clicked]).update(
+        status=Invitation.Status.CLICKED
+    )
+    for batch_id, count in Counter(batch_id for _, batch_id in clicked).items():
+        InvitationBatch.record_progress(batch_id, clicked=count)
+    return len(clicked)
+
+
+def flush_clicks(batch_size=1000) -> int:
+    """Write the buffered clicks to the database, `batch_size` at a time."""
+    client = get_redis()
+    total = 0
+    with allow_repeats():
+        while ids := client.spop(CLICK_BUFFER_KEY, batch_size):
+            try:
+                total += apply_clicks([int(pk) for pk in ids])
+            except Exception:
+                # Put the clicks back so the next flush retries them
+                client.sadd(CLICK_BUFFER_KEY, *ids)
+                raise
+    return total
+
+
+def reminder_candidates():
+    """
+    Invitations that were delivered but never led to a completed submission,
+    are under `INVITATION_MAX_REMINDERS` and were last emailed at least
+    `INVITATION_REMINDER_COOLDOWN` hours ago. The completed submission check
+    is a `NOT EXISTS` anti-join, so this is a single query.
+    """
+    cutoff = now() - timedelta(hours=settings.INVITATION_REMINDER_COOLDOWN)
+    completed = Submission.objects.filter(
+        invitation=OuterRef("pk"), status=Submission.Status.COMPLETED
+    )
+    return (
+        Invitation.objects.filter(
+            status__in=[Invitation.Status.SENT, Invitation.Status.CLICKED],
+            reminder_count__lt=settings.INVITATION_MAX_REMINDERS,
+            batch__survey__is_active=True,
+        )
+        .filter(
+            Q(last_reminded_at__lte=cutoff)
+            | Q(last_reminded_at__isnull=True, sent_at__lte=cutoff)
+        )
+        .exclude(Exists(completed))
+    )
+
+
+def claim_reminders(invitation_ids) -> list:
+    """
+    Lock the still eligible invitations among `invitation_ids` and count the
+    reminder before it is sent, so overlapping runs never send it twice.
+
+    The returned invitations keep their values from before the claim, so
+    `release_reminders` can restore them if the reminder isn't sent.
+    """
+    with transaction.atomic():
+        invitations = list(
+            reminder_candidates()
+            .filter(id__in=invitation_ids)
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("id")
+        )
+        Invitation.objects.filter(id__in=[i.id for i in invitations]).update(
+            reminder_count=F("reminder_count") + 1, last_reminded_at=now()
+        )
+    return invitations
+
+
+def release_reminders(invitations):
+    """Undo the claim of reminders that could not be sent."""
+    Invitation.objects.bulk_update(invitations, ["reminder_count", "last_reminded_at"])
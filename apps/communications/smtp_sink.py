@@ -0,0 +1,23 @@
+import asyncio
+import socket
+
+
+class SinkHandler:
+    """
+    aiosmtpd handler that accepts and discards every message, after `latency`
+    seconds to simulate the response time of a real provider.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return "250 Message accepted for delivery"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
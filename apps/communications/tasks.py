@@ -1,69 +1,201 @@
+import csv
 import logging
+from itertools import batched, groupby
+from operator import itemgetter
 
+from celery import chord
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.db import transaction
 from django.utils.timezone import now
 
+from apps.core.metrics import EMAILS
+from apps.core.ratelimit import TokenBucket
 from config.celery import app
 
+from .async_sender import AsyncSMTPSender
 from .models import Invitation, InvitationBatch
+from .services import (
+    InvitationRenderer,
+    claim_reminders,
+    flush_clicks,
+    ingest_invitations,
+    read_upload_emails,
+    release_reminders,
+    reminder_candidates,
+    send_messages,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Fields written back in bulk once a chunk has been sent (or interrupted)
+SEND_RESULT_FIELDS = ["status", "sent_at", "error_message"]
+
+
+def send_chunk_size() -> int:
+    """
+    Invitations per chunk: at most `INVITATION_SEND_CHUNK_SIZE`, and few
+    enough that a chunk sharing `INVITATION_SEND_RATE` with
+    `INVITATION_SEND_WORKERS` others sends within half the soft time limit.
+    """
+    size = settings.INVITATION_SEND_CHUNK_SIZE
+    rate = settings.INVITATION_SEND_RATE
+    time_limit = settings.CELERY_TASK_SOFT_TIME_LIMIT
+    if rate > 0 and time_limit:
+        per_worker = rate / max(settings.INVITATION_SEND_WORKERS, 1)
+        size = min(size, int(per_worker * time_limit / 2))
+    return max(size, 1)
+
+
+def set_send_result(invitation, error=None):
+    if error:
+        logger.error(f"Failed to send invitation to {invitation.email}: {error}")
+        invitation.status = Invitation.Status.FAILED
+        invitation.error_message = str(error)
+    else:
+        invitation.status = Invitation.Status.SENT
+        invitation.sent_at = now()
+
+
+def deliver(batch, invitations, reminder=False, on_result=None):
+    """
+    Build and send the emails of `invitations` over one SMTP connection (or
+    concurrent sessions with the "async" `INVITATION_SENDER`), within the
+    shared `INVITATION_SEND_RATE`.
+
+    `on_result(invitation, error)` is called as soon as each email is sent
+    (error None) or failed, so the caller can keep the results of the emails
+    already sent when the chunk is interrupted.
+    """
+    renderer = InvitationRenderer(batch, reminder=reminder)
+    limiter = TokenBucket(
+        "invitations",
+        settings.INVITATION_SEND_RATE,
+        settings.INVITATION_SEND_BURST,
+    )
+    kind = "reminder" if reminder else "invitation"
+
+    def record(invitation, error):
+        EMAILS.labels(kind, "sent" if error is None else "failed").inc()
+        if on_result is not None:
+            on_result(invitation, error)
+
+    sendable, messages = [], []
+    for invitation in invitations:
+        try:
+            messages.append(renderer.build(invitation))
+            sendable.append(invitation)
+        except Exception as e:
+            record(invitation, e)
+
+    def record_sent(index, error):
+        record(sendable[index], error)
+
+    if settings.INVITATION_SENDER == "async":
+        sender = AsyncSMTPSender(limiter=limiter)
+        sender.send_messages(messages, on_result=record_sent)
+    else:
+        # One SMTP session for the whole chunk instead of one per email
+        with get_connection() as connection:
+            send_messages(connection, messages, limiter, on_result=record_sent)
+
+
+def save_send_results(batch_id, invitations):
+    """Write the send results of `invitations` and count them in the batch."""
+    if not invitations:
+        return
+    sent = sum(i.status == Invitation.Status.SENT for i in invitations)
+    # A single UPDATE for the chunk instead of one per invitation
+    with transaction.atomic():
+        Invitation.objects.bulk_update(invitations, SEND_RESULT_FIELDS)
+        InvitationBatch.record_progress(
+            batch_id, sent=sent, failed=len(invitations) - sent
+        )
+
+
+def record_import(batch, counts, **fields):
+    """Save the import counts of `batch` so far, and `fields`."""
+    batch.metadata.update(
+        total_emails=counts["accepted"],
+        duplicates=counts["duplicates"],
+        invalid=counts["invalid"],
+    )
+    InvitationBatch.objects.filter(id=batch.id).update(
+        total_count=counts["accepted"],
+        metadata=batch.metadata,
+        updated_at=now(),
+        **fields,
+    )
+    cache.delete(InvitationBatch.status_cache_key(batch.id))
+
+
 @app.task(bind=True, max_retries=3)
-def send_invitation_batch(self, batch_id):
+def ingest_invitation_upload(self, batch_id):
+    """
+    Create the invitations of a batch from its uploaded CSV/NDJSON file, a
+    chunk per transaction with the counts so far saved on the batch, then
+    send the batch. A retry reads the file again; the addresses inserted
+    before are skipped.
+    """
+    batch = None
     try:
-        from django.conf import settings
-        from django.core.mail import EmailMultiAlternatives
-        from django.template.loader import render_to_string
+        batch = InvitationBatch.objects.get(id=batch_id)
+        if batch.status != InvitationBatch.Status.IMPORTING:
+            batch.status = InvitationBatch.Status.IMPORTING
+            batch.save(update_fields=["status", "updated_at"])
+
+        with batch.upload.open("rb") as upload:
+            emails = read_upload_emails(upload, batch.metadata["format"])
+            counts = ingest_invitations(
+                batch, emails, on_progress=lambda c: record_import(batch, c)
+            )
 
+        record_import(batch, counts, status=InvitationBatch.Status.PENDING, upload="")
+        batch.upload.delete(save=False)
+        send_invitation_batch.delay(batch_id)
+
+    except InvitationBatch.DoesNotExist:
+        logger.error(f"InvitationBatch {batch_id} does not exist")
+    except (UnicodeDecodeError, csv.Error) as e:
+        batch.status = InvitationBatch.Status.FAILED
+        batch.metadata["error"] = f"Unreadable file: {e}"
+        batch.save(update_fields=["status", "metadata", "updated_at"])
+    except Exception as e:
+        logger.error(f"Error importing the recipients of batch {batch_id}: {e}")
+        if batch:
+            batch.status = InvitationBatch.Status.FAILED
+            batch.save(update_fields=["status", "updated_at"])
+        raise self.retry(exc=e) from e
+
+
+@app.task(bind=True, max_retries=3)
+def send_invitation_batch(self, batch_id):
+    """
+    Split the pending invitations of a batch into chunks sent in parallel by
+    `send_invitation_chunk`, then finalize the batch once all have run.
+    """
+    batch = None
+    try:
         batch = InvitationBatch.objects.get(id=batch_id)
         batch.status = InvitationBatch.Status.PROCESSING
         batch.save()
 
-        invitations = batch.invitations.filter(status=Invitation.Status.PENDING)
-
-        for invitation in invitations:
-            try:
-                subject = f"Invitation to participate in {batch.survey.title}"
-                action_url = (
-                    f"{settings.SITE_URL}/surveys/render/{batch.survey.id}/"
-                    f"?token={invitation.token}"
-                )
-
-                context = {
-                    "survey_title": batch.survey.title,
-                    "survey_description": batch.survey.description,
-                    "action_url": action_url,
-                    "current_year": now().year,
-                }
-
-                text_content = render_to_string(
-                    "communications/emails/invitation_email.txt", context
-                )
-                html_content = render_to_string(
-                    "communications/emails/invitation_email.html", context
-                )
-
-                msg = EmailMultiAlternatives(
-                    subject=subject,
-                    body=text_content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[invitation.email],
-                )
-                msg.attach_alternative(html_content, "text/html")
-                msg.send()
-
-                invitation.status = Invitation.Status.SENT
-                invitation.sent_at = now()
-            except Exception as e:
-                logger.error(f"Failed to send invitation to {invitation.email}: {e}")
-                invitation.status = Invitation.Status.FAILED
-                invitation.error_message = str(e)
-
-            invitation.save()
-
-        batch.status = InvitationBatch.Status.COMPLETED
-        batch.save()
+        invitation_ids = (
+            batch.invitations.filter(status=Invitation.Status.PENDING)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        chunks = [
+            send_invitation_chunk.s(batch_id, list(ids))
+            for ids in batched(invitation_ids, send_chunk_size())
+        ]
+
+        if chunks:
+            chord(chunks)(finalize_invitation_batch.si(batch_id))
+        else:
+            finalize_invitation_batch.delay(batch_id)
 
     except InvitationBatch.DoesNotExist:
         logger.error(f"InvitationBatch {batch_id} does not exist")
@@ -73,3 +205,142 @@ def send_invitation_batch(self, batch_id):
             batch.status = InvitationBatch.Status.FAILED
             batch.save()
         raise self.retry(exc=e) from e
+
+
+@app.task(bind=True, max_retries=3, default_retry_delay=30)
+def send_invitation_chunk(self, batch_id, invitation_ids):
+    """
+    Send one chunk of invitations over a single SMTP connection.
+
+    Only invitations still pending are sent, so a retried chunk resumes where
+    it stopped: the results of the emails already sent are saved even when
+    the chunk is interrupted (e.g. by the soft time limit). All workers share
+    the `INVITATION_SEND_RATE` token bucket.
+    """
+    try:
+        batch = InvitationBatch.objects.select_related("survey").get(id=batch_id)
+        invitations = list(
+            batch.invitations.filter(
+                id__in=invitation_ids, status=Invitation.Status.PENDING
+            ).order_by("id")
+        )
+
+        done = []
+
+        def record(invitation, error):
+            set_send_result(invitation, error)
+            done.append(invitation)
+
+        try:
+            deliver(batch, invitations, on_result=record)
+        finally:
+            save_send_results(batch_id, done)
+
+    except InvitationBatch.DoesNotExist:
+        logger.error(f"InvitationBatch {batch_id} does not exist")
+    except Exception as e:
+        logger.error(f"Error sending invitation chunk of batch {batch_id}: {e}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e) from e
+        # Give up on this chunk without failing the chord, so the other
+        # chunks still get finalized
+        with transaction.atomic():
+            failed = Invitation.objects.filter(
+                id__in=invitation_ids, status=Invitation.Status.PENDING
+            ).update(status=Invitation.Status.FAILED, error_message=str(e))
+            InvitationBatch.record_progress(batch_id, failed=failed)
+
+
+@app.task(bind=True, max_retries=3)
+def finalize_invitation_batch(self, batch_id):
+    try:
+        batch = InvitationBatch.objects.get(id=batch_id)
+        pending = batch.invitations.filter(status=Invitation.Status.PENDING)
+        if pending.exists():
+            batch.status = InvitationBatch.Status.FAILED
+        else:
+            batch.status = InvitationBatch.Status.COMPLETED
+        batch.save()
+    except InvitationBatch.DoesNotExist:
+        logger.error(f"InvitationBatch {batch_id} does not exist")
+    except Exception as e:
+        logger.error(f"Error finalizing batch {batch_id}: {e}")
+        raise self.retry(exc=e) from e
+
+
+@app.task(ignore_result=True)
+def flush_invitation_clicks():
+    try:
+        flushed = flush_clicks()
+        if flushed:
+            logger.info(f"Recorded {flushed} invitation clicks")
+    except Exception as e:
+        logger.error(f"Error flushing invitation clicks: {e}")
+
+
+def queue_reminders(batch_id=None) -> int:
+    """
+    Queue reminders for every invitation returned by `reminder_candidates`
+    (of one batch, or of all batches), in chunks sent by `send_reminder_chunk`.
+    Returns the number of invitations queued.
+    """
+    candidates = reminder_candidates()
+    if batch_id is not None:
+        candidates = candidates.filter(batch_id=batch_id)
+    rows = (
+        candidates.order_by("batch_id", "id")
+        .values_list("batch_id", "id")
+        .iterator(chunk_size=settings.INVITATION_SEND_CHUNK_SIZE * 10)
+    )
+
+    size = send_chunk_size()
+    queued = 0
+    for rows_batch_id, batch_rows in groupby(rows, key=itemgetter(0)):
+        ids = (invitation_id for _, invitation_id in batch_rows)
+        for chunk in batched(ids, size):
+            send_reminder_chunk.delay(rows_batch_id, list(chunk))
+            queued += len(chunk)
+    return queued
+
+
+@app.task(bind=True, max_retries=3)
+def send_invitation_reminders(self, batch_id=None):
+    try:
+        queued = queue_reminders(batch_id)
+        if queued:
+            logger.info(f"Queued {queued} invitation reminders")
+    except Exception as e:
+        logger.error(f"Error queuing invitation reminders: {e}")
+        raise self.retry(exc=e) from e
+
+
+@app.task(bind=True, max_retries=3, default_retry_delay=30)
+def send_reminder_chunk(self, batch_id, invitation_ids):
+    """
+    Send reminders for one chunk of invitations. Each reminder is claimed
+    before sending and released again if it fails or the chunk stops before
+    sending it, so it is sent at most once per cooldown.
+    """
+    try:
+        batch = InvitationBatch.objects.select_related("survey").get(id=batch_id)
+        invitations = claim_reminders(invitation_ids)
+        sent = set()
+
+        def record(invitation, error):
+            if error:
+                logger.error(f"Failed to send reminder to {invitation.email}: {error}")
+            else:
+                sent.add(invitation.id)
+
+        try:
+            deliver(batch, invitations, reminder=True, on_result=record)
+        finally:
+            unsent = [i for i in invitations if i.id not in sent]
+            if unsent:
+                release_reminders(unsent)
+
+    except InvitationBatch.DoesNotExist:
+        logger.error(f"InvitationBatch {batch_id} does not exist")
+    except Exception as e:
+        logger.error(f"Error sending reminder chunk of batch {batch_id}: {e}")
+        raise self.retry(exc=e) from e
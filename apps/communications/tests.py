@@ -0,0 +1,567 @@
+import os
+import shutil
+import smtplib
+import tempfile
+from unittest import mock
+
+import redis
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMessage
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.core.benchmarks.environment import (
+    celery_config,
+    fake_redis,
+    in_memory_celery,
+)
+from apps.surveys.models import Survey
+from apps.users.models import User
+
+from . import services, tasks
+from .async_sender import AsyncSMTPSender
+from .models import Invitation, InvitationBatch
+from .services import (
+    TOKEN_PLACEHOLDER,
+    InvitationRenderer,
+    flush_clicks,
+    ingest_invitations,
+    render_invitation,
+    send_messages,
+)
+from .smtp_sink import SinkHandler, free_port
+from .tasks import (
+    ingest_invitation_upload,
+    send_invitation_batch,
+    send_invitation_chunk,
+)
+
+
+class BulkInvitationUploadTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.enterContext(in_memory_celery())
+
+        self.manager = User.objects.create_user(
+            username="manager", password="password", role=User.Role.SURVEY_MANAGER
+        )
+        self.survey = Survey.objects.create(title="Survey", created_by=self.manager)
+        self.client.force_authenticate(self.manager)
+        self.url = reverse("communications:bulk-invite")
+
+    def upload(self, content, file_format, name):
+        """Upload a file, then run the import the response queued."""
+        upload = SimpleUploadedFile(name, content)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url,
+                {"survey_id": self.survey.id, "file": upload, "format": file_format},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        batch = InvitationBatch.objects.get(id=response.data["batch_id"])
+        self.assertEqual(batch.status, InvitationBatch.Status.IMPORTING)
+        self.assertTrue(batch.upload)
+
+        ingest_invitation_upload(batch.id)
+        batch.refresh_from_db()
+        return batch
+
+    def test_csv_upload_creates_pending_invitations(self):
+        batch = self.upload(
+            b"name,email\nA,a@example.com\nB,B@Example.com\nC,a@example.com\nD,bad\n",
+            "csv",
+            "recipients.csv",
+        )
+
+        status_data = batch.get_status()
+        self.assertEqual(batch.status, InvitationBatch.Status.PENDING)
+        self.assertEqual(
+            (status_data["total"], status_data["duplicates"], status_data["invalid"]),
+            (2, 1, 1),
+        )
+        invitations = batch.invitations.all()
+        self.assertQuerySetEqual(
+            invitations.order_by("email").values_list(
+                "email", "status", "reminder_count", "last_reminded_at"
+            ),
+            [
+                ("a@example.com", Invitation.Status.PENDING, 0, None),
+                ("b@example.com", Invitation.Status.PENDING, 0, None),
+            ],
+        )
+        self.assertEqual(len({i.token for i in invitations}), 2)
+
+    def test_ndjson_upload_creates_pending_invitations(self):
+        batch = self.upload(
+            b'"a@example.com"\n{"email": "b@example.com"}\n\n[1]\n',
+            "ndjson",
+            "recipients.ndjson",
+        )
+
+        self.assertEqual((batch.total_count, batch.metadata["invalid"]), (2, 1))
+        self.assertEqual(
+            batch.invitations.filter(
+                status=Invitation.Status.PENDING, reminder_count=0
+            ).count(),
+            2,
+        )
+
+    def test_imported_uploads_are_deleted(self):
+        batch = self.upload(b"a@example.com\n", "csv", "recipients.csv")
+
+        self.assertFalse(batch.upload)
+        self.assertEqual(os.listdir(settings.MEDIA_ROOT + "/uploads/invitations"), [])
+        self.assertIsNone(batch.get_status()["error"])
+
+    def test_unreadable_uploads_fail_the_batch(self):
+        batch = self.upload(b"\xff\xfe\xfa\n", "csv", "recipients.csv")
+
+        self.assertEqual(batch.status, InvitationBatch.Status.FAILED)
+        self.assertIn("Unreadable file", batch.get_status()["error"])
+        self.assertFalse(batch.invitations.exists())
+
+
+class IngestInvitationsTests(APITestCase):
+    def test_progress_is_reported_once_per_chunk(self):
+        manager = User.objects.create_user(username="manager")
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        batch = InvitationBatch.objects.create(survey=survey)
+        emails = [f"user{index}@example.com" for index in range(5)]
+        progress = []
+
+        ingest_invitations(
+            batch,
+            emails,
+            batch_size=2,
+            on_progress=lambda counts: progress.append(counts["accepted"]),
+        )
+
+        self.assertEqual(progress, [2, 4, 5])
+
+
+class RecordingConnection:
+    """
+    Email connection that records the subjects sent in each session; sending
+    a subject of `failures` raises its error instead.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.sessions = []
+        self.connected = False
+
+    def open(self):
+        if not self.connected:
+            self.connected = True
+            self.sessions.append([])
+
+    def close(self):
+        self.connected = False
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.subject in self.failures:
+                raise self.failures[message.subject]
+            self.sessions[-1].append(message.subject)
+
+
+class SendMessagesTests(SimpleTestCase):
+    messages = [EmailMessage(subject, to=["a@example.com"]) for subject in "abcd"]
+
+    def test_messages_share_one_session(self):
+        connection = RecordingConnection()
+
+        errors = send_messages(connection, self.messages)
+
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(connection.sessions, [["a", "b", "c", "d"]])
+
+    def test_dropped_sessions_only_fail_the_message_in_flight(self):
+        dropped = smtplib.SMTPServerDisconnected("Connection lost")
+        connection = RecordingConnection({"b": dropped})
+        results = []
+
+        errors = send_messages(
+            connection,
+            self.messages,
+            on_result=lambda index, error: results.append((index, error)),
+        )
+
+        self.assertEqual(errors, [None, dropped, None, None])
+        self.assertEqual(results, list(enumerate(errors)))
+        self.assertEqual(connection.sessions, [["a"], ["c", "d"]])
+
+    def test_rejected_recipients_keep_the_session(self):
+        rejected = smtplib.SMTPRecipientsRefused({})
+        connection = RecordingConnection({"c": rejected})
+
+        errors = send_messages(connection, self.messages)
+
+        self.assertEqual(errors, [None, None, rejected, None])
+        self.assertEqual(connection.sessions, [["a", "b", "d"]])
+
+
+class InvitationRendererTests(TestCase):
+    def setUp(self):
+        manager = User.objects.create_user(username="manager")
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        self.batch = InvitationBatch.objects.create(survey=survey)
+        self.invitations = [
+            Invitation.objects.create(batch=self.batch, email=f"user{i}@example.com")
+            for i in range(3)
+        ]
+
+    def build(self, renderer, render=render_invitation):
+        with mock.patch.object(
+            services, "render_invitation", side_effect=render
+        ) as rendered:
+            messages = [renderer.build(i) for i in self.invitations]
+        return messages, rendered.call_count
+
+    def test_templates_are_rendered_once_per_batch(self):
+        messages, renders = self.build(InvitationRenderer(self.batch))
+
+        self.assertEqual(renders, 1)
+        for invitation, message in zip(self.invitations, messages, strict=True):
+            html, _ = message.alternatives[0]
+            for body in (message.body, html):
+                self.assertIn(f"?token={invitation.token}", body)
+                self.assertNotIn(TOKEN_PLACEHOLDER, body)
+            self.assertEqual(message.to, [invitation.email])
+
+    def test_rendering_per_recipient(self):
+        renderer = InvitationRenderer(self.batch, per_recipient=True)
+
+        _, renders = self.build(renderer)
+
+        self.assertEqual(renders, 3)
+
+    def test_templates_without_the_token_fall_back_to_rendering_per_recipient(self):
+        def render(context):
+            # As a template that transforms the action URL would
+            bodies = render_invitation(context)
+            return tuple(body.replace(TOKEN_PLACEHOLDER, "") for body in bodies)
+
+        renderer = InvitationRenderer(self.batch)
+        messages, renders = self.build(renderer, render)
+
+        self.assertTrue(renderer.per_recipient)
+        self.assertEqual(renders, 4)
+        self.assertEqual(
+            [message.to for message in messages],
+            [[invitation.email] for invitation in self.invitations],
+        )
+
+
+@override_settings(INVITATION_SEND_CHUNK_SIZE=2, INVITATION_SEND_RATE=1000)
+class SendInvitationBatchTests(TestCase):
+    def setUp(self):
+        self.enterContext(fake_redis())
+        self.enterContext(
+            celery_config(task_always_eager=True, task_eager_propagates=True)
+        )
+        manager = User.objects.create_user(username="manager")
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        self.batch = InvitationBatch.objects.create(survey=survey, total_count=5)
+        self.invitations = [
+            Invitation.objects.create(batch=self.batch, email=f"user{i}@example.com")
+            for i in range(5)
+        ]
+
+    def test_chunks_are_sent_then_the_batch_is_finalized(self):
+        send_invitation_batch(self.batch.id)
+
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.status, InvitationBatch.Status.COMPLETED)
+        self.assertEqual((self.batch.sent_count, self.batch.failed_count), (5, 0))
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [invitation.email for invitation in self.invitations],
+        )
+        self.assertFalse(
+            self.batch.invitations.exclude(status=Invitation.Status.SENT).exists()
+        )
+
+    def test_failed_emails_are_counted_and_the_batch_still_completes(self):
+        broken = self.invitations[2]
+        build = InvitationRenderer.build
+
+        def build_or_fail(renderer, invitation):
+            if invitation.id == broken.id:
+                raise ValueError("Broken template")
+            return build(renderer, invitation)
+
+        with mock.patch.object(InvitationRenderer, "build", build_or_fail):
+            send_invitation_batch(self.batch.id)
+
+        self.batch.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(self.batch.status, InvitationBatch.Status.COMPLETED)
+        self.assertEqual((self.batch.sent_count, self.batch.failed_count), (4, 1))
+        self.assertEqual(
+            (broken.status, broken.error_message),
+            (Invitation.Status.FAILED, "Broken template"),
+        )
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_only_pending_invitations_are_sent(self):
+        Invitation.objects.filter(id=self.invitations[0].id).update(
+            status=Invitation.Status.SENT
+        )
+
+        send_invitation_batch(self.batch.id)
+
+        self.assertEqual(len(mail.outbox), 4)
+
+
+@override_settings(INVITATION_SEND_RATE=0)
+class SendInvitationChunkTests(TestCase):
+    def setUp(self):
+        manager = User.objects.create_user(username="manager")
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        self.batch = InvitationBatch.objects.create(survey=survey, total_count=6)
+        self.ids = [
+            Invitation.objects.create(batch=self.batch, email=f"user{i}@example.com").id
+            for i in range(6)
+        ]
+
+    def test_results_are_written_in_bulk(self):
+        with CaptureQueriesContext(connection) as two:
+            send_invitation_chunk(self.batch.id, self.ids[:2])
+        with CaptureQueriesContext(connection) as four:
+            send_invitation_chunk(self.batch.id, self.ids[2:])
+
+        self.assertEqual(len(two), len(four))
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.sent_count, 6)
+        self.assertEqual(
+            Invitation.objects.filter(status=Invitation.Status.SENT).count(), 6
+        )
+
+    def test_interrupted_chunks_keep_the_results_sent_so_far(self):
+        def send_two(connection, messages, limiter=None, on_result=None):
+            on_result(0, None)
+            on_result(1, None)
+            raise TimeoutError("Soft time limit")
+
+        with mock.patch.object(tasks, "send_messages", send_two):
+            with self.assertRaises(TimeoutError):
+                send_invitation_chunk(self.batch.id, self.ids)
+
+        self.batch.refresh_from_db()
+        self.assertEqual((self.batch.sent_count, self.batch.failed_count), (2, 0))
+        self.assertQuerySetEqual(
+            Invitation.objects.order_by("id").values_list("status", flat=True),
+            [Invitation.Status.SENT] * 2 + [Invitation.Status.PENDING] * 4,
+        )
+
+
+class BatchStatusViewTests(APITestCase):
+    def setUp(self):
+        self.enterContext(fake_redis())
+        cache.clear()
+        manager = User.objects.create_user(
+            username="manager", role=User.Role.SURVEY_MANAGER
+        )
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        self.batch = InvitationBatch.objects.create(survey=survey, total_count=10)
+        self.client.force_authenticate(manager)
+        self.url = reverse("communications:batch-status", args=[self.batch.id])
+
+    def test_status_is_read_from_the_counters(self):
+        InvitationBatch.record_progress(self.batch.id, sent=6, failed=1, clicked=2)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ("sent", "failed", "clicked")},
+            {"sent": 6, "failed": 1, "clicked": 2},
+        )
+        self.assertEqual(response.data["pending"], 3)
+
+    def test_status_is_cached(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_status_is_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_progress_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        InvitationBatch.record_progress(self.batch.id, sent=1)
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["sent"], 1)
+
+    def test_unknown_batches_are_not_found(self):
+        url = reverse("communications:batch-status", args=[self.batch.id + 1])
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class InvitationRedeemViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        manager = User.objects.create_user(username="manager")
+        self.survey = Survey.objects.create(title="Survey", created_by=manager)
+        self.batch = InvitationBatch.objects.create(survey=self.survey)
+        self.invitation = Invitation.objects.create(
+            batch=self.batch, email="a@example.com", status=Invitation.Status.SENT
+        )
+        self.url = reverse(
+            "communications:redeem-invitation", args=[self.invitation.token]
+        )
+
+    def test_repeated_clicks_are_served_from_the_cache(self):
+        self.enterContext(fake_redis())
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["survey_id"], self.survey.id)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_buffered_clicks_are_counted_once_by_the_flush(self):
+        self.enterContext(fake_redis())
+        for _ in range(3):
+            self.client.get(self.url)
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.status, Invitation.Status.SENT)
+
+        self.assertEqual(flush_clicks(), 1)
+        self.client.get(self.url)
+        self.assertEqual(flush_clicks(), 0)
+
+        self.invitation.refresh_from_db()
+        self.batch.refresh_from_db()
+        self.assertEqual(self.invitation.status, Invitation.Status.CLICKED)
+        self.assertEqual(self.batch.clicked_count, 1)
+
+    def test_clicks_are_written_directly_without_redis(self):
+        unavailable = redis.ConnectionError("Connection refused")
+        with mock.patch.object(services, "get_redis", side_effect=unavailable):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.status, Invitation.Status.CLICKED)
+
+    def test_unknown_tokens_are_not_found(self):
+        url = reverse(
+            "communications:redeem-invitation",
+            args=["00000000-0000-4000-8000-000000000000"],
+        )
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecordingHandler(SinkHandler):
+    """Records the accepted recipients and refuses `rejected` ones."""
+
+    rejected = "rejected@example.com"
+
+    def __init__(self):
+        super().__init__()
+        self.recipients = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == self.rejected:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients += envelope.rcpt_tos
+        return await super().handle_DATA(server, session, envelope)
+
+
+@override_settings(
+    EMAIL_HOST="127.0.0.1",
+    EMAIL_HOST_USER="",
+    EMAIL_HOST_PASSWORD="",
+    EMAIL_USE_TLS=False,
+    EMAIL_USE_SSL=False,
+)
+class AsyncSMTPSenderTests(TestCase):
+    def setUp(self):
+        from aiosmtpd.controller import Controller
+
+        self.handler = RecordingHandler()
+        port = free_port()
+        controller = Controller(self.handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        self.addCleanup(controller.stop)
+        self.enterContext(override_settings(EMAIL_PORT=port))
+
+    def messages(self, *recipients):
+        return [EmailMessage("Invitation", "Hello", to=[to]) for to in recipients]
+
+    def test_messages_are_sent_over_concurrent_sessions(self):
+        recipients = [f"user{i}@example.com" for i in range(6)]
+        results = []
+
+        errors = AsyncSMTPSender(concurrency=3).send_messages(
+            self.messages(*recipients),
+            on_result=lambda index, error: results.append((index, error)),
+        )
+
+        self.assertEqual(errors, [None] * 6)
+        self.assertEqual(sorted(results), [(i, None) for i in range(6)])
+        self.assertEqual(sorted(self.handler.recipients), recipients)
+
+    def test_refused_recipients_only_fail_their_message(self):
+        messages = self.messages(
+            "a@example.com", RecordingHandler.rejected, "b@example.com"
+        )
+
+        errors = AsyncSMTPSender(concurrency=1).send_messages(messages)
+
+        self.assertIsNone(errors[0])
+        self.assertIsNotNone(errors[1])
+        self.assertIsNone(errors[2])
+        self.assertEqual(self.handler.recipients, ["a@example.com", "b@example.com"])
+
+    def test_connection_errors_are_raised(self):
+        sender = AsyncSMTPSender(port=free_port())
+
+        with self.assertRaises(ConnectionError):
+            sender.send_messages(self.messages("a@example.com"))
+
+    @override_settings(INVITATION_SENDER="async", INVITATION_SEND_RATE=0)
+    def test_invitation_chunks_can_use_the_async_sender(self):
+        manager = User.objects.create_user(username="manager")
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        batch = InvitationBatch.objects.create(survey=survey, total_count=3)
+        ids = [
+            Invitation.objects.create(batch=batch, email=f"user{i}@example.com").id
+            for i in range(3)
+        ]
+
+        send_invitation_chunk(batch.id, ids)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.sent_count, 3)
+        self.assertEqual(len(self.handler.recipients), 3)
@@ -1,6 +1,11 @@
 from django.urls import path
 
-from .views import BatchStatusView, BulkInvitationView, InvitationRedeemView
+from .views import (
+    BatchReminderView,
+    BatchStatusView,
+    BulkInvitationView,
+    InvitationRedeemView,
+)
 
 app_name = "communications"
 
@@ -9,6 +14,11 @@ urlpatterns = [
     path(
         "batch-status/<int:batch_id>/", BatchStatusView.as_view(), name="batch-status"
     ),
+    path(
+        "batch-reminders/<int:batch_id>/",
+        BatchReminderView.as_view(),
+        name="batch-reminders",
+    ),
     path(
         "redeem/<uuid:token>/", InvitationRedeemView.as_view(), name="redeem-invitation"
     ),
@@ -1,3 +1,10 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -5,97 +12,158 @@ from rest_framework.views import APIView
 
 from apps.users.permissions import IsSurveyManager
 
-from .models import Invitation, InvitationBatch
-from .serializers import BulkInvitationSerializer
-from .tasks import send_invitation_batch
+from .models import InvitationBatch
+from .serializers import BulkInvitationSerializer, InvitationUploadSerializer
+from .services import get_invitation_metadata, ingest_invitations, record_click
+from .tasks import ingest_invitation_upload, queue_reminders, send_invitation_batch
 
 
 class BulkInvitationView(APIView):
+    """
+    Queue invitations from a JSON `emails` list, or from a CSV/NDJSON `file`
+    upload that is validated and inserted as a stream by a Celery task.
+    """
+
     permission_classes = [IsAuthenticated, IsSurveyManager]
 
     def post(self, request, *args, **kwargs):
+        if "file" in request.FILES:
+            return self.upload(request)
+
         serializer = BulkInvitationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-
-        survey_id = serializer.validated_data["survey_id"]
-        emails = serializer.validated_data["emails"]
-
-        batch = InvitationBatch.objects.create(
-            survey_id=survey_id,
-            created_by=request.user,
-            metadata={"total_emails": len(emails)},
-        )
-
-        invitations = [Invitation(batch=batch, email=email) for email in emails]
-        Invitation.objects.bulk_create(invitations)
+        with transaction.atomic():
+            batch = InvitationBatch.objects.create(
+                survey_id=serializer.validated_data["survey_id"],
+                created_by=request.user,
+            )
+            counts = ingest_invitations(batch, serializer.validated_data["emails"])
+            batch.total_count = counts["accepted"]
+            batch.metadata = {"total_emails": counts["accepted"]}
+            batch.save()
 
         # Trigger Celery task
-        send_invitation_batch.delay(batch.id)
+        transaction.on_commit(lambda: send_invitation_batch.delay(batch.id))
 
         return Response(
             {
                 "batch_id": batch.id,
                 "message": (
-                    f"Successfully queued {len(emails)} invitations for sending."
+                    f"Successfully queued {counts['accepted']} invitations for sending."
                 ),
+                **counts,
             },
             status=status.HTTP_201_CREATED,
         )
 
+    def upload(self, request):
+        """
+        Store the uploaded file on a new batch, imported (then sent) by
+        `ingest_invitation_upload`; its progress shows in the batch status.
+        """
+        serializer = InvitationUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        batch = InvitationBatch.objects.create(
+            survey_id=serializer.validated_data["survey_id"],
+            created_by=request.user,
+            status=InvitationBatch.Status.IMPORTING,
+            metadata={"format": serializer.validated_data["format"]},
+            upload=serializer.validated_data["file"],
+        )
+        transaction.on_commit(lambda: ingest_invitation_upload.delay(batch.id))
+
+        return Response(
+            {
+                "batch_id": batch.id,
+                "status": batch.status,
+                "message": "Importing the recipients; the batch status shows the "
+                "progress.",
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
 
 class BatchStatusView(APIView):
+    """
+    Progress of an invitation batch, read from the counters kept on the batch
+    and cached briefly. Supports conditional requests with `If-None-Match`.
+    """
+
     permission_classes = [IsAuthenticated, IsSurveyManager]
 
     def get(self, request, batch_id):
-        try:
-            batch = InvitationBatch.objects.get(id=batch_id)
+        data = InvitationBatch.get_cached_status(batch_id)
+        if data is None:
             return Response(
-                {
-                    "id": batch.id,
-                    "status": batch.status,
-                    "total": batch.invitations.count(),
-                    "sent": batch.invitations.filter(
-                        status=Invitation.Status.SENT
-                    ).count(),
-                    "failed": batch.invitations.filter(
-                        status=Invitation.Status.FAILED
-                    ).count(),
-                    "pending": batch.invitations.filter(
-                        status=Invitation.Status.PENDING
-                    ).count(),
-                    "created_at": batch.created_at,
-                }
+                {"error": "Batch not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except InvitationBatch.DoesNotExist:
+
+        etag = quote_etag(
+            hashlib.md5(
+                json.dumps(data, sort_keys=True, default=str).encode()
+            ).hexdigest()
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data)
+        response["ETag"] = etag
+        patch_cache_control(
+            response, private=True, max_age=settings.INVITATION_BATCH_STATUS_CACHE_TTL
+        )
+        return response
+
+
+class BatchReminderView(APIView):
+    """
+    Queue reminders for the invitations of a batch that have not completed
+    the survey yet (reminders also go out periodically from celery beat).
+    """
+
+    permission_classes = [IsAuthenticated, IsSurveyManager]
+
+    def post(self, request, batch_id):
+        if not InvitationBatch.objects.filter(id=batch_id).exists():
             return Response(
                 {"error": "Batch not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        queued = queue_reminders(batch_id)
+        return Response(
+            {
+                "batch_id": batch_id,
+                "queued": queued,
+                "message": f"Queued {queued} reminders for sending.",
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
 
 class InvitationRedeemView(APIView):
     """
     View to redeem an invitation token and redirect or return survey link.
+
+    Token metadata is cached and the click is buffered in Redis, then written
+    in bulk by `flush_invitation_clicks`, so repeated clicks cost no queries.
     """
 
     def get(self, request, token):
-        try:
-            invitation = Invitation.objects.get(token=token)
-            invitation.status = Invitation.Status.CLICKED
-            invitation.save()
-
-            # Here we could either redirect or return the survey URL
-            # For now, let's return the URL where they can take the survey
-            return Response(
-                {
-                    "survey_id": invitation.batch.survey.id,
-                    "survey_title": invitation.batch.survey.title,
-                    "invitation_token": str(token),
-                    "take_survey_url": (
-                        f"/surveys/render/{invitation.batch.survey.id}/?token={token}"
-                    ),
-                }
-            )
-        except Invitation.DoesNotExist:
+        data = get_invitation_metadata(token)
+        if data is None:
             return Response(
                 {"error": "Invalid token"}, status=status.HTTP_404_NOT_FOUND
             )
+
+        record_click(data["invitation_id"])
+
+        # Here we could either redirect or return the survey URL
+        # For now, let's return the URL where they can take the survey
+        return Response(
+            {
+                "survey_id": data["survey_id"],
+                "survey_title": data["survey_title"],
+                "invitation_token": str(token),
+                "take_survey_url": (
+                    f"/surveys/render/{data['survey_id']}/?token={token}"
+                ),
+            }
+        )
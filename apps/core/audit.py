@@ -0,0 +1,190 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from auditlog.context import auditlog_disabled
+from auditlog.diff import model_instance_diff
+from auditlog.models import LogEntry, LogEntryManager
+from auditlog.registry import auditlog
+from auditlog.signals import post_log, pre_log
+from django.conf import settings
+from django.core import serializers
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+logger = logging.getLogger(__name__)
+
+# Entries queued by the innermost `buffered_audit_log` block, if any
+_buffer = ContextVar("audit_log_buffer", default=None)
+
+# Value of auditlog's `auditlog_disabled` inside `buffered_audit_log`: it
+# turns auditlog's own receivers off, and tells the buffered ones apart from
+# a `disable_auditlog()` block, which turns both off
+BUFFERING = object()
+
+
+class UnsavedLogEntryManager(LogEntryManager):
+    """A `LogEntryManager` whose `log_create` returns the entry unsaved."""
+
+    def create(self, **kwargs):
+        return self.model(**kwargs)
+
+
+unsaved_entries = UnsavedLogEntryManager()
+unsaved_entries.model = LogEntry
+
+
+@contextmanager
+def buffered_audit_log():
+    """
+    Queue the audit log entries of the changes made in the block and save
+    them with one `bulk_create` when it exits (or in the `write_audit_log`
+    task with `AUDIT_LOG_ASYNC`).
+
+    Entries are only queued once their transaction commits, so changes
+    rolled back are not logged, as with entries saved directly. Inside
+    `disable_auditlog()` nothing is logged.
+    """
+    entries = []
+    token = _buffer.set(entries)
+    # auditlog's receivers stay connected but skip the changes made here
+    disabled = None if auditlog_disabled.get() else auditlog_disabled.set(BUFFERING)
+    try:
+        yield entries
+    finally:
+        if disabled is not None:
+            auditlog_disabled.reset(disabled)
+        _buffer.reset(token)
+        write_entries(entries)
+
+
+def write_entries(entries):
+    if not entries:
+        return
+    if settings.AUDIT_LOG_ASYNC:
+        from .tasks import write_audit_log
+
+        try:
+            write_audit_log.delay(serializers.serialize("json", entries))
+            return
+        except Exception as e:
+            logger.warning(f"Audit log task not queued, writing entries directly: {e}")
+    LogEntry.objects.bulk_create(entries)
+
+
+def queue_entry(entry):
+    entries = _buffer.get()
+    # `set_actor` fills in the actor and remote address on pre_save, which
+    # bulk_create doesn't send
+    pre_save.send(
+        sender=LogEntry,
+        instance=entry,
+        raw=False,
+        using=router.db_for_write(LogEntry),
+        update_fields=None,
+    )
+    transaction.on_commit(partial(entries.append, entry))
+
+
+def _log(action, instance, sender, diff_old, diff_new, fields_to_check=None):
+    """Like auditlog's `_create_log_entry`, but through `queue_entry`."""
+    pre_log_results = pre_log.send(sender, instance=instance, action=action)
+    if any(result is False for _, result in pre_log_results):
+        return
+
+    error = None
+    entry = None
+    changes = None
+    try:
+        changes = model_instance_diff(
+            diff_old, diff_new, fields_to_check=fields_to_check
+        )
+        if changes:
+            entry = unsaved_entries.log_create(instance, action=action, changes=changes)
+            queue_entry(entry)
+    except BaseException as e:
+        error = e
+    finally:
+        if entry or error:
+            post_log.send(
+                sender,
+                instance=instance,
+                instance_old=diff_old,
+                action=action,
+                error=error,
+                pre_log_results=pre_log_results,
+                changes=changes,
+                log_entry=entry,
+                log_created=entry is not None,
+            )
+        if error:
+            raise error
+
+
+def when_buffering(receiver):
+    """
+    Run `receiver` only inside `buffered_audit_log` (and not in a nested
+    `disable_auditlog()`), skipping raw saves like auditlog's `check_disable`.
+    """
+
+    @wraps(receiver)
+    def wrapper(*args, **kwargs):
+        if auditlog_disabled.get() is not BUFFERING:
+            return
+        if kwargs.get("raw") and settings.AUDITLOG_DISABLE_ON_RAW_SAVE:
+            return
+        receiver(*args, **kwargs)
+
+    return wrapper
+
+
+@when_buffering
+def log_create(sender, instance, created, **kwargs):
+    if created:
+        _log(LogEntry.Action.CREATE, instance, sender, None, instance)
+
+
+@when_buffering
+def log_update(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        return
+    if update_fields:
+        # Skip the lookup of the old row when only excluded fields are saved,
+        # like `last_login` on login
+        excluded = auditlog.get_model_fields(sender)["exclude_fields"]
+        if set(update_fields) <= set(excluded):
+            return
+    old = sender.objects.filter(pk=instance.pk).first()
+    _log(LogEntry.Action.UPDATE, instance, sender, old, instance, update_fields)
+
+
+@when_buffering
+def log_delete(sender, instance, **kwargs):
+    if instance.pk is not None:
+        _log(LogEntry.Action.DELETE, instance, sender, instance, None)
+
+
+BUFFERED_RECEIVERS = {
+    post_save: log_create,
+    pre_save: log_update,
+    post_delete: log_delete,
+}
+
+
+def install_buffered_receivers(registry=auditlog):
+    """
+    Connect the create/update/delete receivers above to every registered
+    model, next to auditlog's own: inside `buffered_audit_log` these log the
+    changes and auditlog's are disabled, elsewhere only auditlog's run.
+
+    Only the create/update/delete entries are buffered; models registered
+    with `m2m_fields` aren't logged inside `buffered_audit_log`.
+    """
+    for signal, receiver in BUFFERED_RECEIVERS.items():
+        for model in registry.get_models():
+            signal.connect(
+                receiver,
+                sender=model,
+                dispatch_uid=f"buffered_audit_log.{receiver.__name__}",
+            )
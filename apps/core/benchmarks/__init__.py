@@ -0,0 +1,7 @@
+"""
+Benchmarks of the hot paths (schema cache, validation, the submission API,
+report exports, invitation sending and throttling), run by the
+`run_benchmarks` command on a test database, with fakeredis and a local SMTP
+sink. Each records time, queries and peak memory, as JSON that can be
+compared between commits.
+"""
@@ -0,0 +1,232 @@
+from functools import partial
+from itertools import count
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.communications.models import Invitation, InvitationBatch
+from apps.communications.tasks import send_invitation_batch
+from apps.core.load_data import LoadDataGenerator
+from apps.core.throttling import ActionBasedThrottle
+from apps.reports.models import ReportExport
+from apps.reports.tasks import generate_survey_report_csv
+from apps.submissions.models import Submission
+from apps.submissions.services import SubmissionValidatorService
+from apps.submissions.views import SubmissionViewSet
+from apps.surveys.models import Survey
+from apps.users.models import User
+
+from .environment import celery_config
+from .runner import benchmark
+
+# Each benchmark generates its data under its own prefix
+_prefixes = count()
+
+
+def generate(**options):
+    """Generate one survey with `LoadDataGenerator`; returns it and the generator."""
+    options = {"users": 0, "invitations": 0, "submissions": 0, **options}
+    generator = LoadDataGenerator(prefix=f"bench{next(_prefixes)}", **options)
+    (survey,) = generator.generate()
+    return survey, generator
+
+
+def participants(generator):
+    return list(
+        User.objects.filter(username__startswith=f"{generator.prefix}_user_").order_by(
+            "id"
+        )
+    )
+
+
+def answer_payload(generator):
+    answers, _ = generator.answer_survey(completed=True)
+    return [{"question": a["question_id"], "value": a["value"]} for a in answers]
+
+
+def check_status(response, expected):
+    if response.status_code != expected:
+        raise RuntimeError(
+            f"Unexpected response {response.status_code}: {response.data}"
+        )
+
+
+# Survey schema
+
+
+@benchmark("schema.update_schema_cache", sections=20)
+@benchmark("schema.update_schema_cache", sections=5)
+def update_schema_cache(calls, sections):
+    survey, _ = generate(sections=sections)
+    return survey.update_schema_cache
+
+
+@benchmark("schema.get_cached_schema.hit")
+def get_cached_schema_hit(calls):
+    survey, _ = generate()
+    Survey.get_cached_schema(survey.id)
+    return partial(Survey.get_cached_schema, survey.id)
+
+
+@benchmark("schema.get_cached_schema.miss")
+def get_cached_schema_miss(calls):
+    survey, _ = generate()
+
+    def run():
+        cache.delete(f"survey_render_{survey.id}")
+        Survey.get_cached_schema(survey.id)
+
+    return run
+
+
+# Submission validation
+
+
+@benchmark("submissions.validate", sections=20, depth=5)
+@benchmark("submissions.validate", sections=20, depth=1)
+@benchmark("submissions.validate", sections=5, depth=5)
+@benchmark("submissions.validate", sections=5, depth=1)
+def validate(calls, sections, depth, submissions=50):
+    """Validate `submissions` completed submissions per call."""
+    survey, _ = generate(
+        sections=sections,
+        logic_rules=4 * sections,
+        logic_depth=depth,
+        submissions=submissions,
+        completion_rate=1,
+    )
+    schema = Survey.get_cached_schema(survey.id)
+    answer_maps = [
+        {str(a.question_id): a.value for a in submission.answers.all()}
+        for submission in Submission.objects.filter(survey=survey).prefetch_related(
+            "answers"
+        )
+    ]
+
+    def run():
+        for answers in answer_maps:
+            SubmissionValidatorService(schema, answers, is_completed=True).validate()
+
+    return run
+
+
+# Submission API
+
+
+@benchmark("submissions.api.create")
+def submission_create(calls):
+    """POST a completed submission, as a new participant each call."""
+    survey, generator = generate(users=calls)
+    users = iter(participants(generator))
+    data = {
+        "survey": survey.id,
+        "answers": answer_payload(generator),
+        "is_completed": True,
+    }
+    client = APIClient()
+    url = reverse("submissions:submission-list")
+
+    def run():
+        client.force_authenticate(next(users))
+        check_status(client.post(url, data, format="json"), 201)
+
+    return run
+
+
+@benchmark("submissions.api.update")
+def submission_update(calls):
+    """PATCH the answers into an in-progress submission and complete it."""
+    survey, generator = generate(users=calls)
+    users = participants(generator)
+    submissions = Submission.objects.bulk_create(
+        Submission(survey=survey, user=user) for user in users
+    )
+    pending = iter(submissions)
+    data = {"answers": answer_payload(generator), "is_completed": True}
+    client = APIClient()
+
+    def run():
+        submission = next(pending)
+        client.force_authenticate(submission.user)
+        url = reverse("submissions:submission-detail", args=[submission.id])
+        check_status(client.patch(url, data, format="json"), 200)
+
+    return run
+
+
+# Reports
+
+
+@benchmark("reports.generate_survey_report_csv", compression="zstd")
+@benchmark("reports.generate_survey_report_csv", compression="none")
+def report_csv(calls, compression, submissions=1000):
+    survey, generator = generate(submissions=submissions)
+    manager = survey.created_by
+    exports = iter(
+        ReportExport.objects.bulk_create(
+            ReportExport(survey=survey, created_by=manager, compression=compression)
+            for _ in range(calls)
+        )
+    )
+    return lambda: generate_survey_report_csv(next(exports).id)
+
+
+# Invitations
+
+
+@benchmark("communications.send_invitation_batch", invitations=200)
+def invitation_batch(calls, invitations):
+    """
+    Send a batch of pending invitations to the local SMTP sink, running the
+    chunk tasks eagerly, without the sending rate limit.
+    """
+    survey, _ = generate()
+    batches = InvitationBatch.objects.bulk_create(
+        InvitationBatch(
+            survey=survey, created_by=survey.created_by, total_count=invitations
+        )
+        for _ in range(calls)
+    )
+    Invitation.objects.bulk_create(
+        (
+            Invitation(batch=batch, email=f"bench_{batch.id}_{index}@example.com")
+            for batch in batches
+            for index in range(invitations)
+        ),
+        batch_size=5000,
+    )
+    pending = iter(batches)
+
+    def run():
+        with (
+            celery_config(task_always_eager=True, task_eager_propagates=True),
+            override_settings(INVITATION_SEND_RATE=10**9, INVITATION_SEND_BURST=10**9),
+        ):
+            send_invitation_batch(next(pending).id)
+
+    return run
+
+
+# Throttling
+
+
+@benchmark("core.ActionBasedThrottle", checks=1000)
+def action_based_throttle(calls, checks, users=100):
+    """Check the submission update rate of `users` users, `checks` times a call."""
+    factory = APIRequestFactory()
+    view = SimpleNamespace(action="update", throttle_map=SubmissionViewSet.throttle_map)
+    requests = []
+    for index in range(users):
+        request = Request(factory.patch("/api/submissions/1/"))
+        request.user = SimpleNamespace(pk=index + 1, is_authenticated=True)
+        requests.append(request)
+
+    def run():
+        for index in range(checks):
+            ActionBasedThrottle().allow_request(requests[index % users], view)
+
+    return run
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.core import redis_client
+from config.celery import app
+
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Run on a fresh test database next to the configured one."""
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+@contextmanager
+def fake_redis():
+    """
+    Point the cache and `get_redis` at one in-process fakeredis server, so
+    throttles, token and schema caches behave as with Redis without one.
+    """
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    caches = {
+        **settings.CACHES,
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": settings.REDIS_URL,
+            "OPTIONS": {"connection_class": fakeredis.FakeConnection, "server": server},
+        },
+    }
+    clients = redis_client._clients.copy()
+    redis_client._clients.clear()
+    redis_client._clients[settings.REDIS_URL] = fakeredis.FakeRedis(server=server)
+    try:
+        with override_settings(CACHES=caches):
+            yield server
+    finally:
+        redis_client._clients.clear()
+        redis_client._clients.update(clients)
+
+
+@contextmanager
+def celery_config(**options):
+    """
+    Temporarily change the Celery configuration. Options are given by their
+    Celery name, e.g. `task_always_eager`; set from Django settings, the
+    configuration is keyed by the setting name.
+    """
+    if app.namespace:
+        options = {
+            f"{app.namespace}_{key}".upper(): value for key, value in options.items()
+        }
+    saved = {key: app.conf.get(key) for key in options}
+    app.conf.update(options)
+    try:
+        yield
+    finally:
+        app.conf.update(saved)
+
+
+@contextmanager
+def in_memory_celery():
+    """Queue tasks in an in-memory broker instead of the configured one."""
+    urls = {
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+    }
+    # Celery prefers these environment variables over its configuration
+    saved = {name: os.environ.get(name) for name in urls}
+    os.environ.update(urls)
+    try:
+        with celery_config(
+            broker_url=urls["CELERY_BROKER_URL"],
+            result_backend=urls["CELERY_RESULT_BACKEND"],
+        ):
+            yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def smtp_sink():
+    """Send email to a local aiosmtpd server that discards it."""
+    from aiosmtpd.controller import Controller
+
+    from apps.communications.smtp_sink import SinkHandler, free_port
+
+    host, port = "127.0.0.1", free_port()
+    controller = Controller(SinkHandler(), hostname=host, port=port)
+    controller.start()
+    try:
+        with override_settings(
+            EMAIL_BACKEND=SMTP_BACKEND,
+            EMAIL_HOST=host,
+            EMAIL_PORT=port,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        ):
+            yield host, port
+    finally:
+        controller.stop()
+
+
+@contextmanager
+def isolated(keepdb=False):
+    """
+    Everything the benchmarks need, without touching the configured services:
+    a test database, fakeredis, an in-memory Celery broker, a temporary media
+    root and a local SMTP sink.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(test_database(keepdb))
+        stack.enter_context(fake_redis())
+        stack.enter_context(in_memory_celery())
+        media_root = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(override_settings(MEDIA_ROOT=media_root))
+        stack.enter_context(smtp_sink())
+        yield
@@ -0,0 +1,138 @@
+import fnmatch
+import gc
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+# Registered benchmarks, in definition order: (name, setup, params)
+BENCHMARKS = []
+
+
+def benchmark(name, **params):
+    """
+    Register `setup(calls, **params)` as the benchmark `name`. Setup prepares
+    the data and returns the function measured, which is called `calls` times
+    in all. Stack the decorator to run a benchmark with several parameters.
+    """
+
+    def decorator(setup):
+        label = name
+        if params:
+            label += "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+        BENCHMARKS.append((label, setup, params))
+        return setup
+
+    return decorator
+
+
+def selected(patterns=None) -> list:
+    """The registered benchmarks whose name matches one of the glob `patterns`."""
+    return [
+        entry
+        for entry in BENCHMARKS
+        if not patterns or any(fnmatch.fnmatch(entry[0], p) for p in patterns)
+    ]
+
+
+def measure(run, iterations, warmup=1) -> dict:
+    """
+    Time `iterations` calls of `run` after `warmup` ones, count the queries of
+    each call, and trace the peak memory of one more call (tracing slows the
+    code down, so it isn't timed).
+    """
+    for _ in range(warmup):
+        run()
+
+    timings, queries = [], []
+    for _ in range(iterations):
+        gc.collect()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if iterations > 1 else 0.0,
+        "queries": max(queries),
+        "peak_memory": peak,
+    }
+
+
+def run_benchmarks(patterns=None, iterations=5, warmup=1, log=None) -> dict:
+    """Run the selected benchmarks and return their results by name."""
+    results = {}
+    for name, setup, params in selected(patterns):
+        if log:
+            log(f"{name}...")
+        run = setup(warmup + iterations + 1, **params)
+        results[name] = measure(run, iterations, warmup)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """What the results were measured on, to tell apart runs worth comparing."""
+    return {
+        "commit": git_commit(),
+        "timestamp": now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": f"{connection.vendor} {connection.pg_version}"
+        if connection.vendor == "postgresql"
+        else connection.vendor,
+        "machine": platform.machine(),
+    }
+
+
+def compare(baseline, results, threshold=0.2) -> list:
+    """
+    Compare `results` with the `baseline` results of an earlier run. Returns
+    a row per benchmark present in both: its name, the relative change of the
+    fastest time (the least noisy), the change in queries and in peak memory,
+    and whether it regressed (time or memory up by more than `threshold`, or
+    more queries).
+    """
+    rows = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        time_change = result["min"] / before["min"] - 1
+        memory_change = result["peak_memory"] / max(before["peak_memory"], 1) - 1
+        query_change = result["queries"] - before["queries"]
+        regressed = (
+            time_change > threshold or memory_change > threshold or query_change > 0
+        )
+        rows.append((name, time_change, query_change, memory_change, regressed))
+    return rows
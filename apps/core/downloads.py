@@ -0,0 +1,129 @@
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    File-like wrapper that exposes only `length` bytes starting at `start`.
+
+    `fileno()` is kept so WSGI servers that support `wsgi.file_wrapper`
+    (e.g. gunicorn) can still hand the range to `os.sendfile` using the current
+    offset and the response Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = getattr(file, "name", "")
+        self.remaining = length
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) tuple.
+
+    Returns None when the header is missing or uses an unsupported form
+    (multiple ranges), in which case the whole file should be served.
+    Raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def protected_file_response(request, field_file, filename=None):
+    """
+    Serve a stored file after the caller has checked access to it.
+
+    Depending on `SENDFILE_BACKEND` the transfer is delegated to the front proxy
+    ("nginx" -> X-Accel-Redirect, "apache" -> X-Sendfile) so the worker is
+    released immediately, or streamed by Django ("django") with Range support.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    backend = settings.SENDFILE_BACKEND
+
+    if backend == "nginx":
+        response = HttpResponse()
+        prefix = settings.SENDFILE_URL_PREFIX.rstrip("/")
+        # Header values must be ASCII; nginx decodes the URI before serving it
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(field_file.name)}"
+    elif backend == "apache":
+        response = HttpResponse()
+        response["X-Sendfile"] = field_file.path
+    else:
+        return _file_response(request, field_file, filename)
+
+    # Let the proxy work out the content type, length and ranges
+    del response["Content-Type"]
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+def _file_response(request, field_file, filename):
+    size = field_file.size
+    try:
+        byte_range = parse_range_header(request.headers.get("Range"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = field_file.storage.open(field_file.name, "rb")
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileRange(file, start, length),
+            as_attachment=True,
+            filename=filename,
+            status=206,
+        )
+        response["Content-Length"] = length
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    return response
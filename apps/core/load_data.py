@@ -0,0 +1,621 @@
+import csv
+import io
+import json
+import random
+import uuid
+from datetime import UTC, date, datetime, time, timedelta
+from itertools import batched
+
+from auditlog.context import disable_auditlog
+from django.contrib.auth.hashers import make_password
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from apps.analytics.models import QuestionStats, QuestionStatsBucket
+from apps.communications.models import Invitation, InvitationBatch
+from apps.reports.models import ReportExport, ReportExportChunk
+from apps.submissions.models import Answer, Submission, typed_values
+from apps.surveys.models import (
+    Question,
+    QuestionChoice,
+    QuestionLogic,
+    Section,
+    Survey,
+)
+from apps.users.models import User
+
+QuestionType = Question.QuestionType
+CHOICE_TYPES = (QuestionType.RADIO, QuestionType.DROPDOWN, QuestionType.CHECKBOX)
+# Logic triggers compare a single value
+SINGLE_CHOICE_TYPES = (QuestionType.RADIO, QuestionType.DROPDOWN)
+
+DEFAULT_QUESTIONS = {
+    QuestionType.TEXT: 1,
+    QuestionType.NUMBER: 1,
+    QuestionType.RADIO: 2,
+    QuestionType.DROPDOWN: 1,
+    QuestionType.CHECKBOX: 1,
+    QuestionType.DATE: 1,
+}
+
+WORDS = (
+    "service quality price support delivery staff friendly slow fast easy "
+    "hard clean helpful app website order product team experience great poor "
+    "average value time wait again recommend issue refund manager love hate"
+).split()
+
+# Generated dates fall in the `days` before this one unless told otherwise, so
+# the same options always give the same data
+DEFAULT_END_DATE = date(2026, 1, 1)
+
+# Share of invitations ending in each status
+INVITATION_STATUSES = (
+    (Invitation.Status.SENT, 60),
+    (Invitation.Status.CLICKED, 30),
+    (Invitation.Status.FAILED, 10),
+)
+
+
+def parse_question_counts(value) -> dict:
+    """Parse "radio=3,text=1" into question counts per type."""
+    counts = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, count = item.partition("=")
+        counts[QuestionType(name.strip())] = int(count)
+    return counts
+
+
+def copy_value(field, value):
+    """Format a value as a COPY CSV field (None stays NULL)."""
+    if value is None:
+        return None
+    if isinstance(field, models.JSONField):
+        return json.dumps(value)
+    if isinstance(field, ArrayField):
+        items = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in value)
+        return "{" + ",".join(f'"{item}"' for item in items) + "}"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class RowInserter:
+    """
+    Inserts rows given as dicts of column values (by attname); columns left
+    out get the field default, or the current time for `auto_now` fields.
+
+    On PostgreSQL the rows are streamed with COPY, which skips the per-row
+    overhead of building model instances and SQL, with ids reserved from the
+    table's sequence beforehand. Other databases use `bulk_create`.
+    """
+
+    def __init__(self, model, stamp=None):
+        self.model = model
+        self.pk = model._meta.pk
+        self.fields = [f for f in model._meta.concrete_fields if f is not self.pk]
+        # Used for the automatic and "now" timestamps that rows leave out
+        stamp = stamp or timezone.now()
+        self.defaults = {
+            field.attname: (
+                stamp
+                if getattr(field, "auto_now", False)
+                or getattr(field, "auto_now_add", False)
+                or field.default is timezone.now
+                else field.get_default()
+            )
+            for field in self.fields
+        }
+
+    def insert(self, rows) -> list:
+        rows = [{**self.defaults, **row} for row in rows]
+        if connection.vendor != "postgresql":
+            objs = self.model.objects.bulk_create(self.model(**row) for row in rows)
+            return [obj.pk for obj in objs]
+
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                "FROM generate_series(1, %s)",
+                [table, self.pk.column, len(rows)],
+            )
+            ids = [pk for (pk,) in cursor.fetchall()]
+
+            buffer = io.StringIO()
+            # Only NULLs are left unquoted, so empty strings stay strings
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+            for pk, row in zip(ids, rows, strict=True):
+                writer.writerow(
+                    [pk]
+                    + [copy_value(field, row[field.attname]) for field in self.fields]
+                )
+            buffer.seek(0)
+
+            columns = ", ".join(
+                connection.ops.quote_name(field.column)
+                for field in [self.pk, *self.fields]
+            )
+            cursor.cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(table)} ({columns}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        return ids
+
+
+class LoadDataGenerator:
+    """
+    Generates synthetic surveys, users, invitations and submissions for load
+    tests, inserted in batches of `batch_size` (the large tables through
+    `RowInserter`).
+
+    All values are drawn from a random generator seeded with `seed`, and all
+    dates fall in the `days` before `end_date`, so the same options produce
+    the same data. Rows are inserted without model
+    signals (and with the audit log disabled), so schema caches are built on
+    first use and question stats by the `rebuild_question_stats` command.
+
+    Logic rules form chains of `logic_depth` "show" rules, each question of a
+    chain shown when the previous one has a given value; every other chain
+    also excludes a choice of its last question. Generated answers respect the
+    rules, so submissions pass validation.
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        prefix="load",
+        surveys=1,
+        sections=5,
+        questions=None,
+        choices=5,
+        logic_rules=10,
+        logic_depth=3,
+        users=100,
+        invitations=100,
+        submissions=100,
+        completion_rate=0.8,
+        days=365,
+        end_date=None,
+        password="load-test",
+        batch_size=5000,
+        stdout=None,
+    ):
+        # Seeded with the prefix too, so data generated under another prefix
+        # doesn't collide with it (e.g. on invitation tokens)
+        self.rng = random.Random(f"{prefix}:{seed}")
+        self.seed = seed
+        self.prefix = prefix
+        self.survey_count = surveys
+        self.section_count = sections
+        self.question_counts = DEFAULT_QUESTIONS if questions is None else questions
+        self.choice_count = max(choices, 2)
+        self.logic_rules = logic_rules
+        self.logic_depth = max(logic_depth, 1)
+        self.user_count = users
+        self.invitation_count = invitations
+        self.submission_count = submissions
+        self.completion_rate = completion_rate
+        self.days = days
+        self.end = datetime.combine(end_date or DEFAULT_END_DATE, time.min, UTC)
+        self.start = self.end - timedelta(days=days)
+        self.password = password
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.counts = {}
+        self.inserters = {}
+        # Structure of the survey being generated
+        self.survey_questions = []
+        self.choices = {}
+        self.rules = {}
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def count(self, model, number):
+        name = str(model._meta.verbose_name_plural)
+        self.counts[name] = self.counts.get(name, 0) + number
+
+    def bulk_create(self, model, objs):
+        objs = list(objs)
+        for batch in batched(objs, self.batch_size):
+            model.objects.bulk_create(batch)
+        self.count(model, len(objs))
+        return objs
+
+    def backdate(self, objs, **values):
+        """Set timestamps that `auto_now(_add)` filled in on saved `objs`."""
+        model = type(objs[0])
+        model.objects.filter(pk__in=[obj.pk for obj in objs]).update(**values)
+        for obj in objs:
+            for name, value in values.items():
+                setattr(obj, name, value)
+
+    def past(self):
+        """A random moment of the `days` before the end date."""
+        return self.end - timedelta(days=self.rng.uniform(0, self.days))
+
+    def insert(self, model, rows) -> list:
+        """Insert rows of column values (see `RowInserter`); returns their ids."""
+        inserter = self.inserters.get(model)
+        if inserter is None:
+            inserter = self.inserters[model] = RowInserter(model, self.end)
+        ids = []
+        for batch in batched(rows, self.batch_size):
+            ids += inserter.insert(batch)
+        self.count(model, len(ids))
+        return ids
+
+    def generate(self) -> list:
+        """Generate all the data and return the created surveys."""
+        with disable_auditlog(), transaction.atomic():
+            manager = self.create_manager()
+            user_ids = self.create_users()
+        surveys = []
+        for index in range(self.survey_count):
+            # One transaction per survey keeps them short
+            with disable_auditlog(), transaction.atomic():
+                survey = self.create_survey(index, manager)
+                clicked_ids = self.create_invitations(survey, manager)
+                self.create_submissions(survey, user_ids, clicked_ids)
+            surveys.append(survey)
+            self.log(f"Generated survey {index + 1}/{self.survey_count}")
+        return surveys
+
+    def existing(self) -> bool:
+        return User.objects.filter(username__startswith=f"{self.prefix}_").exists()
+
+    def clear(self):
+        """
+        Delete the data generated earlier with the same prefix. The survey
+        rows are deleted table by table with plain SQL, without signals;
+        cascading through the ORM would rebuild the survey's schema cache for
+        every row.
+        """
+        surveys = Survey.objects.filter(title__startswith=f"{self.prefix} survey ")
+        logic = QuestionLogic.objects.filter(
+            trigger_question__section__survey__in=surveys
+        )
+        with disable_auditlog(), transaction.atomic(), connection.cursor() as cursor:
+            for queryset in (
+                Answer.objects.filter(submission__survey__in=surveys),
+                Submission.objects.filter(survey__in=surveys),
+                Invitation.objects.filter(batch__survey__in=surveys),
+                InvitationBatch.objects.filter(survey__in=surveys),
+                QuestionStatsBucket.objects.filter(stats__survey__in=surveys),
+                QuestionStats.objects.filter(survey__in=surveys),
+                ReportExportChunk.objects.filter(export__survey__in=surveys),
+                ReportExport.objects.filter(survey__in=surveys),
+                QuestionLogic.target_choices.through.objects.filter(
+                    questionlogic__in=logic
+                ),
+                logic,
+                QuestionChoice.objects.filter(question__section__survey__in=surveys),
+                Question.objects.filter(section__survey__in=surveys),
+                Section.objects.filter(survey__in=surveys),
+                surveys,
+            ):
+                subquery, params = queryset.values("pk").query.sql_with_params()
+                meta = queryset.model._meta
+                cursor.execute(
+                    f"DELETE FROM {connection.ops.quote_name(meta.db_table)} "
+                    f"WHERE {connection.ops.quote_name(meta.pk.column)} "
+                    f"IN ({subquery})",
+                    params,
+                )
+            User.objects.filter(username__startswith=f"{self.prefix}_").delete()
+
+    # Users
+
+    def create_manager(self):
+        username = f"{self.prefix}_manager"
+        manager = User.objects.filter(username=username).first()
+        if manager is None:
+            manager = User.objects.create(
+                username=username,
+                password=make_password(self.password),
+                role=User.Role.SURVEY_MANAGER,
+                is_staff=True,
+            )
+        return manager
+
+    def create_users(self) -> list:
+        """Create the participants; returns their ids."""
+        # Hashing is slow by design, so every user shares one hash
+        password = make_password(self.password)
+        return self.insert(
+            User,
+            [
+                {
+                    "username": f"{self.prefix}_user_{index}",
+                    "email": f"{self.prefix}_user_{index}@example.com",
+                    "password": password,
+                    "role": User.Role.PARTICIPANT,
+                }
+                for index in range(self.user_count)
+            ],
+        )
+
+    # Survey structure
+
+    def create_survey(self, index, manager):
+        survey = Survey(
+            title=f"{self.prefix} survey {self.seed}-{index}",
+            description=self.sentence(8, 20),
+            created_by=manager,
+        )
+        self.bulk_create(Survey, [survey])
+        self.backdate([survey], created_at=self.start, updated_at=self.start)
+
+        sections = self.bulk_create(
+            Section,
+            (
+                Section(survey=survey, title=f"Section {number}", order=number)
+                for number in range(1, self.section_count + 1)
+            ),
+        )
+
+        questions = []
+        for section in sections:
+            types = [
+                t for t, count in self.question_counts.items() for _ in range(count)
+            ]
+            self.rng.shuffle(types)
+            for order, question_type in enumerate(types, start=1):
+                questions.append(
+                    Question(
+                        section=section,
+                        text=f"{question_type.label} question: {self.sentence(4, 10)}",
+                        question_type=question_type,
+                        order=order,
+                        identifier=f"q{section.order}_{order}",
+                    )
+                )
+        self.bulk_create(Question, questions)
+
+        choices = self.bulk_create(
+            QuestionChoice,
+            (
+                QuestionChoice(
+                    question=question,
+                    value=f"option_{number}",
+                    label=f"Option {number}",
+                    order=number,
+                )
+                for question in questions
+                if question.question_type in CHOICE_TYPES
+                for number in range(1, self.choice_count + 1)
+            ),
+        )
+        self.choices = {}
+        for choice in choices:
+            self.choices.setdefault(choice.question_id, []).append(choice)
+        self.survey_questions = questions
+        self.rules = self.create_logic(questions)
+        return survey
+
+    def create_logic(self, questions):
+        """
+        Create the rule chains. Returns the `(action, trigger id, value,
+        excluded value)` rules of each target question.
+        """
+        candidates = [q for q in questions if q.question_type in SINGLE_CHOICE_TYPES]
+        chain_count = min(
+            -(-self.logic_rules // self.logic_depth),
+            len(candidates) // (self.logic_depth + 1),
+        )
+        picked = self.rng.sample(candidates, chain_count * (self.logic_depth + 1))
+        position = {q.id: index for index, q in enumerate(questions)}
+
+        logics, excluded = [], []
+        rules = {}
+        remaining = self.logic_rules
+        for number in range(chain_count):
+            start = number * (self.logic_depth + 1)
+            chain = sorted(
+                picked[start : start + self.logic_depth + 1],
+                key=lambda q: position[q.id],
+            )
+            for trigger, target in zip(chain, chain[1:], strict=False):
+                if remaining <= 0:
+                    break
+                value = self.rng.choice(self.choices[trigger.id]).value
+                logic = QuestionLogic(
+                    trigger_question=trigger,
+                    target_question=target,
+                    operator=QuestionLogic.OperatorChoices.EQUALS,
+                    value=value,
+                    action=QuestionLogic.ActionChoices.SHOW,
+                )
+                logics.append(logic)
+                rule = (logic.action, trigger.id, value, None)
+                rules.setdefault(target.id, []).append(rule)
+                remaining -= 1
+
+            last = chain[-1]
+            if number % 2 and remaining > 0:
+                trigger = chain[0]
+                value = self.choices[trigger.id][0].value
+                choice = self.choices[last.id][-1]
+                logic = QuestionLogic(
+                    trigger_question=trigger,
+                    target_question=last,
+                    operator=QuestionLogic.OperatorChoices.NOT_EQUALS,
+                    value=value,
+                    action=QuestionLogic.ActionChoices.EXCLUDE_CHOICES,
+                )
+                logics.append(logic)
+                excluded.append((logic, choice))
+                rule = (logic.action, trigger.id, value, choice.value)
+                rules.setdefault(last.id, []).append(rule)
+                remaining -= 1
+
+        self.bulk_create(QuestionLogic, logics)
+        through = QuestionLogic.target_choices.through
+        self.bulk_create(
+            through,
+            (
+                through(questionlogic_id=logic.id, questionchoice_id=choice.id)
+                for logic, choice in excluded
+            ),
+        )
+        return rules
+
+    # Invitations
+
+    def create_invitations(self, survey, manager) -> list:
+        """Create the invitation batch of `survey`; returns the clicked ids."""
+        if not self.invitation_count:
+            return []
+        statuses, weights = zip(*INVITATION_STATUSES, strict=True)
+        sent_at = self.past()
+        rows = [
+            {
+                "email": f"{self.prefix}_{survey.id}_{index}@example.com",
+                "token": uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                "status": self.rng.choices(statuses, weights)[0],
+                "sent_at": sent_at,
+            }
+            for index in range(self.invitation_count)
+        ]
+        counts = dict.fromkeys(statuses, 0)
+        for row in rows:
+            counts[row["status"]] += 1
+            if row["status"] == Invitation.Status.FAILED:
+                row["error_message"] = "Mailbox unavailable"
+
+        batch = InvitationBatch(
+            survey=survey,
+            created_by=manager,
+            status=InvitationBatch.Status.COMPLETED,
+            total_count=len(rows),
+            sent_count=len(rows) - counts[Invitation.Status.FAILED],
+            failed_count=counts[Invitation.Status.FAILED],
+            clicked_count=counts[Invitation.Status.CLICKED],
+        )
+        self.bulk_create(InvitationBatch, [batch])
+        self.backdate([batch], created_at=sent_at, updated_at=sent_at)
+        for row in rows:
+            row["batch_id"] = batch.id
+        ids = self.insert(Invitation, rows)
+        return [
+            pk
+            for pk, row in zip(ids, rows, strict=True)
+            if row["status"] == Invitation.Status.CLICKED
+        ]
+
+    # Submissions
+
+    def create_submissions(self, survey, user_ids, clicked_ids):
+        for start in range(0, self.submission_count, self.batch_size):
+            count = min(self.batch_size, self.submission_count - start)
+            submissions, answer_sets = [], []
+            for index in range(start, start + count):
+                completed = self.rng.random() < self.completion_rate
+                answers, progress = self.answer_survey(completed)
+                started_at = self.past()
+                # Answered within the hour
+                completed_at = (
+                    started_at + timedelta(minutes=self.rng.uniform(1, 60))
+                    if completed
+                    else None
+                )
+                submissions.append(
+                    {
+                        "survey_id": survey.id,
+                        "user_id": (
+                            self.rng.choice(user_ids)
+                            if user_ids and index % 5
+                            else None
+                        ),
+                        "invitation_id": (
+                            clicked_ids[index] if index < len(clicked_ids) else None
+                        ),
+                        "status": (
+                            Submission.Status.COMPLETED
+                            if completed
+                            else Submission.Status.IN_PROGRESS
+                        ),
+                        "progress": progress,
+                        "started_at": started_at,
+                        "updated_at": completed_at or started_at,
+                        "completed_at": completed_at,
+                    }
+                )
+                answer_sets.append(answers)
+
+            ids = self.insert(Submission, submissions)
+            for submission_id, answers in zip(ids, answer_sets, strict=True):
+                for answer in answers:
+                    answer["submission_id"] = submission_id
+            self.insert(Answer, [a for answers in answer_sets for a in answers])
+
+    def answer_survey(self, completed):
+        """
+        Answer the survey in question order, skipping the questions hidden by
+        earlier answers, and stopping early unless `completed`. Returns the
+        answer rows and the progress.
+        """
+        values = {}
+        answers = []
+        questions = self.survey_questions
+        stop = len(questions) if completed else self.rng.randint(0, len(questions))
+        visible = 0
+        for index, question in enumerate(questions):
+            if not self.is_visible(question, values):
+                continue
+            visible += 1
+            if index >= stop:
+                continue
+            value = self.answer_value(question, values)
+            values[question.id] = value
+            answers.append(
+                {
+                    "question_id": question.id,
+                    "value": value,
+                    **typed_values(question.question_type, value),
+                }
+            )
+        progress = round(100 * len(answers) / visible, 2) if visible else 100
+        return answers, progress
+
+    def is_visible(self, question, values):
+        show_values = [
+            (trigger_id, value)
+            for action, trigger_id, value, _ in self.rules.get(question.id, [])
+            if action == QuestionLogic.ActionChoices.SHOW
+        ]
+        return not show_values or any(
+            values.get(trigger_id) == value for trigger_id, value in show_values
+        )
+
+    def answer_value(self, question, values):
+        question_type = question.question_type
+        if question_type == QuestionType.TEXT:
+            return self.sentence(3, 12)
+        if question_type == QuestionType.NUMBER:
+            return max(0, round(self.rng.gauss(40, 12)))
+        if question_type == QuestionType.DATE:
+            day = self.end.date() - timedelta(days=self.rng.randrange(3 * 365))
+            return day.isoformat()
+
+        options = [choice.value for choice in self.choices[question.id]]
+        for action, trigger_id, value, excluded in self.rules.get(question.id, []):
+            if action == QuestionLogic.ActionChoices.EXCLUDE_CHOICES:
+                trigger_value = values.get(trigger_id)
+                if trigger_value is not None and trigger_value != value:
+                    options.remove(excluded)
+        # Earlier options are more popular, like real answers
+        weights = [1 / rank for rank in range(1, len(options) + 1)]
+        if question_type == QuestionType.CHECKBOX:
+            picked = set(self.rng.choices(options, weights, k=self.rng.randint(1, 3)))
+            return [option for option in options if option in picked]
+        return self.rng.choices(options, weights)[0]
+
+    def sentence(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return " ".join(words).capitalize()
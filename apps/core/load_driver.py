@@ -0,0 +1,379 @@
+import asyncio
+import json
+import math
+import random
+import ssl
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from apps.submissions.services import SubmissionValidatorService
+
+from .load_data import WORDS
+
+# Failed requests: connection errors and timeouts, truncated or malformed
+# responses, and error statuses
+REQUEST_ERRORS = (OSError, TimeoutError, EOFError, ValueError)
+
+# Endpoints of the participant journey, in order, as reported
+ENDPOINTS = (
+    "login",
+    "survey_data",
+    "submission_create",
+    "submission_autosave",
+    "submission_complete",
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+
+
+class HTTPConnection:
+    """
+    A minimal HTTP/1.1 client for JSON APIs over one keep-alive connection,
+    like a participant's browser, using asyncio streams so no extra
+    dependency is needed.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self.prefix = url.path.rstrip("/")
+        self.host_header = url.netloc
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl
+        )
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, data=None, token=None):
+        """Send a request; returns the decoded JSON body, or raises `HTTPError`."""
+        body = b"" if data is None else json.dumps(data).encode()
+        lines = [
+            f"{method} {self.prefix}{path} HTTP/1.1",
+            f"Host: {self.host_header}",
+            "Accept: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if data is not None:
+            lines.append("Content-Type: application/json")
+        if token:
+            lines.append(f"Authorization: Token {token}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+        # A reused connection may have been closed by the server meanwhile;
+        # retry once on a new one if nothing was read yet
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                await self.connect()
+            try:
+                self.writer.write(head + body)
+                await self.writer.drain()
+                status, payload = await asyncio.wait_for(
+                    self.read_response(), self.timeout
+                )
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if not reused or attempt:
+                    raise
+            except BaseException:
+                await self.close()
+                raise
+
+        if status >= 400:
+            raise HTTPError(status, payload)
+        return json.loads(payload) if payload else None
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while line := (await self.reader.readline()).strip():
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            payload = b""
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                payload += await self.reader.readexactly(size)
+                await self.reader.readline()
+            await self.reader.readline()
+        elif "content-length" in headers:
+            payload = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            payload = await self.reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, payload
+
+
+def percentile(values, p):
+    """The nearest-rank `p`th percentile of sorted `values`."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class LatencyStats:
+    """Latencies and errors of the requests, by endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, elapsed, error=None):
+        self.latencies[endpoint].append(elapsed)
+        if error is not None:
+            kind = f"HTTP {error.status}" if isinstance(error, HTTPError) else "error"
+            self.errors[endpoint][kind] += 1
+
+    def summary(self) -> dict:
+        rows = {}
+        for endpoint in ENDPOINTS:
+            latencies = sorted(self.latencies[endpoint])
+            if not latencies:
+                continue
+            errors = sum(self.errors[endpoint].values())
+            rows[endpoint] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": errors / len(latencies),
+                "error_kinds": dict(self.errors[endpoint]),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1],
+            }
+        return rows
+
+
+def answer_schema(schema, rng) -> dict:
+    """
+    Answers to a rendered survey schema (`Survey.get_cached_schema`), in
+    question order. Only the questions visible under its logic rules are
+    answered, with the choices the rules allow, using the rules of
+    `SubmissionValidatorService` itself.
+    """
+    questions = schema["questions_map"]
+    answers = {}
+    # An answer may hide or show an earlier question, so repeat until stable
+    for _ in range(3):
+        changed = False
+        for q_id, question in questions.items():
+            validator = SubmissionValidatorService(schema, answers)
+            visible = validator.is_question_visible(q_id)
+            if visible and q_id not in answers:
+                value = answer_value(question, validator, rng)
+                if value is not None:
+                    answers[q_id] = value
+                    changed = True
+            elif not visible and q_id in answers:
+                del answers[q_id]
+                changed = True
+        if not changed:
+            break
+    return {q_id: answers[q_id] for q_id in questions if q_id in answers}
+
+
+def answer_value(question, validator, rng):
+    question_type = question["type"]
+    if question_type == "text":
+        return " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+    if question_type == "number":
+        return rng.randint(0, 100)
+    if question_type == "date":
+        return (date.today() - timedelta(days=rng.randint(0, 3 * 365))).isoformat()
+
+    allowed = validator.allowed_choices(question)
+    if allowed is None:
+        allowed = {str(c["value"]) for c in question["choices"]}
+    allowed = sorted(allowed)
+    if not allowed:
+        return None
+    if question_type == "checkbox":
+        return rng.sample(allowed, rng.randint(1, min(3, len(allowed))))
+    return rng.choice(allowed)
+
+
+def split(items, parts) -> list:
+    """Split `items` into `parts` consecutive, nearly equal lists."""
+    size, extra = divmod(len(items), parts)
+    chunks, start = [], 0
+    for index in range(parts):
+        end = start + size + (index < extra)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+class LoadDriver:
+    """
+    Drives a live server through the participant journey with `concurrency`
+    virtual participants: a knox login, then for each journey the survey
+    data, a new submission, `autosaves` PATCHes with more answers each and a
+    final PATCH completing it.
+
+    Participants start spread over `ramp_up` seconds and pause a random
+    think time around `think_time` seconds between requests. They keep
+    starting journeys for `duration` seconds, or until each completed
+    `journeys`.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        survey_id,
+        credentials,
+        concurrency=10,
+        ramp_up=0,
+        think_time=1,
+        autosaves=3,
+        duration=60,
+        journeys=None,
+        seed=0,
+        timeout=30,
+    ):
+        self.base_url = base_url
+        self.survey_id = survey_id
+        self.credentials = credentials
+        self.concurrency = concurrency
+        self.ramp_up = ramp_up
+        self.think_time = think_time
+        self.autosaves = autosaves
+        self.duration = duration
+        self.journeys = journeys
+        self.seed = seed
+        self.timeout = timeout
+        self.stats = LatencyStats()
+        self.completed = 0
+        self.elapsed = 0
+
+    def run(self) -> dict:
+        """Run the load test; returns the `LatencyStats` summary."""
+        return asyncio.run(self.drive())
+
+    async def drive(self):
+        started = time.monotonic()
+        self.deadline = started + self.duration
+        await asyncio.gather(
+            *(self.participant(index) for index in range(self.concurrency))
+        )
+        self.elapsed = time.monotonic() - started
+        return self.stats.summary()
+
+    async def call(self, endpoint, connection, method, path, data=None, token=None):
+        start = time.perf_counter()
+        try:
+            response = await connection.request(method, path, data, token)
+        except (*REQUEST_ERRORS, HTTPError) as e:
+            self.stats.record(endpoint, time.perf_counter() - start, e)
+            raise
+        self.stats.record(endpoint, time.perf_counter() - start)
+        return response
+
+    async def think(self, rng):
+        if self.think_time:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * self.think_time)
+
+    async def participant(self, index):
+        rng = random.Random(f"{self.seed}:{index}")
+        if self.ramp_up:
+            await asyncio.sleep(self.ramp_up * index / self.concurrency)
+        username, password = self.credentials[index % len(self.credentials)]
+        connection = HTTPConnection(self.base_url, self.timeout)
+        token = None
+        journeys = 0
+        try:
+            while time.monotonic() < self.deadline and (
+                self.journeys is None or journeys < self.journeys
+            ):
+                journeys += 1
+                try:
+                    if token is None:
+                        response = await self.call(
+                            "login",
+                            connection,
+                            "POST",
+                            "/api/users/auth/login/",
+                            {"username": username, "password": password},
+                        )
+                        token = response["token"]
+                        await self.think(rng)
+                    await self.journey(connection, token, rng)
+                    self.completed += 1
+                except HTTPError as e:
+                    if e.status == 401:
+                        token = None
+                except REQUEST_ERRORS:
+                    pass
+                await self.think(rng)
+        finally:
+            await connection.close()
+
+    async def journey(self, connection, token, rng):
+        schema = await self.call(
+            "survey_data",
+            connection,
+            "GET",
+            f"/api/surveys/{self.survey_id}/data/",
+            token=token,
+        )
+        answers = [
+            {"question": int(q_id), "value": value}
+            for q_id, value in answer_schema(schema, rng).items()
+        ]
+        first, *autosaves, last = split(answers, self.autosaves + 2)
+        await self.think(rng)
+
+        submission = await self.call(
+            "submission_create",
+            connection,
+            "POST",
+            "/api/submissions/",
+            {"survey": self.survey_id, "answers": first},
+            token,
+        )
+        path = f"/api/submissions/{submission['id']}/"
+        for chunk in autosaves:
+            await self.think(rng)
+            await self.call(
+                "submission_autosave",
+                connection,
+                "PATCH",
+                path,
+                {"answers": chunk},
+                token,
+            )
+        await self.think(rng)
+        await self.call(
+            "submission_complete",
+            connection,
+            "PATCH",
+            path,
+            {"answers": last, "is_completed": True},
+            token,
+        )
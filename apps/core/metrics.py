@@ -0,0 +1,195 @@
+import hmac
+import os
+import time
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+# Requests
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by view and action (or method).",
+    ["view", "action"],
+)
+REQUESTS = Counter(
+    "http_requests",
+    "Requests handled, by view, action (or method) and status code.",
+    ["view", "action", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by a request, by view and action (or method).",
+    ["view", "action"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, float("inf")),
+)
+SCHEMA_CACHE = Counter(
+    "survey_schema_cache_lookups",
+    "Survey schema lookups (`Survey.get_cached_schema`), by result (hit/miss).",
+    ["result"],
+)
+VALIDATION_FAILURES = Counter(
+    "submission_validation_failures",
+    "Submissions rejected by `SubmissionValidatorService`, by reason.",
+    ["reason"],
+)
+THROTTLE_REJECTIONS = Counter(
+    "throttle_rejections",
+    "Requests rejected by a rate throttle, by throttle class.",
+    ["throttle"],
+)
+
+# Celery tasks
+
+TASK_RUNTIME = Histogram(
+    "celery_task_runtime_seconds",
+    "Time to run a task, by task and final state.",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, float("inf")),
+)
+TASK_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time a task waited in the queue after it was published (or its ETA).",
+    ["task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, float("inf")),
+)
+EXPORT_ROWS = Counter(
+    "report_export_rows",
+    "Rows written into report exports, by compression.",
+    ["compression"],
+)
+EMAILS = Counter(
+    "invitation_emails",
+    "Invitation and reminder emails sent, by kind and result (sent/failed).",
+    ["kind", "result"],
+)
+
+# Start time of the running tasks, by task id
+_task_starts = {}
+
+
+def get_registry():
+    """
+    The registry to expose: with `PROMETHEUS_MULTIPROC_DIR` set (gunicorn
+    or prefork Celery workers), one collecting the metrics of every process.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """
+    The metrics in Prometheus text format, behind `METRICS_TOKEN`. Without a
+    token they are only served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden()
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+class QueryCounter:
+    """Counts the queries run on any database (see `QueryRecorder`)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Records the latency, status and query count of each request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view, action = getattr(request, "metrics_labels", ("unresolved", "none"))
+        REQUEST_LATENCY.labels(view, action).observe(elapsed)
+        REQUEST_QUERIES.labels(view, action).observe(counter.count)
+        REQUESTS.labels(view, action, response.status_code).inc()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        method = request.method.lower()
+        actions = getattr(view_func, "actions", None) or {}
+        request.metrics_labels = (
+            request.resolver_match.view_name,
+            actions.get(method, method),
+        )
+
+
+def stamp_published(headers=None, **kwargs):
+    """`before_task_publish` receiver stamping when the task was queued."""
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+def start_task_timer(task_id=None, task=None, **kwargs):
+    """`task_prerun` receiver recording the queue wait and start of the task."""
+    if not settings.METRICS_ENABLED:
+        return
+    _task_starts[task_id] = time.perf_counter()
+
+    published_at = getattr(task.request, "published_at", None)
+    if published_at is None:
+        return
+    if task.request.eta:
+        published_at = max(
+            published_at, datetime.fromisoformat(task.request.eta).timestamp()
+        )
+    TASK_QUEUE_WAIT.labels(task.name).observe(max(time.time() - published_at, 0))
+
+
+def stop_task_timer(task_id=None, task=None, state=None, **kwargs):
+    """`task_postrun` receiver recording the runtime of the task."""
+    start = _task_starts.pop(task_id, None)
+    if start is not None:
+        TASK_RUNTIME.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - start
+        )
+
+
+def start_worker_metrics_server(sender=None, **kwargs):
+    """
+    `worker_ready` receiver serving the worker's metrics on
+    `WORKER_METRICS_PORT` (any path, e.g. `/metrics`).
+    """
+    port = settings.WORKER_METRICS_PORT
+    if settings.METRICS_ENABLED and port:
+        start_http_server(port, registry=get_registry())
@@ -0,0 +1,12 @@
+from .audit import buffered_audit_log
+
+
+class AuditLogBufferMiddleware:
+    """Saves the audit log entries of a request together once it is handled."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_audit_log():
+            return self.get_response(request)
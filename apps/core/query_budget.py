@@ -0,0 +1,213 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from apps.core.timing import sampled
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = str(Path(__file__).resolve().parent.parent.parent) + os.sep
+APPS_DIR = f"{ROOT_DIR}apps{os.sep}"
+
+# Lists of placeholders of any length, e.g. `IN (%s, %s)`, count as one shape
+PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+# Recorders of the running tasks, by task id
+_task_recorders = {}
+
+# True inside `allow_repeats` blocks
+_repeats_allowed = ContextVar("query_repeats_allowed", default=False)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def call_site():
+    """The innermost frame of the project's code (`apps/`) as "path:line"."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APPS_DIR) and filename != __file__:
+            return f"{filename.removeprefix(ROOT_DIR)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+@contextmanager
+def allow_repeats():
+    """
+    Don't report the queries run inside the block as repeated, for loops
+    that run the same query once per batch on purpose. They still count
+    towards the budget.
+
+        with allow_repeats():
+            for chunk in batched(rows, 1000):
+                Model.objects.bulk_create(chunk)
+    """
+    token = _repeats_allowed.set(True)
+    try:
+        yield
+    finally:
+        _repeats_allowed.reset(token)
+
+
+class QueryRecorder:
+    """
+    Records the shape (the SQL without its parameters) and call site of the
+    queries run on any database inside the block. Uses `execute_wrapper`,
+    so it works without DEBUG.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if _repeats_allowed.get():
+            # Counted, without a call site so it is never reported as repeated
+            self.queries.append((None, None))
+        else:
+            self.queries.append((PLACEHOLDER_LIST.sub("(...)", sql), call_site()))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold) -> list:
+        """
+        The `(count, shape, site)` of the queries run `threshold` times or
+        more from the same place in the project's code, likely an N+1.
+        """
+        return [
+            (count, shape, site)
+            for (shape, site), count in Counter(self.queries).most_common()
+            if count >= threshold and site is not None
+        ]
+
+
+def find_problems(recorder, budget=None, repeat_threshold=None) -> list:
+    threshold = repeat_threshold or settings.QUERY_REPEAT_THRESHOLD
+    problems = []
+    if budget is not None and len(recorder) > budget:
+        problems.append(f"{len(recorder)} queries, over the budget of {budget}")
+    for count, shape, site in recorder.repeated(threshold):
+        problems.append(f"{count} similar queries from {site}: {shape[:300]}")
+    return problems
+
+
+def check_queries(recorder, label, budget=None):
+    """
+    Report the queries of `recorder` going over `budget` or repeated (see
+    `QueryRecorder.repeated`): raise `QueryBudgetExceeded` with
+    `QUERY_BUDGET_RAISE` (by default in DEBUG), otherwise log a warning.
+    """
+    problems = find_problems(recorder, budget)
+    if not problems:
+        return
+    message = f"{label}: " + "; ".join(problems)
+    strict = settings.QUERY_BUDGET_RAISE
+    if strict is None:
+        strict = settings.DEBUG
+    if strict:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+@contextmanager
+def assert_query_budget(budget=None, repeat_threshold=None):
+    """
+    Test helper: fail when the block runs more than `budget` queries, or
+    repeats a query `repeat_threshold` times from one place.
+
+        with assert_query_budget(5):
+            self.client.get(url)
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = find_problems(recorder, budget, repeat_threshold)
+    if problems:
+        raise AssertionError("\n".join(problems))
+
+
+def view_budget(view_func, method):
+    """
+    The `query_budget` declared on a view (or its class): a number, or a
+    dict by action or HTTP method like `throttle_map`.
+    """
+    view_class = getattr(view_func, "cls", None) or getattr(
+        view_func, "view_class", None
+    )
+    budget = getattr(view_class, "query_budget", None)
+    if budget is None:
+        budget = getattr(view_func, "query_budget", None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, "actions", None) or {}
+        action = actions.get(method.lower())
+        budget = budget.get(action, budget.get(method.lower()))
+    return settings.QUERY_BUDGET_DEFAULT if budget is None else budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Checks the queries of a `QUERY_BUDGET_SAMPLE_RATE` share of the requests
+    against the view's `query_budget` and for repeated queries (see
+    `check_queries`).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not sampled(settings.QUERY_BUDGET_SAMPLE_RATE):
+            return self.get_response(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        check_queries(
+            recorder,
+            f"{request.method} {request.path}",
+            getattr(request, "query_budget", settings.QUERY_BUDGET_DEFAULT),
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = view_budget(view_func, request.method)
+
+
+def record_task_queries(task_id=None, task=None, **kwargs):
+    """
+    `task_prerun` receiver recording the queries of a
+    `QUERY_BUDGET_SAMPLE_RATE` share of the tasks.
+    """
+    if sampled(settings.QUERY_BUDGET_SAMPLE_RATE):
+        recorder = _task_recorders[task_id] = QueryRecorder()
+        recorder.__enter__()
+
+
+def check_task_queries(task_id=None, task=None, **kwargs):
+    """
+    `task_postrun` receiver checking the queries of the task against its
+    `query_budget` option (e.g. `@app.task(query_budget=10)`).
+    """
+    recorder = _task_recorders.pop(task_id, None)
+    if recorder is None:
+        return
+    recorder.__exit__(None, None, None)
+    check_queries(recorder, f"Task {task.name}", getattr(task, "query_budget", None))
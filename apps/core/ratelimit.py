@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from .redis_client import get_redis
+
+# Refill the bucket for the time elapsed since the last call, then take one
+# token if available. Returns 0 on success, or the milliseconds to wait until
+# a token is available. Uses the Redis clock so all workers agree on time.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+# Generic cell rate algorithm: allows `limit` requests per `period` (in ms)
+# while storing a single value per key, the theoretical arrival time (TAT) of
+# the next request. Every key is checked, with its own limit and period
+# (ARGV pairs), and the request is recorded under all of them only if all
+# allow it. Returns 0 when allowed, otherwise the milliseconds until it would
+# be.
+GCRA_SCRIPT = """
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + tonumber(clock[2]) / 1000
+
+local wait = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2 - 1])
+    local period = tonumber(ARGV[i * 2])
+    local interval = period / limit
+    local tat = math.max(tonumber(redis.call("GET", key)) or now, now)
+    wait = math.max(wait, tat + interval - now - period)
+    tats[i] = tat + interval
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+
+for i, key in ipairs(KEYS) do
+    local tat = tats[i]
+    redis.call("SET", key, string.format("%.3f", tat), "PX", math.ceil(tat - now))
+end
+return 0
+"""
+
+_scripts = {}
+
+
+def _get_script(source, client=None):
+    client = client or get_redis()
+    key = (id(client), source)
+    if key not in _scripts:
+        _scripts[key] = client.register_script(source)
+    return _scripts[key]
+
+
+def gcra(limits, client=None) -> float:
+    """
+    Count a request against every `(key, limit, period)` of `limits` (`limit`
+    requests per `period` seconds) in one atomic Redis call. Returns 0 if all
+    allow the request, otherwise the seconds to wait until they all do (the
+    request isn't counted).
+    """
+    if not limits:
+        return 0
+    keys, args = [], []
+    for key, limit, period in limits:
+        keys.append(key)
+        args += [limit, period * 1000]
+    wait = _get_script(GCRA_SCRIPT, client)(keys=keys, args=args)
+    return int(wait) / 1000
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter stored in Redis and shared by every process.
+
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `capacity` (defaults to `rate`). A non-positive `rate` disables limiting.
+    """
+
+    def __init__(self, key, rate, capacity=None, client=None):
+        self.key = f"ratelimit:{key}"
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.client = client
+
+    def try_acquire(self) -> float:
+        """Take a token; return 0 on success or the seconds to wait otherwise."""
+        if self.rate <= 0:
+            return 0
+        script = _get_script(TOKEN_BUCKET_SCRIPT, self.client)
+        wait = script(keys=[self.key], args=[self.rate, self.capacity])
+        return int(wait) / 1000
+
+    def acquire(self):
+        """Block until a token is available."""
+        while wait := self.try_acquire():
+            time.sleep(wait)
+
+    async def aacquire(self):
+        """Wait for a token without blocking the event loop."""
+        # The Redis round trip itself is short enough to run inline
+        while wait := self.try_acquire():
+            await asyncio.sleep(wait)
@@ -0,0 +1,12 @@
+import redis
+from django.conf import settings
+
+_clients = {}
+
+
+def get_redis(url=None):
+    """Return a shared Redis client for `url` (defaults to `REDIS_URL`)."""
+    url = url or settings.REDIS_URL
+    if url not in _clients:
+        _clients[url] = redis.Redis.from_url(url)
+    return _clients[url]
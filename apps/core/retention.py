@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from apps.core.query_budget import allow_repeats
+
+
+def expired(model, policy):
+    """The rows of `model` past the retention period of `policy`."""
+    cutoff = now() - timedelta(days=policy["days"])
+    return model._default_manager.filter(
+        **policy.get("filter", {}), **{f"{policy['field']}__lt": cutoff}
+    )
+
+
+def apply_policy(label, batch_size=None, max_batches=None) -> tuple[int, bool]:
+    """
+    Delete (or hand to the policy's "archiver") the expired rows of the model
+    `label` of `RETENTION_POLICIES`, `batch_size` rows per transaction and
+    at most `max_batches` transactions, so locks and the WAL stay small.
+
+    Returns the number of rows processed and whether any are left.
+    """
+    policy = settings.RETENTION_POLICIES[label]
+    if not policy.get("days"):
+        return 0, False
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    max_batches = max_batches or settings.RETENTION_MAX_BATCHES
+
+    model = apps.get_model(label)
+    archiver = policy.get("archiver")
+    if archiver:
+        archiver = import_string(archiver)
+
+    total = 0
+    with allow_repeats():
+        for _ in range(max_batches):
+            with transaction.atomic():
+                ids = list(
+                    expired(model, policy)
+                    .order_by("pk")
+                    .select_for_update(skip_locked=True)
+                    .values_list("pk", flat=True)[:batch_size]
+                )
+                if not ids:
+                    return total, False
+                if archiver:
+                    archiver(ids)
+                else:
+                    model._default_manager.filter(pk__in=ids).delete()
+            total += len(ids)
+    return total, True
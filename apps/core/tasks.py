@@ -0,0 +1,46 @@
+import logging
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.core import serializers
+
+from config.celery import app
+
+from .retention import apply_policy
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(bind=True, max_retries=3)
+def write_audit_log(self, data):
+    """Save audit log entries serialized by `buffered_audit_log`."""
+    try:
+        entries = [item.object for item in serializers.deserialize("json", data)]
+        LogEntry.objects.bulk_create(entries)
+    except Exception as e:
+        logger.error(f"Error writing audit log entries: {e}")
+        raise self.retry(exc=e) from e
+
+
+@app.task(bind=True, max_retries=3)
+def apply_retention_policies(self):
+    """Queue one `apply_retention_policy` run per `RETENTION_POLICIES` model."""
+    for label in settings.RETENTION_POLICIES:
+        apply_retention_policy.delay(label)
+
+
+@app.task(bind=True, max_retries=3, default_retry_delay=60)
+def apply_retention_policy(self, label):
+    """
+    Process a bounded number of expired rows of one model, then continue in
+    a new task while rows are left, so each run stays short.
+    """
+    try:
+        processed, remaining = apply_policy(label)
+        if processed:
+            logger.info(f"Retention policy of {label} processed {processed} rows")
+        if remaining:
+            apply_retention_policy.delay(label)
+    except Exception as e:
+        logger.error(f"Error applying the retention policy of {label}: {e}")
+        raise self.retry(exc=e) from e
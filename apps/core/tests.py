@@ -0,0 +1,470 @@
+import shutil
+import tempfile
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+import redis
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.communications.models import Invitation, InvitationBatch
+from apps.communications.services import ingest_invitations
+from apps.core import throttling
+from apps.core.audit import buffered_audit_log
+from apps.core.benchmarks import cases  # noqa: F401  (registers the benchmarks)
+from apps.core.benchmarks.environment import fake_redis
+from apps.core.benchmarks.runner import compare, measure, run_benchmarks, selected
+from apps.core.downloads import protected_file_response
+from apps.core.load_data import LoadDataGenerator
+from apps.core.query_budget import allow_repeats, assert_query_budget
+from apps.core.ratelimit import TokenBucket, gcra
+from apps.core.redis_client import get_redis
+from apps.core.throttling import ActionBasedThrottle, CompositeThrottle
+from apps.core.timing import server_timing, span, timing_spans
+from apps.reports.models import ReportExport
+from apps.submissions.models import Answer, Submission
+from apps.surveys.models import Question, Survey
+from apps.users.models import User
+
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class BufferedAuditLogTests(TestCase):
+    def entries(self, instance):
+        return LogEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_pk=str(instance.pk),
+        )
+
+    def test_changes_outside_a_block_are_logged_once_by_auditlog(self):
+        user = User.objects.create_user(username="outside")
+
+        self.assertEqual(self.entries(user).count(), 1)
+
+    def test_changes_in_a_block_are_logged_once_when_it_exits(self):
+        with buffered_audit_log() as buffered:
+            with self.captureOnCommitCallbacks(execute=True):
+                user = User.objects.create_user(username="buffered")
+                user.first_name = "Changed"
+                user.save()
+            self.assertEqual(len(buffered), 2)
+            self.assertFalse(self.entries(user).exists())
+
+        self.assertQuerySetEqual(
+            self.entries(user).order_by("id").values_list("action", flat=True),
+            [LogEntry.Action.CREATE, LogEntry.Action.UPDATE],
+        )
+
+    def test_deletions_in_a_block_are_logged(self):
+        user = User.objects.create_user(username="deleted")
+        pk = user.pk
+        with buffered_audit_log():
+            with self.captureOnCommitCallbacks(execute=True):
+                user.delete()
+
+        self.assertTrue(
+            LogEntry.objects.filter(
+                object_pk=str(pk), action=LogEntry.Action.DELETE
+            ).exists()
+        )
+
+    def test_excluded_fields_are_not_logged(self):
+        user = User.objects.create_user(username="login")
+        with buffered_audit_log() as buffered:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.last_login = timezone.now()
+                user.save(update_fields=["last_login"])
+
+        self.assertEqual(buffered, [])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with buffered_audit_log() as buffered:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        User.objects.create_user(username="rolled_back")
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        self.assertEqual(buffered, [])
+
+    def test_disable_auditlog_applies_inside_and_around_a_block(self):
+        with buffered_audit_log() as buffered:
+            with self.captureOnCommitCallbacks(execute=True), disable_auditlog():
+                inside = User.objects.create_user(username="disabled_inside")
+        with disable_auditlog(), buffered_audit_log() as around:
+            with self.captureOnCommitCallbacks(execute=True):
+                outside = User.objects.create_user(username="disabled_around")
+
+        self.assertEqual((buffered, around), ([], []))
+        self.assertFalse(self.entries(inside).exists())
+        self.assertFalse(self.entries(outside).exists())
+
+
+class MetricsViewTests(SimpleTestCase):
+    @override_settings(METRICS_TOKEN=None, DEBUG=False)
+    def test_metrics_are_refused_without_a_token_outside_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=True)
+    def test_metrics_are_open_in_debug_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret", DEBUG=False)
+    def test_metrics_need_the_token_when_set(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get(
+            "/metrics", headers={"Authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ProtectedFileResponseTests(SimpleTestCase):
+    content = b"0123456789"
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        name = default_storage.save("exports/report été.csv", ContentFile(self.content))
+        self.file = FieldFile(None, ReportExport._meta.get_field("file"), name)
+
+    def download(self, **headers):
+        request = RequestFactory().get("/download", headers=headers)
+        response = protected_file_response(request, self.file)
+        self.addCleanup(response.close)
+        return response
+
+    def test_whole_file(self):
+        response = self.download()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_byte_range(self):
+        response = self.download(Range="bytes=2-5")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(response["Content-Length"], "4")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+
+    def test_suffix_range(self):
+        response = self.download(Range="bytes=-3")
+
+        self.assertEqual(response["Content-Range"], "bytes 7-9/10")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+
+    def test_unsatisfiable_range(self):
+        response = self.download(Range="bytes=10-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    @override_settings(SENDFILE_BACKEND="nginx", SENDFILE_URL_PREFIX="/protected/")
+    def test_nginx_paths_are_percent_encoded(self):
+        response = self.download()
+
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected/exports/report%20%C3%A9t%C3%A9.csv",
+        )
+        self.assertNotIn("Content-Type", response)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(fake_redis())
+
+    def test_bursts_up_to_the_capacity_then_waits(self):
+        bucket = TokenBucket("test", rate=1, capacity=2)
+
+        waits = [bucket.try_acquire() for _ in range(3)]
+
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertGreater(waits[2], 0)
+        self.assertLessEqual(waits[2], 1)
+
+    def test_processes_share_the_bucket(self):
+        first = TokenBucket("shared", rate=1, capacity=1)
+        second = TokenBucket("shared", rate=1, capacity=1)
+
+        self.assertEqual(first.try_acquire(), 0)
+        self.assertGreater(second.try_acquire(), 0)
+
+    def test_non_positive_rates_disable_the_limit(self):
+        bucket = TokenBucket("off", rate=0)
+
+        self.assertEqual([bucket.try_acquire() for _ in range(5)], [0] * 5)
+
+
+class GCRATests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(fake_redis())
+
+    def test_requests_over_the_limit_wait(self):
+        waits = [gcra([("key", 2, 60)]) for _ in range(3)]
+
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertAlmostEqual(waits[2], 30, delta=1)
+
+    def test_a_denied_request_is_counted_under_no_key(self):
+        gcra([("tight", 1, 60)])
+
+        self.assertGreater(gcra([("loose", 2, 60), ("tight", 1, 60)]), 0)
+
+        self.assertEqual(gcra([("loose", 2, 60)]), 0)
+        self.assertEqual(gcra([("loose", 2, 60)]), 0)
+
+
+def throttle_request(user=None, method="post"):
+    request = Request(getattr(APIRequestFactory(), method)("/"))
+    if user is not None:
+        request.user = user
+    return request
+
+
+class ActionBasedThrottleTests(SimpleTestCase):
+    view = SimpleNamespace(action="create", throttle_map={"create": "2/minute"})
+
+    def setUp(self):
+        self.enterContext(fake_redis())
+
+    def test_the_action_rate_is_applied(self):
+        throttle = ActionBasedThrottle()
+        request = throttle_request()
+
+        allowed = [throttle.allow_request(request, self.view) for _ in range(3)]
+
+        self.assertEqual(allowed, [True, True, False])
+        self.assertAlmostEqual(throttle.wait(), 30, delta=1)
+
+    def test_method_rates_apply_to_views_without_actions(self):
+        view = SimpleNamespace(throttle_map={"get": "1/minute"})
+        throttle = ActionBasedThrottle()
+
+        self.assertTrue(throttle.allow_request(throttle_request(method="get"), view))
+        self.assertFalse(throttle.allow_request(throttle_request(method="get"), view))
+        self.assertTrue(throttle.allow_request(throttle_request(), view))
+
+    def test_requests_are_let_through_when_redis_is_unavailable(self):
+        unavailable = redis.ConnectionError("Connection refused")
+        throttle = ActionBasedThrottle()
+
+        with mock.patch("apps.core.throttling.gcra", side_effect=unavailable):
+            allowed = [
+                throttle.allow_request(throttle_request(), self.view) for _ in range(3)
+            ]
+
+        self.assertEqual(allowed, [True] * 3)
+        self.assertIsNone(throttle.wait())
+
+
+class CompositeThrottleTests(SimpleTestCase):
+    view = SimpleNamespace(action="create", throttle_map={"create": "1/minute"})
+    user = SimpleNamespace(pk=1, is_authenticated=True)
+
+    def setUp(self):
+        self.enterContext(fake_redis())
+        self.gcra = self.enterContext(
+            mock.patch.object(throttling, "gcra", wraps=throttling.gcra)
+        )
+
+    def test_every_rate_is_checked_in_one_call(self):
+        CompositeThrottle().allow_request(throttle_request(self.user), self.view)
+
+        self.assertEqual(self.gcra.call_count, 1)
+        (limits,), _ = self.gcra.call_args
+        self.assertEqual(
+            [(rate, period) for _, rate, period in limits], [(1000, 86400), (1, 60)]
+        )
+
+    def test_anonymous_requests_also_get_the_anonymous_rate(self):
+        CompositeThrottle().allow_request(throttle_request(), self.view)
+
+        (limits,), _ = self.gcra.call_args
+        # The user rate applies to anonymous requests too, by IP address
+        self.assertEqual([rate for _, rate, _ in limits], [100, 1000, 1])
+
+    def test_denied_requests_count_against_no_rate(self):
+        throttle = CompositeThrottle()
+        self.assertTrue(throttle.allow_request(throttle_request(self.user), self.view))
+        user_key = self.gcra.call_args.args[0][0][0]
+        counted = get_redis().get(user_key)
+
+        allowed = throttle.allow_request(throttle_request(self.user), self.view)
+
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 60, delta=1)
+        self.assertEqual(get_redis().get(user_key), counted)
+
+
+class BenchmarkRunnerTests(TestCase):
+    def test_measure_counts_the_queries_of_each_call(self):
+        calls = []
+
+        def run():
+            calls.append(None)
+            User.objects.exists()
+
+        result = measure(run, iterations=3, warmup=2)
+
+        # The warmup, the timed calls, then one traced for memory
+        self.assertEqual(len(calls), 6)
+        self.assertEqual((result["iterations"], result["queries"]), (3, 1))
+        self.assertLessEqual(result["min"], result["median"])
+
+    def test_benchmarks_are_selected_by_pattern(self):
+        names = [name for name, _, _ in selected(["schema.*"])]
+
+        self.assertIn("schema.update_schema_cache[sections=5]", names)
+        self.assertTrue(all(name.startswith("schema.") for name in names))
+
+    def test_benchmarks_run_on_generated_data(self):
+        self.enterContext(fake_redis())
+
+        results = run_benchmarks(["schema.get_cached_schema.hit"], 2, warmup=0)
+
+        self.assertEqual(results["schema.get_cached_schema.hit"]["queries"], 0)
+
+    def test_compare_flags_regressions(self):
+        def result(seconds, queries=1, memory=1000):
+            return {"min": seconds, "queries": queries, "peak_memory": memory}
+
+        baseline = {
+            "same": result(1.0),
+            "slower": result(1.0),
+            "more_queries": result(1.0),
+            "gone": result(1.0),
+        }
+        results = {
+            "same": result(1.1),
+            "slower": result(1.5),
+            "more_queries": result(1.0, queries=2),
+            "new": result(1.0),
+        }
+
+        rows = {row[0]: row[-1] for row in compare(baseline, results, threshold=0.2)}
+
+        self.assertEqual(rows, {"same": False, "slower": True, "more_queries": True})
+
+
+class TimingSpansTests(TestCase):
+    def test_spans_of_the_same_name_add_up(self):
+        with timing_spans() as spans:
+            for _ in range(2):
+                with span("work"):
+                    User.objects.exists()
+
+        self.assertEqual((spans["work"][1], spans["db"][1]), (2, 2))
+        self.assertGreater(spans["work"][0], 0)
+
+    def test_spans_outside_a_timed_request_are_ignored(self):
+        with span("work"):
+            pass
+
+        with timing_spans() as spans:
+            pass
+        self.assertEqual(spans, {})
+
+    def test_server_timing_header(self):
+        header = server_timing({"db": [0.0123, 3], "auth": [0.001, 1]}, 0.05)
+
+        self.assertEqual(header, 'total;dur=50.0, db;dur=12.3;desc="3x", auth;dur=1.0')
+
+
+class QueryBudgetTests(TestCase):
+    def test_queries_repeated_from_one_line_are_reported(self):
+        with self.assertRaisesMessage(AssertionError, "10 similar queries"):
+            with assert_query_budget(repeat_threshold=10):
+                for index in range(10):
+                    User.objects.filter(id=index).exists()
+
+    def test_batched_queries_are_not_reported_as_repeated(self):
+        manager = User.objects.create_user(username="manager")
+        survey = Survey.objects.create(title="Survey", created_by=manager)
+        batch = InvitationBatch.objects.create(survey=survey)
+        emails = [f"user{index}@example.com" for index in range(60)]
+
+        # One insert per chunk, in a savepoint as each chunk commits on its own
+        with assert_query_budget(36, repeat_threshold=10):
+            counts = ingest_invitations(batch, emails, batch_size=5)
+
+        self.assertEqual(counts["accepted"], 60)
+        self.assertEqual(batch.invitations.count(), 60)
+
+    def test_batched_queries_count_towards_the_budget(self):
+        with self.assertRaisesMessage(AssertionError, "over the budget of 1"):
+            with assert_query_budget(1), allow_repeats():
+                for index in range(2):
+                    User.objects.filter(id=index).exists()
+
+
+class LoadDataGeneratorTests(TestCase):
+    options = {"users": 5, "invitations": 10, "submissions": 20, "days": 30}
+
+    def generate(self, **options):
+        generator = LoadDataGenerator(**self.options, **options)
+        generator.generate()
+        return generator
+
+    def snapshot(self):
+        return (
+            list(Survey.objects.values_list("created_at", "updated_at")),
+            list(Invitation.objects.order_by("email").values_list("sent_at", "token")),
+            list(
+                Submission.objects.order_by("started_at").values_list(
+                    "status", "progress", "started_at", "updated_at", "completed_at"
+                )
+            ),
+            sorted(Answer.objects.values_list("value", flat=True), key=str),
+        )
+
+    def test_the_same_options_give_the_same_data(self):
+        generator = self.generate()
+        first = self.snapshot()
+        generator.clear()
+        self.generate()
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_dates_fall_before_the_end_date(self):
+        generator = self.generate(end_date=date(2024, 6, 1))
+
+        for started_at, completed_at in Submission.objects.values_list(
+            "started_at", "completed_at"
+        ):
+            self.assertLessEqual(generator.start, started_at)
+            self.assertLess(started_at, generator.end)
+            if completed_at is not None:
+                self.assertGreater(completed_at, started_at)
+        self.assertFalse(
+            Answer.objects.filter(
+                question__question_type=Question.QuestionType.DATE,
+                date_value__gte=date(2024, 6, 1),
+            ).exists()
+        )
+
+    def test_clear_deletes_the_generated_data_only(self):
+        generator = self.generate()
+        other = self.generate(prefix="other")
+
+        generator.clear()
+
+        self.assertEqual(
+            list(Survey.objects.values_list("title", flat=True)),
+            [f"{other.prefix} survey 0-0"],
+        )
+        self.assertEqual(Submission.objects.count(), 20)
+        self.assertFalse(User.objects.filter(username__startswith="load_").exists())
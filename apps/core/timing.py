@@ -0,0 +1,136 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Spans of the request being timed: name -> [seconds, count]. None when the
+# request isn't sampled, so spans cost a context variable lookup.
+_spans = ContextVar("timing_spans", default=None)
+
+
+def record(name, elapsed):
+    spans = _spans.get()
+    if spans is not None:
+        entry = spans.setdefault(name, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+
+
+@contextmanager
+def span(name):
+    """
+    Time the block as the span `name` of the current request, when it is
+    sampled (see `ServerTimingMiddleware`). Spans of the same name add up, and
+    nested spans are each timed in full.
+    """
+    if _spans.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator timing each call of the function as the span `name`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _spans.get() is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def time_query(execute, sql, params, many, context):
+    """`execute_wrapper` timing the queries as the "db" span."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record("db", time.perf_counter() - start)
+
+
+@contextmanager
+def timing_spans():
+    """Collect the spans, including the queries, run inside the block."""
+    spans = {}
+    token = _spans.set(spans)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(time_query))
+            yield spans
+    finally:
+        _spans.reset(token)
+
+
+def server_timing(spans, total) -> str:
+    """The `Server-Timing` header value of the spans, in milliseconds."""
+    metrics = [f"total;dur={total * 1000:.1f}"]
+    for name, (elapsed, count) in spans.items():
+        metric = f"{name};dur={elapsed * 1000:.1f}"
+        if count > 1:
+            metric += f';desc="{count}x"'
+        metrics.append(metric)
+    return ", ".join(metrics)
+
+
+def sampled(rate) -> bool:
+    """Whether to sample an event, for a sampling `rate` from 0 to 1."""
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class ServerTimingMiddleware:
+    """
+    Times a `SERVER_TIMING_SAMPLE_RATE` share of the requests: the spans
+    (see `span`) and queries of a sampled request are added up and sent in a
+    `Server-Timing` header, and logged as one JSON line.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not sampled(settings.SERVER_TIMING_SAMPLE_RATE):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with timing_spans() as spans:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        response["Server-Timing"] = server_timing(spans, total)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "total_ms": round(total * 1000, 1),
+                    "spans": {
+                        name: {"ms": round(elapsed * 1000, 1), "count": count}
+                        for name, (elapsed, count) in spans.items()
+                    },
+                }
+            )
+        )
+        return response
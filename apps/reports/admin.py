@@ -1,10 +1,32 @@
 from django.contrib import admin
 
-from .models import ReportExport
+from .models import ReportExport, ReportExportChunk
+
+
+class ReportExportChunkInline(admin.TabularInline):
+    model = ReportExportChunk
+    extra = 0
+    readonly_fields = ("number", "file", "size")
 
 
 @admin.register(ReportExport)
 class ReportExportAdmin(admin.ModelAdmin):
-    list_display = ("id", "survey", "created_by", "status", "created_at")
-    list_filter = ("status", "created_at", "survey")
-    readonly_fields = ("file", "created_at", "completed_at", "error_message")
+    list_display = (
+        "id",
+        "survey",
+        "created_by",
+        "status",
+        "compression",
+        "compressed_size",
+        "created_at",
+    )
+    list_filter = ("status", "compression", "created_at", "survey")
+    readonly_fields = (
+        "file",
+        "uncompressed_size",
+        "compressed_size",
+        "created_at",
+        "completed_at",
+        "error_message",
+    )
+    inlines = [ReportExportChunkInline]
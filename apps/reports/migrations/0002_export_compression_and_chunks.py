@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportexport',
+            name='chunk_size',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Split the output into numbered parts of at most this many bytes.', null=True),
+        ),
+        migrations.AddField(
+            model_name='reportexport',
+            name='compressed_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportexport',
+            name='compression',
+            field=models.CharField(choices=[('none', 'None'), ('gzip', 'Gzip'), ('zstd', 'Zstandard')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='reportexport',
+            name='uncompressed_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReportExportChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('file', models.FileField(upload_to='exports/')),
+                ('size', models.PositiveBigIntegerField()),
+                ('export', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='reports.reportexport')),
+            ],
+            options={
+                'verbose_name': 'Report Export Chunk',
+                'verbose_name_plural': 'Report Export Chunks',
+                'ordering': ['number'],
+                'unique_together': {('export', 'number')},
+            },
+        ),
+    ]
@@ -12,12 +12,27 @@ class ReportExport(models.Model):
         COMPLETED = "completed", _("Completed")
         FAILED = "failed", _("Failed")
 
+    class Compression(models.TextChoices):
+        NONE = "none", _("None")
+        GZIP = "gzip", _("Gzip")
+        ZSTD = "zstd", _("Zstandard")
+
     survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name="exports")
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     status = models.CharField(
         max_length=20, choices=Status.choices, default=Status.PENDING
     )
     file = models.FileField(upload_to="exports/", null=True, blank=True)
+    compression = models.CharField(
+        max_length=10, choices=Compression.choices, default=Compression.NONE
+    )
+    chunk_size = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text=_("Split the output into numbered parts of at most this many bytes."),
+    )
+    uncompressed_size = models.PositiveBigIntegerField(null=True, blank=True)
+    compressed_size = models.PositiveBigIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True)
@@ -29,3 +44,21 @@ class ReportExport(models.Model):
 
     def __str__(self):
         return f"Export for {self.survey.title} - {self.status}"
+
+
+class ReportExportChunk(models.Model):
+    export = models.ForeignKey(
+        ReportExport, on_delete=models.CASCADE, related_name="chunks"
+    )
+    number = models.PositiveIntegerField()
+    file = models.FileField(upload_to="exports/")
+    size = models.PositiveBigIntegerField()
+
+    class Meta:
+        verbose_name = _("Report Export Chunk")
+        verbose_name_plural = _("Report Export Chunks")
+        ordering = ["number"]
+        unique_together = ("export", "number")
+
+    def __str__(self):
+        return f"Part {self.number} of export {self.export_id}"
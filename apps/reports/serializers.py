@@ -1,9 +1,19 @@
 from rest_framework import serializers
 
-from .models import ReportExport
+from .models import ReportExport, ReportExportChunk
+
+MIN_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class ReportExportChunkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReportExportChunk
+        fields = ["number", "size"]
 
 
 class ReportExportSerializer(serializers.ModelSerializer):
+    chunks = ReportExportChunkSerializer(many=True, read_only=True)
+
     class Meta:
         model = ReportExport
         fields = [
@@ -12,6 +22,11 @@ class ReportExportSerializer(serializers.ModelSerializer):
             "created_by",
             "status",
             "file",
+            "compression",
+            "chunk_size",
+            "uncompressed_size",
+            "compressed_size",
+            "chunks",
             "created_at",
             "completed_at",
             "error_message",
@@ -21,7 +36,16 @@ class ReportExportSerializer(serializers.ModelSerializer):
             "created_by",
             "status",
             "file",
+            "uncompressed_size",
+            "compressed_size",
             "created_at",
             "completed_at",
             "error_message",
         ]
+
+    def validate_chunk_size(self, value):
+        if value is not None and value < MIN_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f"Chunk size must be at least {MIN_CHUNK_SIZE} bytes."
+            )
+        return value
@@ -1,12 +1,14 @@
 import logging
 
-from django.core.files.base import ContentFile
+from django.core.files import File
 from django.utils.timezone import now
 
-from apps.reports.models import ReportExport
+from apps.reports.models import ReportExport, ReportExportChunk
 from apps.submissions.models import Submission
 from config.celery import app
 
+from .exporters import EXTENSIONS, PartWriter, stream_csv
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,24 +21,48 @@ def generate_survey_report_csv(self, export_id):
         export.status = ReportExport.Status.PROCESSING
         export.save()
 
+        # Drop parts left behind by a previous failed attempt, with their files
+        for chunk in export.chunks.all():
+            chunk.file.delete(save=False)
+        export.chunks.all().delete()
+
         survey = export.survey
 
         # Initialize resource with survey context
         resource = SubmissionResource(survey=survey)
 
         # Get queryset with prefetched answers for efficiency
-        queryset = Submission.objects.filter(survey=survey).prefetch_related(
-            "answers", "user"
+        queryset = (
+            Submission.objects.filter(survey=survey)
+            .select_related("user")
+            .prefetch_related("answers")
+            .order_by("pk")
         )
 
-        # Use tablib to export
-        dataset = resource.export(queryset)
-        csv_data = dataset.csv
+        # Stream rows through the compressor into temporary part files
+        sink = PartWriter(chunk_size=export.chunk_size)
+        try:
+            export.uncompressed_size = stream_csv(
+                resource, queryset, sink, export.compression
+            )
+            export.compressed_size = sink.size
 
-        # Save to file field
-        content_file = ContentFile(csv_data.encode("utf-8-sig"))
-        filename = f"report_{survey.id}_{now().strftime('%Y%m%d_%H%M%S')}.csv"
-        export.file.save(filename, content_file, save=False)
+            filename = (
+                f"report_{survey.id}_{now().strftime('%Y%m%d_%H%M%S')}.csv"
+                f"{EXTENSIONS[export.compression]}"
+            )
+            if export.chunk_size:
+                parts = zip(sink.parts, sink.sizes, strict=True)
+                for number, (part, size) in enumerate(parts, start=1):
+                    part.seek(0)
+                    chunk = ReportExportChunk(export=export, number=number, size=size)
+                    chunk.file.save(f"{filename}.part{number:03d}", File(part))
+            else:
+                part = sink.parts[0]
+                part.seek(0)
+                export.file.save(filename, File(part), save=False)
+        finally:
+            sink.close()
 
         export.status = ReportExport.Status.COMPLETED
         export.completed_at = now()
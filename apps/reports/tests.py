@@ -0,0 +1,87 @@
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.submissions.models import Answer, Submission
+from apps.surveys.models import Question, Section, Survey
+from apps.users.models import User
+
+from .models import ReportExport, ReportExportChunk
+from .tasks import generate_survey_report_csv
+
+
+class ChunkedExportTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        self.manager = User.objects.create_user(
+            username="manager", role=User.Role.SURVEY_MANAGER
+        )
+        self.survey = Survey.objects.create(title="Survey", created_by=self.manager)
+        section = Section.objects.create(survey=self.survey, title="Section")
+        question = Question.objects.create(
+            section=section,
+            text="How many?",
+            question_type=Question.QuestionType.NUMBER,
+        )
+        for number in range(50):
+            submission = Submission.objects.create(
+                survey=self.survey,
+                status=Submission.Status.COMPLETED,
+                completed_at=timezone.now(),
+            )
+            Answer.objects.create(
+                submission=submission, question=question, value=number
+            )
+
+    def export(self, **fields):
+        export = ReportExport.objects.create(
+            survey=self.survey, created_by=self.manager, **fields
+        )
+        generate_survey_report_csv(export.id)
+        export.refresh_from_db()
+        return export
+
+    def rows(self, data):
+        return list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+
+    def test_parts_join_into_the_whole_export(self):
+        export = self.export(compression=ReportExport.Compression.GZIP, chunk_size=256)
+
+        chunks = list(export.chunks.all())
+        data = b"".join(chunk.file.read() for chunk in chunks)
+        rows = self.rows(gzip.decompress(data))
+
+        self.assertEqual(export.status, ReportExport.Status.COMPLETED)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk.size <= 256 for chunk in chunks))
+        self.assertEqual(sum(chunk.size for chunk in chunks), export.compressed_size)
+        self.assertEqual(len(rows), 51)
+        self.assertEqual(sorted(int(row[-1]) for row in rows[1:]), list(range(50)))
+
+    def test_unchunked_exports_are_a_single_file(self):
+        export = self.export()
+
+        self.assertFalse(export.chunks.exists())
+        self.assertEqual(len(self.rows(export.file.read())), 51)
+
+    def test_retries_delete_the_parts_of_the_failed_attempt(self):
+        export = ReportExport.objects.create(
+            survey=self.survey, created_by=self.manager, chunk_size=1024
+        )
+        stale = ReportExportChunk(export=export, number=1, size=5)
+        stale.file.save("stale.csv.part001", ContentFile(b"stale"))
+        storage, name = stale.file.storage, stale.file.name
+
+        generate_survey_report_csv(export.id)
+
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(export.chunks.filter(file=name).exists())
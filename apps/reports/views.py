@@ -1,5 +1,11 @@
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
 
+from apps.core.downloads import protected_file_response
 from apps.users.permissions import IsAnalyst, IsSurveyManager
 
 from .models import ReportExport
@@ -18,8 +24,45 @@ class ReportExportViewSet(
     permission_classes = [IsSurveyManager | IsAnalyst]
 
     def get_queryset(self):
-        return self.queryset.filter(created_by=self.request.user)
+        return self.queryset.filter(created_by=self.request.user).prefetch_related(
+            "chunks"
+        )
 
     def perform_create(self, serializer):
         export = serializer.save(created_by=self.request.user)
         generate_survey_report_csv.delay(export.id)
+
+    @extend_schema(
+        summary="Download Export",
+        description=(
+            "Download the generated file of a completed export. "
+            "Chunked exports are downloaded one part at a time with `?part=<n>`. "
+            "Supports HTTP Range requests."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="part",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description="Part number, required for chunked exports",
+            ),
+        ],
+        responses={200: OpenApiTypes.BINARY, 206: OpenApiTypes.BINARY},
+    )
+    @action(detail=True, methods=["get"])
+    def download(self, request, *args, **kwargs):
+        # get_object() is scoped to the requesting user's exports
+        export = self.get_object()
+        if export.status != ReportExport.Status.COMPLETED:
+            raise Http404("Export file is not available.")
+
+        if export.chunk_size:
+            number = request.query_params.get("part", "")
+            if not number.isdigit():
+                raise Http404("A valid part number is required.")
+            chunk = get_object_or_404(export.chunks, number=int(number))
+            return protected_file_response(request, chunk.file)
+
+        if not export.file:
+            raise Http404("Export file is not available.")
+        return protected_file_response(request, export.file)
@@ -1,8 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from import_export.admin import ImportExportModelAdmin
 from import_export_celery.admin_actions import create_export_job_action
 
-from .models import Answer, Submission
+from .archive import restore_archive
+from .models import Answer, Submission, SubmissionArchive
 from .resources import SubmissionResource
 
 
@@ -25,13 +26,40 @@ class SubmissionAdmin(ImportExportModelAdmin):
         "started_at",
         "completed_at",
     )
+    list_select_related = ("survey", "user")
     list_filter = ("status", "survey", "started_at")
     search_fields = ("user__username", "survey__title")
-    readonly_fields = ("started_at", "updated_at", "completed_at")
+    readonly_fields = ("started_at", "updated_at", "completed_at", "archive")
     inlines = [AnswerInline]
 
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ("id", "submission", "question", "value")
+    list_select_related = ("submission__survey", "submission__user", "question")
     list_filter = ("question__section__survey",)
+
+
+@admin.register(SubmissionArchive)
+class SubmissionArchiveAdmin(admin.ModelAdmin):
+    list_display = ("id", "submission_count", "answer_count", "size", "created_at")
+    readonly_fields = (
+        "file",
+        "submission_count",
+        "answer_count",
+        "size",
+        "created_at",
+    )
+    actions = ["restore"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting an archive would lose its answers; restore it instead
+        return False
+
+    @admin.action(description="Restore the archived answers")
+    def restore(self, request, queryset):
+        restored = sum(restore_archive(archive) for archive in queryset)
+        self.message_user(request, f"Restored {restored} answers.", messages.SUCCESS)
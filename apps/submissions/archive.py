@@ -0,0 +1,163 @@
+import gzip
+import json
+import tempfile
+from collections import defaultdict
+from functools import partial
+
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from apps.core.query_budget import allow_repeats
+from apps.surveys.models import Question
+
+from .models import Answer, Submission, SubmissionArchive
+
+# Submission columns kept in the archive next to its answers
+ARCHIVE_FIELDS = (
+    "id",
+    "survey_id",
+    "user_id",
+    "invitation_id",
+    "status",
+    "progress",
+    "started_at",
+    "updated_at",
+    "completed_at",
+)
+
+
+def archive_submissions(submission_ids) -> SubmissionArchive:
+    """
+    Write the submissions and their answers to a gzipped NDJSON archive (one
+    submission per line), then delete the answers and link the submissions
+    to the archive. Runs in the caller's transaction, which should hold the
+    submissions locked; the file is deleted again if the writes fail.
+
+    The submission rows themselves are kept, so invitations and counts still
+    see them as completed; `archived_answers` and `restore_archive` read the
+    answers back.
+    """
+    submissions = (
+        Submission.objects.filter(id__in=submission_ids)
+        .order_by("id")
+        .values(*ARCHIVE_FIELDS)
+    )
+    answers = defaultdict(list)
+    rows = Answer.objects.filter(submission_id__in=submission_ids).values_list(
+        "submission_id", "question_id", "value"
+    )
+    for submission_id, question_id, value in rows.order_by("id"):
+        answers[submission_id].append({"question_id": question_id, "value": value})
+
+    archive = SubmissionArchive(submission_count=0, answer_count=0)
+    with tempfile.TemporaryFile() as sink:
+        with gzip.GzipFile(fileobj=sink, mode="wb") as stream:
+            for submission in submissions:
+                submission["answers"] = answers[submission["id"]]
+                line = json.dumps(submission, cls=DjangoJSONEncoder)
+                stream.write(line.encode("utf-8") + b"\n")
+                archive.submission_count += 1
+                archive.answer_count += len(submission["answers"])
+        archive.size = sink.tell()
+        sink.seek(0)
+        first, last = min(submission_ids), max(submission_ids)
+        try:
+            with transaction.atomic():
+                archive.file.save(f"submissions_{first}_{last}.ndjson.gz", File(sink))
+                Answer.objects.filter(submission_id__in=submission_ids).delete()
+                Submission.objects.filter(id__in=submission_ids).update(archive=archive)
+        except Exception:
+            # The archive row is rolled back, don't leave its file behind
+            if archive.file.name:
+                archive.file.storage.delete(archive.file.name)
+            raise
+    return archive
+
+
+def read_archive(archive):
+    """Yield the archived submissions of `archive`, with their answers."""
+    with archive.file.open("rb") as file, gzip.GzipFile(fileobj=file) as stream:
+        for line in stream:
+            yield json.loads(line)
+
+
+def archived_answer_maps(archive) -> dict:
+    """
+    Return the archived answers of `archive` as question id -> value maps, by
+    submission id.
+    """
+    return {
+        record["id"]: {a["question_id"]: a["value"] for a in record["answers"]}
+        for record in read_archive(archive)
+    }
+
+
+def archived_answer_rows(submissions):
+    """
+    Yield the archived answers of `submissions` as (question id, question
+    type, value) rows, like the live answers, reading each archive once.
+    Answers to questions deleted since are skipped.
+    """
+    archived = submissions.filter(archive__isnull=False)
+    wanted = set(archived.values_list("id", flat=True))
+    archive_ids = archived.values_list("archive_id", flat=True).distinct()
+    for archive in SubmissionArchive.objects.filter(id__in=archive_ids):
+        records = [r for r in read_archive(archive) if r["id"] in wanted]
+        question_ids = {a["question_id"] for r in records for a in r["answers"]}
+        with allow_repeats():
+            question_types = dict(
+                Question.objects.filter(id__in=question_ids).values_list(
+                    "id", "question_type"
+                )
+            )
+        for record in records:
+            for item in record["answers"]:
+                question_type = question_types.get(item["question_id"])
+                if question_type is not None:
+                    yield item["question_id"], question_type, item["value"]
+
+
+def archived_answers(submission) -> list:
+    """Return the archived answers of `submission` as question id/value dicts."""
+    if submission.archive_id is None:
+        return []
+    for record in read_archive(submission.archive):
+        if record["id"] == submission.id:
+            return record["answers"]
+    return []
+
+
+@transaction.atomic
+def restore_archive(archive) -> int:
+    """
+    Recreate the answers of an archive and delete it. Answers to questions
+    deleted since are skipped. Returns the number of answers restored.
+    """
+    records = list(read_archive(archive))
+    question_ids = {a["question_id"] for r in records for a in r["answers"]}
+    question_types = dict(
+        Question.objects.filter(id__in=question_ids).values_list("id", "question_type")
+    )
+
+    answers = []
+    for record in records:
+        for item in record["answers"]:
+            question_type = question_types.get(item["question_id"])
+            if question_type is None:
+                continue
+            answer = Answer(
+                submission_id=record["id"],
+                question_id=item["question_id"],
+                value=item["value"],
+            )
+            answer.set_typed_values(question_type)
+            answers.append(answer)
+    with allow_repeats():
+        Answer.objects.bulk_create(answers, batch_size=1000, ignore_conflicts=True)
+
+    archive.submissions.update(archive=None)
+    # Only remove the file once the answers are safely back
+    transaction.on_commit(partial(archive.file.storage.delete, archive.file.name))
+    archive.delete()
+    return len(answers)
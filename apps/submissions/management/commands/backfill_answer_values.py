@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.submissions.models import Answer
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the typed shadow columns of existing answers (num_value, "
+        "date_value, text_value, choice_values) in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Number of answers updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+
+        while True:
+            # Keyset pagination keeps every batch an index range scan
+            answers = list(
+                Answer.objects.filter(id__gt=last_id)
+                .select_related("question")
+                .only("id", "value", "question__question_type")
+                .order_by("id")[:batch_size]
+            )
+            if not answers:
+                break
+
+            for answer in answers:
+                answer.set_typed_values()
+
+            with transaction.atomic():
+                Answer.objects.bulk_update(answers, Answer.TYPED_FIELDS)
+
+            last_id = answers[-1].id
+            total += len(answers)
+            self.stdout.write(f"Backfilled {total} answers...")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {total} answers."))
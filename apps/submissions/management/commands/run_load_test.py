@@ -0,0 +1,121 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.load_driver import LoadDriver
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives a running server through the participant journey (login, "
+        "survey data, submission, autosaves, completion) with concurrent "
+        "asyncio participants, and reports latency percentiles and error rates "
+        "per endpoint. Uses the participants of generate_load_data by default; "
+        "raise the server's throttle rates to measure beyond them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey", type=int, help="ID of the survey to answer.")
+        parser.add_argument("--url", default="http://localhost:8000")
+        parser.add_argument(
+            "--concurrency", type=int, default=10, help="Concurrent participants."
+        )
+        parser.add_argument(
+            "--ramp-up",
+            type=float,
+            default=0,
+            help="Seconds over which the participants start.",
+        )
+        parser.add_argument(
+            "--think-time",
+            type=float,
+            default=1,
+            help="Mean pause between requests, in seconds.",
+        )
+        parser.add_argument(
+            "--autosaves",
+            type=int,
+            default=3,
+            help="Autosave PATCHes between creating and completing a submission.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=60,
+            help="Seconds during which participants start new journeys.",
+        )
+        parser.add_argument(
+            "--journeys", type=int, help="Stop each participant after this many."
+        )
+        parser.add_argument(
+            "--prefix",
+            default="load",
+            help='Participants log in as "<prefix>_user_<n>" (see generate_load_data).',
+        )
+        parser.add_argument("--password", default="load-test")
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Number of distinct participants (default: --concurrency).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="File to write the JSON results to.")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        users = options["users"] or options["concurrency"]
+        credentials = [
+            (f"{options['prefix']}_user_{index}", options["password"])
+            for index in range(users)
+        ]
+        driver = LoadDriver(
+            base_url=options["url"],
+            survey_id=options["survey"],
+            credentials=credentials,
+            concurrency=options["concurrency"],
+            ramp_up=options["ramp_up"],
+            think_time=options["think_time"],
+            autosaves=options["autosaves"],
+            duration=options["duration"],
+            journeys=options["journeys"],
+            seed=options["seed"],
+            timeout=options["timeout"],
+        )
+        summary = driver.run()
+
+        self.stdout.write(
+            f"{'endpoint':<22}{'requests':>9}{'errors':>8}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        requests = 0
+        for endpoint, row in summary.items():
+            requests += row["requests"]
+            line = (
+                f"{endpoint:<22}{row['requests']:>9}{row['error_rate']:>8.1%}"
+                f"{row['p50'] * 1000:>9.1f}{row['p95'] * 1000:>9.1f}"
+                f"{row['p99'] * 1000:>9.1f}{row['max'] * 1000:>9.1f}"
+            )
+            if row["errors"]:
+                kinds = ", ".join(f"{k}: {n}" for k, n in row["error_kinds"].items())
+                line += f"  ({kinds})"
+            self.stdout.write(line)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{driver.completed} journeys completed, {requests} requests in "
+                f"{driver.elapsed:.1f}s ({requests / driver.elapsed:.1f} requests/s)."
+            )
+        )
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(
+                    {
+                        "completed": driver.completed,
+                        "elapsed": driver.elapsed,
+                        "endpoints": summary,
+                    },
+                    file,
+                    indent=2,
+                )
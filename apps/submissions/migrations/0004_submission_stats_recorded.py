@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0003_submission_invitation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='stats_recorded',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0001_initial'),
+        ('submissions', '0004_submission_stats_recorded'),
+        ('surveys', '0002_survey_language'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['survey', 'status'], name='submissions_survey__4deea5_idx'),
+        ),
+    ]
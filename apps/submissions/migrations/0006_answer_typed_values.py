@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:03
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0005_submission_survey_status_index'),
+        ('surveys', '0002_survey_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='choice_values',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='date_value',
+            field=models.DateField(blank=True, null=True, verbose_name='Date value'),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='num_value',
+            field=models.FloatField(blank=True, null=True, verbose_name='Number value'),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='text_value',
+            field=models.TextField(blank=True, null=True, verbose_name='Text value'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(condition=models.Q(('num_value__isnull', False)), fields=['question', 'num_value'], name='answer_num_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(condition=models.Q(('date_value__isnull', False)), fields=['question', 'date_value'], name='answer_date_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('choice_values__isnull', False)), fields=['choice_values'], name='answer_choice_values_idx'),
+        ),
+    ]
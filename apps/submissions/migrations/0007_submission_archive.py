@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0006_answer_typed_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='archives/submissions/')),
+                ('submission_count', models.PositiveIntegerField()),
+                ('answer_count', models.PositiveIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Submission Archive',
+                'verbose_name_plural': 'Submission Archives',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='archive',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='submissions', to='submissions.submissionarchive'),
+        ),
+    ]
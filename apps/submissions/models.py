@@ -1,6 +1,9 @@
+from datetime import date
 from typing import TYPE_CHECKING
 
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
@@ -8,6 +11,27 @@ from django.utils.translation import gettext_lazy as _
 from apps.surveys.models import Question, Survey
 
 
+class SubmissionArchive(models.Model):
+    """
+    Compressed NDJSON file holding old submissions and their answers, whose
+    answer rows were removed from the database (see `archive`).
+    """
+
+    file = models.FileField(upload_to="archives/submissions/")
+    submission_count = models.PositiveIntegerField()
+    answer_count = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Submission Archive")
+        verbose_name_plural = _("Submission Archives")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Archive of {self.submission_count} submissions"
+
+
 class Submission(models.Model):
     class Status(models.TextChoices):
         IN_PROGRESS = "in_progress", _("In Progress")
@@ -39,6 +63,17 @@ class Submission(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Set once the submission has been added to the question stats
+    stats_recorded = models.BooleanField(default=False, editable=False)
+    # Set once the answers have been moved to an archive file
+    archive = models.ForeignKey(
+        SubmissionArchive,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="submissions",
+    )
 
     if TYPE_CHECKING:
         answers: models.Manager["Answer"]
@@ -46,6 +81,7 @@ class Submission(models.Model):
     class Meta:
         verbose_name = _("Submission")
         verbose_name_plural = _("Submissions")
+        indexes = [models.Index(fields=["survey", "status"])]
 
     def __str__(self):
         return f"Submission for {self.survey.title} by {self.user or 'Anonymous'}"
@@ -64,10 +100,75 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     value = models.JSONField(_("Value"))
 
+    # Typed copies of `value` derived from the question type, so analytics
+    # filters can use B-tree/GIN indexes instead of casting JSON on every row
+    num_value = models.FloatField(_("Number value"), null=True, blank=True)
+    date_value = models.DateField(_("Date value"), null=True, blank=True)
+    text_value = models.TextField(_("Text value"), null=True, blank=True)
+    choice_values = ArrayField(models.CharField(max_length=255), null=True, blank=True)
+
+    TYPED_FIELDS = ("num_value", "date_value", "text_value", "choice_values")
+
     class Meta:
         verbose_name = _("Answer")
         verbose_name_plural = _("Answers")
         unique_together = ("submission", "question")
+        indexes = [
+            models.Index(
+                fields=["question", "num_value"],
+                name="answer_num_value_idx",
+                condition=models.Q(num_value__isnull=False),
+            ),
+            models.Index(
+                fields=["question", "date_value"],
+                name="answer_date_value_idx",
+                condition=models.Q(date_value__isnull=False),
+            ),
+            GinIndex(
+                fields=["choice_values"],
+                name="answer_choice_values_idx",
+                condition=models.Q(choice_values__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"Answer to {self.question.identifier or self.question.id}"
+
+    def save(self, *args, **kwargs):
+        self.set_typed_values()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "value" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *self.TYPED_FIELDS}
+        super().save(*args, **kwargs)
+
+    def set_typed_values(self, question_type=None):
+        """
+        Fill the typed shadow columns from `value`. Pass `question_type` to
+        avoid loading the question (e.g. before a `bulk_create`).
+        """
+        question_type = question_type or self.question.question_type
+        for name, typed_value in typed_values(question_type, self.value).items():
+            setattr(self, name, typed_value)
+
+
+def typed_values(question_type, value) -> dict:
+    """The typed shadow columns of `Answer` for an answer `value`."""
+    typed = dict.fromkeys(Answer.TYPED_FIELDS)
+
+    if question_type == Question.QuestionType.NUMBER:
+        try:
+            typed["num_value"] = float(value)
+        except (TypeError, ValueError):
+            pass
+    elif question_type == Question.QuestionType.DATE:
+        try:
+            typed["date_value"] = date.fromisoformat(str(value))
+        except ValueError:
+            pass
+    elif question_type == Question.QuestionType.TEXT:
+        if value is not None:
+            typed["text_value"] = str(value)
+    elif value not in (None, ""):
+        values = value if isinstance(value, list) else [value]
+        typed["choice_values"] = [str(v) for v in values]
+    return typed
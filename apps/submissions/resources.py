@@ -1,6 +1,9 @@
+from functools import lru_cache
+
 from import_export import fields, resources
 
-from apps.submissions.models import Submission
+from apps.submissions.archive import archived_answer_maps
+from apps.submissions.models import Submission, SubmissionArchive
 from apps.surveys.models import Question
 
 
@@ -35,6 +38,11 @@ class SubmissionResource(resources.ModelResource):
                     "section__order", "order"
                 )
             )
+        # Answer maps of the archives met in the export, a few at a time
+        self.archived_answers = lru_cache(maxsize=4)(self.load_archive)
+
+    def load_archive(self, archive_id):
+        return archived_answer_maps(SubmissionArchive.objects.get(id=archive_id))
 
     def get_queryset(self):
         qs = super().get_queryset().select_related("user")
@@ -61,7 +69,11 @@ class SubmissionResource(resources.ModelResource):
         # Handle dynamic question fields
         if field.attribute and field.attribute.startswith("question_"):
             # Ensure answers are cached for this object to avoid N+1
-            if not hasattr(obj, "_answers_map"):
+            if not hasattr(obj, "_answers_map") and obj.archive_id is not None:
+                # The answers were moved to an archive file
+                archived = self.archived_answers(obj.archive_id)
+                obj._answers_map = archived.get(obj.id, {})
+            elif not hasattr(obj, "_answers_map"):
                 # Because we used prefetch_related("answers"), this is efficient
                 obj._answers_map = {
                     ans.question_id: ans.value for ans in obj.answers.all()
@@ -1,9 +1,27 @@
 from rest_framework import serializers
 
+from apps.surveys.models import Question
+
 from .models import Answer, Submission
 
 
+class QuestionField(serializers.PrimaryKeyRelatedField):
+    """
+    Takes the question from the ones `SubmissionSerializer` loaded for all
+    the answers at once, instead of one query per answer.
+    """
+
+    def to_internal_value(self, data):
+        questions = self.context.get("questions", {})
+        try:
+            return questions[int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
+
 class AnswerSerializer(serializers.ModelSerializer):
+    question = QuestionField(queryset=Question.objects.all())
+
     class Meta:
         model = Answer
         fields = ["question", "value"]
@@ -35,12 +53,30 @@ class SubmissionSerializer(serializers.ModelSerializer):
 
     read_only_fields = ["id", "survey", "user", "status", "progress"]
 
+    def to_internal_value(self, data):
+        answers = data.get("answers") if hasattr(data, "get") else None
+        if isinstance(answers, list):
+            ids = set()
+            for answer in answers:
+                try:
+                    ids.add(int(answer["question"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            self.context["questions"] = Question.objects.in_bulk(ids)
+        return super().to_internal_value(data)
+
     def validate_survey(self, value):
         if self.instance and self.instance.survey != value:
             raise serializers.ValidationError("Survey cannot be changed.")
         return value
 
     def validate(self, attrs: dict):
+        # Completed submissions are counted in the survey stats once, as they
+        # were completed (see `record_submission_stats`)
+        if self.instance and self.instance.status == Submission.Status.COMPLETED:
+            raise serializers.ValidationError(
+                "A completed submission cannot be changed."
+            )
         if attrs.pop("is_completed", False):
             attrs["status"] = Submission.Status.COMPLETED
             attrs["progress"] = 100
@@ -55,17 +91,26 @@ class SubmissionSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         answers_data = validated_data.pop("answers", [])
 
-        # Update Submission fields
+        # Update Submission fields; `updated_at` is bumped by answer writes too
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save(update_fields=validated_data.keys())
+        instance.save(update_fields=[*validated_data, "updated_at"])
 
-        # Handle nested answers
+        # Upsert the answers in one statement; the last answer to a question wins
+        answers = {}
         for answer_item in answers_data:
-            Answer.objects.update_or_create(
+            answer = Answer(
                 submission=instance,
                 question=answer_item["question"],
-                defaults={"value": answer_item["value"]},
+                value=answer_item["value"],
             )
+            answer.set_typed_values()
+            answers[answer.question_id] = answer
+        Answer.objects.bulk_create(
+            answers.values(),
+            update_conflicts=True,
+            unique_fields=["submission", "question"],
+            update_fields=["value", *Answer.TYPED_FIELDS],
+        )
 
         return instance
@@ -1,5 +1,7 @@
 from rest_framework.exceptions import ValidationError
 
+from apps.core.metrics import VALIDATION_FAILURES
+from apps.core.timing import timed
 from apps.surveys.models import Question, QuestionLogic
 
 
@@ -17,18 +19,22 @@ class SubmissionValidatorService:
         self._visibility_cache = {}
         self._allowed_choices_cache = {}
 
+    @timed("validate")
     def validate(self):
         # 1. Validate provided answers
         for q_id, answer_value in self.answers_map.items():
             if q_id not in self.survey_data["questions_map"]:
-                raise ValidationError({"q_id": f"Invalid question ID: {q_id}"})
+                raise self.failure(
+                    "invalid_question", {"q_id": f"Invalid question ID: {q_id}"}
+                )
 
             question_data = self.survey_data["questions_map"][q_id]
 
             # Check visibility first
             if not self.is_question_visible(q_id):
-                raise ValidationError(
-                    f"Question {q_id} is hidden and should not be answered."
+                raise self.failure(
+                    "hidden_question",
+                    f"Question {q_id} is hidden and should not be answered.",
                 )
 
             self.validate_answer_type(question_data, answer_value)
@@ -38,6 +44,11 @@ class SubmissionValidatorService:
         if self.is_completed:
             self.check_required_questions()
 
+    def failure(self, reason: str, detail) -> ValidationError:
+        """The `ValidationError` to raise, counted by `reason` in the metrics."""
+        VALIDATION_FAILURES.labels(reason).inc()
+        return ValidationError(detail)
+
     def is_question_visible(self, q_id: str) -> bool:
         if q_id in self._visibility_cache:
             return self._visibility_cache[q_id]
@@ -96,24 +107,34 @@ class SubmissionValidatorService:
             return False
         return False
 
-    def validate_allowed_choices(self, question_data: dict, answer_value):
+    def allowed_choices(self, question_data: dict) -> set | None:
+        """
+        The choice values the question accepts given the current answers, or
+        None when no choice rule applies (every value is accepted).
+        """
         q_id = str(question_data["id"])
         rules = self.survey_data["logic_map"].get(q_id, [])
         if not rules or question_data["type"] not in ["radio", "dropdown", "checkbox"]:
-            return
+            return None
 
         choice_map = {c["id"]: str(c["value"]) for c in question_data["choices"]}
         allowed_values, rule_applied = self._filter_choices_by_rules(choice_map, rules)
+        return allowed_values if rule_applied else None
 
-        if rule_applied:
-            submitted_values = (
-                answer_value if isinstance(answer_value, list) else [answer_value]
-            )
-            for val in submitted_values:
-                if str(val) not in allowed_values:
-                    raise ValidationError(
-                        f"Invalid choice '{val}' for question {q_id}."
-                    )
+    def validate_allowed_choices(self, question_data: dict, answer_value):
+        allowed_values = self.allowed_choices(question_data)
+        if allowed_values is None:
+            return
+
+        submitted_values = (
+            answer_value if isinstance(answer_value, list) else [answer_value]
+        )
+        for val in submitted_values:
+            if str(val) not in allowed_values:
+                raise self.failure(
+                    "invalid_choice",
+                    f"Invalid choice '{val}' for question {question_data['id']}.",
+                )
 
     def _filter_choices_by_rules(self, choice_map: dict, rules: list) -> tuple:
         """Helper to process cumulative choice filtering logic."""
@@ -152,15 +173,17 @@ class SubmissionValidatorService:
             # Only check if it's visible or would be visible
             if self.is_question_visible(q_id):
                 if q_id not in self.answers_map or self.answers_map[q_id] in [None, ""]:
-                    raise ValidationError(
-                        f"Question {q_id} is required and has not been answered."
+                    raise self.failure(
+                        "missing_required",
+                        f"Question {q_id} is required and has not been answered.",
                     )
 
     def validate_answer_type(self, question_data: dict, value):
         try:
             Question.QuestionType(question_data["type"]).validate_answer_type(value)
         except Exception:
-            raise ValidationError(
+            raise self.failure(
+                "invalid_type",
                 f"Answer for question {question_data['id']} is not of type "
-                f"{question_data['type']}."
+                f"{question_data['type']}.",
             ) from None
@@ -1,3 +1,324 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from apps.analytics.models import QuestionStats
+from apps.analytics.services import rebuild_survey_stats
+from apps.core.benchmarks.environment import celery_config, fake_redis
+from apps.core.query_budget import assert_query_budget
+from apps.surveys.models import Question, Section, Survey
+from apps.users.models import User
+
+from .archive import archive_submissions, archived_answers
+from .models import Answer, Submission, SubmissionArchive
+from .resources import SubmissionResource
+from .services import SubmissionValidatorService
+
+
+class ArchivedSubmissionTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        user = User.objects.create_user(username="manager")
+        self.survey = Survey.objects.create(title="Survey", created_by=user)
+        section = Section.objects.create(survey=self.survey, title="Section")
+        self.question = Question.objects.create(
+            section=section,
+            text="How many?",
+            question_type=Question.QuestionType.NUMBER,
+        )
+        self.submissions = [self.complete(number) for number in (3, 5, 10)]
+
+    def complete(self, number):
+        submission = Submission.objects.create(
+            survey=self.survey,
+            status=Submission.Status.COMPLETED,
+            completed_at=timezone.now(),
+        )
+        Answer.objects.create(
+            submission=submission, question=self.question, value=number
+        )
+        return submission
+
+    def archive(self, submissions):
+        archive_submissions([submission.id for submission in submissions])
+
+    def test_archiving_moves_the_answers_to_a_file(self):
+        self.archive(self.submissions[:2])
+
+        first = Submission.objects.get(id=self.submissions[0].id)
+        self.assertFalse(first.answers.exists())
+        self.assertEqual(
+            archived_answers(first), [{"question_id": self.question.id, "value": 3}]
+        )
+
+    def test_failed_archiving_removes_the_file(self):
+        with mock.patch.object(QuerySet, "update", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.archive(self.submissions)
+
+        self.assertFalse(SubmissionArchive.objects.exists())
+        self.assertEqual(Answer.objects.count(), 3)
+        for _, _, files in os.walk(settings.MEDIA_ROOT):
+            self.assertEqual(files, [])
+
+    def test_stats_rebuild_counts_archived_answers(self):
+        self.archive(self.submissions[:2])
+
+        rebuild_survey_stats(self.survey.id)
+
+        stats = QuestionStats.objects.get(question=self.question)
+        self.assertEqual(stats.response_count, 3)
+        self.assertEqual(
+            (stats.value_sum, stats.value_min, stats.value_max), (18, 3, 10)
+        )
+
+    def test_export_includes_archived_answers(self):
+        self.archive(self.submissions[1:])
+
+        resource = SubmissionResource(survey=self.survey)
+        queryset = resource.get_queryset().filter(survey=self.survey).order_by("pk")
+        dataset = resource.export(queryset=queryset)
+
+        self.assertEqual(dataset.get_col(-1), [3, 5, 10])
+
+
+class AllowedChoicesTests(SimpleTestCase):
+    question = {
+        "id": 2,
+        "type": "radio",
+        "choices": [
+            {"id": 10, "value": "bus"},
+            {"id": 11, "value": "car"},
+            {"id": 12, "value": "bike"},
+        ],
+    }
+    survey_data = {
+        "questions_map": {"1": {"id": 1, "type": "text"}, "2": question},
+        "logic_map": {
+            "2": [
+                {
+                    "trigger_question": 1,
+                    "operator": "eq",
+                    "value": "city",
+                    "action": "limit_choices",
+                    "target_choices": [10, 12],
+                }
+            ]
+        },
+    }
+
+    def validator(self, answers):
+        return SubmissionValidatorService(self.survey_data, answers)
+
+    def test_no_matching_rule_allows_every_value(self):
+        self.assertIsNone(
+            self.validator({"1": "village"}).allowed_choices(self.question)
+        )
+
+    def test_matching_rules_filter_the_choices(self):
+        validator = self.validator({"1": "city"})
+
+        self.assertEqual(validator.allowed_choices(self.question), {"bus", "bike"})
+
+    def test_choices_outside_the_allowed_ones_are_rejected(self):
+        validator = self.validator({"1": "city", "2": "car"})
+
+        with self.assertRaises(ValidationError):
+            validator.validate()
+
+
+class SubmissionStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        manager = User.objects.create_user(
+            username="manager", role=User.Role.SURVEY_MANAGER
+        )
+        self.participant = User.objects.create_user(
+            username="participant", role=User.Role.PARTICIPANT
+        )
+        self.survey = Survey.objects.create(title="Survey", created_by=manager)
+        section = Section.objects.create(survey=self.survey, title="Section")
+        self.question = Question.objects.create(
+            section=section,
+            text="How many?",
+            question_type=Question.QuestionType.NUMBER,
+        )
+        self.client.force_authenticate(self.participant)
+        self.enterContext(
+            celery_config(task_always_eager=True, task_eager_propagates=True)
+        )
+
+    def send(self, method, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format="json")
+
+    def answers(self, value):
+        return [{"question": self.question.id, "value": value}]
+
+    def stats(self):
+        stats = QuestionStats.objects.get(question=self.question)
+        return stats.response_count, stats.value_sum
+
+    def test_completing_a_submission_adds_it_to_the_stats(self):
+        url = reverse("submissions:submission-list")
+        data = {"survey": self.survey.id, "answers": self.answers(4)}
+        response = self.send("post", url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(QuestionStats.objects.exists())
+
+        detail = reverse("submissions:submission-detail", args=[response.data["id"]])
+        data = {"answers": self.answers(7), "is_completed": True}
+        response = self.send("patch", detail, data)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stats(), (1, 7))
+
+    def test_completed_submissions_cannot_be_changed(self):
+        url = reverse("submissions:submission-list")
+        data = {
+            "survey": self.survey.id,
+            "answers": self.answers(4),
+            "is_completed": True,
+        }
+        response = self.send("post", url, data)
+        self.assertEqual(self.stats(), (1, 4))
+
+        detail = reverse("submissions:submission-detail", args=[response.data["id"]])
+        response = self.send("patch", detail, {"answers": self.answers(9)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stats(), (1, 4))
+        self.assertEqual(Answer.objects.get(question=self.question).value, 4)
+
+    def test_answer_writes_touch_the_submission(self):
+        url = reverse("submissions:submission-list")
+        response = self.send("post", url, {"survey": self.survey.id})
+        submission = Submission.objects.get(id=response.data["id"])
+        before = submission.updated_at
+
+        detail = reverse("submissions:submission-detail", args=[submission.id])
+        self.send("patch", detail, {"answers": self.answers(2)})
+
+        submission.refresh_from_db(fields=["updated_at"])
+        self.assertGreater(submission.updated_at, before)
+
+
+class SubmissionQueryBudgetTests(APITestCase):
+    """The answer writes run the same queries for any number of answers."""
+
+    question_count = 20
+
+    def setUp(self):
+        cache.clear()
+        manager = User.objects.create_user(
+            username="manager", role=User.Role.SURVEY_MANAGER
+        )
+        self.participant = User.objects.create_user(
+            username="participant", role=User.Role.PARTICIPANT
+        )
+        self.survey = Survey.objects.create(title="Survey", created_by=manager)
+        section = Section.objects.create(survey=self.survey, title="Section")
+        self.questions = [
+            Question.objects.create(
+                section=section,
+                text=f"Question {index}",
+                question_type=Question.QuestionType.NUMBER,
+                order=index,
+            )
+            for index in range(self.question_count)
+        ]
+        # Cache the schema, as the first participant would
+        Survey.get_cached_schema(self.survey.id)
+        self.client.force_authenticate(self.participant)
+
+    def answers(self):
+        return [
+            {"question": question.id, "value": index}
+            for index, question in enumerate(self.questions)
+        ]
+
+    def test_create(self):
+        url = reverse("submissions:submission-list")
+        data = {"survey": self.survey.id, "answers": self.answers()}
+
+        with assert_query_budget(7):
+            response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Answer.objects.count(), self.question_count)
+
+    def test_update(self):
+        submission = Submission.objects.create(
+            survey=self.survey, user=self.participant
+        )
+        url = reverse("submissions:submission-detail", args=[submission.id])
+        data = {"answers": self.answers()}
+
+        # Including the savepoint of the update's transaction
+        with assert_query_budget(8):
+            response = self.client.patch(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(submission.answers.count(), self.question_count)
+
+
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        self.enterContext(fake_redis())
+        cache.clear()
+        manager = User.objects.create_user(
+            username="manager", role=User.Role.SURVEY_MANAGER
+        )
+        participant = User.objects.create_user(
+            username="participant", role=User.Role.PARTICIPANT
+        )
+        self.survey = Survey.objects.create(title="Survey", created_by=manager)
+        section = Section.objects.create(survey=self.survey, title="Section")
+        self.question = Question.objects.create(
+            section=section,
+            text="How many?",
+            question_type=Question.QuestionType.NUMBER,
+        )
+        self.client.force_authenticate(participant)
+
+    def create(self):
+        url = reverse("submissions:submission-list")
+        data = {
+            "survey": self.survey.id,
+            "answers": [{"question": self.question.id, "value": 3}],
+        }
+        return self.client.post(url, data, format="json")
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_report_the_spans_of_the_hot_path(self):
+        with self.assertLogs("apps.core.timing", "INFO") as logs:
+            response = self.create()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        metrics = [m.split(";")[0] for m in response["Server-Timing"].split(", ")]
+        self.assertEqual(metrics[0], "total")
+        for name in ("throttle", "validate", "answers_save", "serialize", "db"):
+            self.assertIn(name, metrics)
+        self.assertIn('"path": "/api/submissions/', logs.output[0])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0.0)
+    def test_requests_are_not_timed_unless_sampled(self):
+        response = self.create()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Server-Timing", response)
@@ -1,8 +1,11 @@
+from django.db import transaction
 from rest_framework import mixins, status
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from apps.analytics.tasks import update_question_stats
 from apps.core.throttling import ActionBasedThrottle
+from apps.core.timing import span
 from apps.submissions.services import SubmissionValidatorService
 from apps.surveys.models import Survey
 from apps.users.permissions import (
@@ -31,6 +34,15 @@ class SubmissionViewSet(
         "partial_update": "submission_update",
         "retrieve": "slow_get",
     }
+    # Independent of the number of answers (see SubmissionSerializer), with
+    # room for building the survey schema and looking up the knox token on
+    # cache misses
+    query_budget = {
+        "create": 18,
+        "update": 18,
+        "partial_update": 18,
+        "retrieve": 8,
+    }
     permission_classes = [
         IsSurveyManager | IsAnalyst | IsParticipant,
         SubmissionPermission,
@@ -45,8 +57,9 @@ class SubmissionViewSet(
         # Get all existing answers to be cumulative in validation
         new_answers = submission_serializer.validated_data.get("answers", [])
         if new_answers:
-            old_answers = submission.answers.all()
-            merged_answers = {str(a.question_id): a.value for a in old_answers}
+            with span("answers_load"):
+                old_answers = submission.answers.all()
+                merged_answers = {str(a.question_id): a.value for a in old_answers}
             for a in new_answers:
                 merged_answers[str(a["question"].id)] = a["value"]
 
@@ -58,9 +71,15 @@ class SubmissionViewSet(
             ).validate()
 
         # SAVE THE ANSWERS TO THE DB
-        submission_serializer.save()
+        with span("answers_save"):
+            submission_serializer.save()
+
+        if status == Submission.Status.COMPLETED:
+            # Idempotent: a submission is only added to the stats once
+            transaction.on_commit(lambda: update_question_stats.delay(submission.id))
 
-        return submission_serializer.data
+        with span("serialize"):
+            return submission_serializer.data
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -70,6 +89,14 @@ class SubmissionViewSet(
         response_data = self._process_answers(submission_serializer=serializer)
         return Response(response_data, status=status.HTTP_201_CREATED)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("update", "partial_update"):
+            # Concurrent writes wait, then see the status the other one set
+            queryset = queryset.select_for_update(of=("self",))
+        return queryset
+
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         submission = self.get_object()
         serializer = self.get_serializer(
@@ -44,6 +44,7 @@ class SectionAdmin(AuditlogHistoryMixin, TranslationAdmin):
 @admin.register(Question)
 class QuestionAdmin(AuditlogHistoryMixin, TranslationAdmin):
     list_display = ("id", "text", "section", "question_type", "required", "order")
+    list_select_related = ("section__survey",)
     list_filter = ("question_type", "required", "section__survey")
     search_fields = ("text",)
     inlines = [QuestionChoiceInline]
@@ -59,6 +60,7 @@ class QuestionChoiceAdmin(admin.ModelAdmin):
 @admin.register(QuestionLogic)
 class QuestionLogicAdmin(AuditlogHistoryMixin, admin.ModelAdmin):
     list_display = ("id", "trigger_question", "target_question", "operator", "action")
+    list_select_related = ("trigger_question", "target_question")
     list_filter = ("operator", "action", "trigger_question__section__survey")
     filter_horizontal = ("target_choices",)
     search_fields = ("trigger_question__text", "target_question__text")
@@ -0,0 +1,132 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.load_data import (
+    DEFAULT_END_DATE,
+    LoadDataGenerator,
+    parse_question_counts,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic surveys, users, invitations and submissions for "
+        "load testing. The same seed and options give the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="load",
+            help="Prefix of the generated survey titles, usernames and emails.",
+        )
+        parser.add_argument("--surveys", type=int, default=1)
+        parser.add_argument(
+            "--sections", type=int, default=5, help="Sections per survey."
+        )
+        parser.add_argument(
+            "--questions",
+            type=parse_question_counts,
+            default=None,
+            help=(
+                'Questions per section and type, e.g. "radio=3,text=1,date=1" '
+                "(default: one of each type and two radio questions)."
+            ),
+        )
+        parser.add_argument(
+            "--choices", type=int, default=5, help="Choices per choice question."
+        )
+        parser.add_argument(
+            "--logic-rules", type=int, default=10, help="Logic rules per survey."
+        )
+        parser.add_argument(
+            "--logic-depth",
+            type=int,
+            default=3,
+            help="Length of the chains of dependent logic rules.",
+        )
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--invitations", type=int, default=100, help="Invitations per survey."
+        )
+        parser.add_argument(
+            "--submissions", type=int, default=100, help="Submissions per survey."
+        )
+        parser.add_argument(
+            "--completion-rate",
+            type=float,
+            default=0.8,
+            help="Share of submissions that are completed.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Completion and send dates are spread over this many past days.",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=date.fromisoformat,
+            default=None,
+            help=(
+                "Generated dates fall before this day, as YYYY-MM-DD "
+                f"(default: {DEFAULT_END_DATE.isoformat()})."
+            ),
+        )
+        parser.add_argument(
+            "--password",
+            default="load-test",
+            help="Password of the generated users.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the data generated earlier with the same prefix first.",
+        )
+
+    def handle(self, *args, **options):
+        generator = LoadDataGenerator(
+            seed=options["seed"],
+            prefix=options["prefix"],
+            surveys=options["surveys"],
+            sections=options["sections"],
+            questions=options["questions"],
+            choices=options["choices"],
+            logic_rules=options["logic_rules"],
+            logic_depth=options["logic_depth"],
+            users=options["users"],
+            invitations=options["invitations"],
+            submissions=options["submissions"],
+            completion_rate=options["completion_rate"],
+            days=options["days"],
+            end_date=options["end_date"],
+            password=options["password"],
+            batch_size=options["batch_size"],
+            stdout=self.stdout,
+        )
+        if options["clear"]:
+            generator.clear()
+        elif generator.existing():
+            raise CommandError(
+                f'Data with the prefix "{options["prefix"]}" exists already; '
+                "use --clear or another --prefix."
+            )
+
+        started = time.monotonic()
+        surveys = generator.generate()
+        elapsed = time.monotonic() - started
+
+        for name, count in generator.counts.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {len(surveys)} surveys in {elapsed:.1f}s "
+                f"(IDs {surveys[0].id}-{surveys[-1].id})."
+                if surveys
+                else "Nothing to generate."
+            )
+        )
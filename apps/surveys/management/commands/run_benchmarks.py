@@ -0,0 +1,114 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmarks import cases  # noqa: F401  (registers the benchmarks)
+from apps.core.benchmarks.environment import isolated
+from apps.core.benchmarks.runner import (
+    compare,
+    environment,
+    run_benchmarks,
+    selected,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the benchmarks of the hot paths on a test database, with fakeredis "
+        "and a local SMTP sink, and writes their time, query counts and peak "
+        "memory as JSON. With --baseline, compares them with an earlier run and "
+        "fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "patterns",
+            nargs="*",
+            help='Glob patterns of the benchmarks to run, e.g. "schema.*".',
+        )
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--output", help="File to write the JSON results to.")
+        parser.add_argument(
+            "--baseline", help="JSON results of an earlier run to compare with."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Relative slowdown or memory growth reported as a regression.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database between runs.",
+        )
+        parser.add_argument(
+            "--list", action="store_true", help="List the benchmarks and exit."
+        )
+
+    def handle(self, *args, **options):
+        benchmarks = selected(options["patterns"])
+        if options["list"]:
+            for name, _, _ in benchmarks:
+                self.stdout.write(name)
+            return
+        if not benchmarks:
+            raise CommandError("No benchmark matches the given patterns.")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)["results"]
+
+        try:
+            import aiosmtpd  # noqa: F401
+            import fakeredis  # noqa: F401
+        except ImportError:
+            raise CommandError(
+                "fakeredis and aiosmtpd are required for the benchmarks "
+                "(see requirements/local.txt)."
+            ) from None
+
+        with isolated(keepdb=options["keepdb"]):
+            report = {
+                "environment": environment(),
+                "options": {
+                    "iterations": options["iterations"],
+                    "warmup": options["warmup"],
+                },
+                "results": run_benchmarks(
+                    options["patterns"],
+                    iterations=options["iterations"],
+                    warmup=options["warmup"],
+                    log=self.stderr.write,
+                ),
+            }
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            sys.stdout.write(output + "\n")
+
+        if baseline is not None:
+            self.report_changes(baseline, report["results"], options["threshold"])
+
+    def report_changes(self, baseline, results, threshold):
+        regressions = 0
+        for name, time_change, query_change, memory_change, regressed in compare(
+            baseline, results, threshold
+        ):
+            line = (
+                f"{name:<55} time {time_change:+7.1%}  queries {query_change:+4d}  "
+                f"memory {memory_change:+7.1%}"
+            )
+            if regressed:
+                regressions += 1
+                self.stderr.write(self.style.ERROR(line))
+            else:
+                self.stderr.write(line)
+        if regressions:
+            raise CommandError(f"{regressions} benchmarks regressed.")
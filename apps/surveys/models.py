@@ -6,6 +6,9 @@ from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from apps.core.metrics import SCHEMA_CACHE
+from apps.core.timing import timed
+
 
 @auditlog.register()
 class Survey(models.Model):
@@ -38,12 +41,15 @@ class Survey(models.Model):
         return self.title
 
     @classmethod
+    @timed("schema")
     def get_cached_schema(cls, survey_id):
         cache_key = f"survey_render_{survey_id}"
         cached_data = cache.get(cache_key)
         if cached_data is not None:
+            SCHEMA_CACHE.labels("hit").inc()
             return cached_data
 
+        SCHEMA_CACHE.labels("miss").inc()
         survey = get_object_or_404(Survey, id=survey_id)
         return survey.update_schema_cache()
 
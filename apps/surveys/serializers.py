@@ -77,10 +77,10 @@ class SurveyRenderSerializer(serializers.ModelSerializer):
                 "action": logic.action,
             }
 
-            if logic.target_choices.exists():
-                rule["target_choices"] = list(
-                    logic.target_choices.values_list("id", flat=True)
-                )
+            # From the prefetched choices, not one query per rule
+            target_choices = [choice.id for choice in logic.target_choices.all()]
+            if target_choices:
+                rule["target_choices"] = target_choices
 
             logic_map[target_id].append(rule)
 
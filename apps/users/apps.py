@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = "apps.users"
+
+    def ready(self):
+        import apps.users.signals  # noqa
+        from apps.core.audit import install_buffered_receivers
+
+        # Every app's audited models are registered by now
+        install_buffered_receivers()
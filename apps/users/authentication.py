@@ -0,0 +1,190 @@
+import binascii
+import copy
+import logging
+import time
+from datetime import UTC, datetime
+from itertools import batched
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import get_token_model
+from knox.settings import knox_settings
+
+from apps.core.query_budget import allow_repeats
+from apps.core.redis_client import get_redis
+from apps.core.timing import timed
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of token digest -> refreshed expiry (timestamp) not yet written
+REFRESH_BUFFER_KEY = "knox_token_refreshes"
+
+# Entries kept in each process before expired ones are pruned
+LOCAL_CACHE_SIZE = 10_000
+
+# digest -> (cached token, monotonic deadline)
+_local_tokens = {}
+
+
+def token_cache_key(digest):
+    return f"knox_token_{digest}"
+
+
+def invalidate_tokens(digests):
+    """Drop tokens from the shared cache and this process's cache."""
+    digests = list(digests)
+    for digest in digests:
+        _local_tokens.pop(digest, None)
+    if digests:
+        cache.delete_many([token_cache_key(digest) for digest in digests])
+
+
+def invalidate_user_tokens(user_id):
+    """Drop the cached tokens of a user, e.g. after the user changed."""
+    digests = get_token_model().objects.filter(user_id=user_id)
+    invalidate_tokens(digests.values_list("digest", flat=True))
+
+
+def buffer_refresh(auth_token):
+    """
+    Buffer a new token expiry in Redis; `flush_refreshes` writes the buffered
+    expiries in bulk. Falls back to a direct write when Redis is unavailable.
+    """
+    try:
+        get_redis().hset(
+            REFRESH_BUFFER_KEY, auth_token.digest, auth_token.expiry.timestamp()
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Refresh buffer unavailable, writing expiry directly: {e}")
+        auth_token.save(update_fields=("expiry",))
+
+
+def flush_refreshes(batch_size=1000) -> int:
+    """Write the buffered token expiries to the database, `batch_size` at a time."""
+    client = get_redis()
+    with client.pipeline() as pipe:
+        pipe.hgetall(REFRESH_BUFFER_KEY)
+        pipe.delete(REFRESH_BUFFER_KEY)
+        refreshes, _ = pipe.execute()
+
+    AuthToken = get_token_model()
+    items = list(refreshes.items())
+    total = 0
+    with allow_repeats():
+        for index, chunk in enumerate(batched(items, batch_size)):
+            tokens = [
+                AuthToken(
+                    digest=digest.decode(),
+                    expiry=datetime.fromtimestamp(float(expiry), tz=UTC),
+                )
+                for digest, expiry in chunk
+            ]
+            try:
+                # Tokens deleted in the meantime simply match no row
+                AuthToken.objects.bulk_update(tokens, ["expiry"])
+            except Exception:
+                # Put the unwritten refreshes back, unless a newer one was buffered
+                with client.pipeline() as pipe:
+                    for digest, expiry in items[index * batch_size :]:
+                        pipe.hsetnx(REFRESH_BUFFER_KEY, digest, expiry)
+                    pipe.execute()
+                raise
+            total += len(tokens)
+    return total
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Knox token authentication that caches the token and its user, so a
+    request doesn't query `AuthToken` and the user once the token is known.
+
+    Tokens are cached by digest for `KNOX_TOKEN_CACHE_TTL` seconds in the
+    shared cache and `KNOX_TOKEN_LOCAL_CACHE_TTL` seconds in each process, and
+    dropped when the token is deleted (logout) or its user is saved (see
+    `signals`). Other processes only see a deletion once their local entry
+    expires, so keep the local TTL short.
+
+    `AUTO_REFRESH` expiry updates are buffered in Redis and written in bulk
+    by the `flush_token_refreshes` task instead of on the request.
+    """
+
+    @timed("auth")
+    def authenticate_credentials(self, token):
+        try:
+            digest = hash_token(token.decode("utf-8"))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            # Let knox reject the malformed token
+            return super().authenticate_credentials(token)
+
+        auth_token = self.get_cached_token(digest)
+        if auth_token is None or self.is_expired(auth_token):
+            # Looked up (and expired tokens deleted) by knox, then cached
+            user, auth_token = super().authenticate_credentials(token)
+            self.cache_token(auth_token)
+            return user, auth_token
+
+        if knox_settings.AUTO_REFRESH and auth_token.expiry:
+            self.renew_token(auth_token)
+        return self.validate_user(auth_token)
+
+    @staticmethod
+    def is_expired(auth_token):
+        return auth_token.expiry is not None and auth_token.expiry < timezone.now()
+
+    def get_cached_token(self, digest):
+        local = _local_tokens.get(digest)
+        if local is not None and local[1] > time.monotonic():
+            data = local[0]
+        else:
+            data = cache.get(token_cache_key(digest))
+            if data is None:
+                return None
+            self._cache_locally(digest, data)
+
+        # Each request gets its own user instance
+        data = {**data, "user": copy.copy(data["user"])}
+        return get_token_model()(digest=digest, **data)
+
+    def cache_token(self, auth_token):
+        data = {
+            "token_key": auth_token.token_key,
+            "user": auth_token.user,
+            "created": auth_token.created,
+            "expiry": auth_token.expiry,
+        }
+        cache.set(
+            token_cache_key(auth_token.digest), data, settings.KNOX_TOKEN_CACHE_TTL
+        )
+        self._cache_locally(auth_token.digest, data)
+
+    def _cache_locally(self, digest, data):
+        if len(_local_tokens) >= LOCAL_CACHE_SIZE:
+            current = time.monotonic()
+            for key, (_, deadline) in list(_local_tokens.items()):
+                if deadline <= current:
+                    del _local_tokens[key]
+            if len(_local_tokens) >= LOCAL_CACHE_SIZE:
+                _local_tokens.clear()
+        deadline = time.monotonic() + settings.KNOX_TOKEN_LOCAL_CACHE_TTL
+        _local_tokens[digest] = (data, deadline)
+
+    def renew_token(self, auth_token) -> None:
+        current_expiry = auth_token.expiry
+        new_expiry = timezone.now() + knox_settings.TOKEN_TTL
+
+        # Do not auto-renew tokens past AUTO_REFRESH_MAX_TTL, as knox does
+        if knox_settings.AUTO_REFRESH_MAX_TTL is not None:
+            max_expiry = auth_token.created + knox_settings.AUTO_REFRESH_MAX_TTL
+            new_expiry = min(new_expiry, max_expiry)
+
+        auth_token.expiry = new_expiry
+
+        # Refresh at most every MIN_REFRESH_INTERVAL, through the buffer
+        delta = (new_expiry - current_expiry).total_seconds()
+        if delta > knox_settings.MIN_REFRESH_INTERVAL:
+            buffer_refresh(auth_token)
+            self.cache_token(auth_token)
@@ -4,7 +4,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 
-@auditlog.register()
+@auditlog.register(exclude_fields=["last_login"])
 class User(AbstractUser):
     """Base user model for the system."""
 
@@ -36,7 +36,7 @@ class User(AbstractUser):
         return self.role == self.Role.PARTICIPANT
 
 
-@auditlog.register()
+@auditlog.register(exclude_fields=["last_login"])
 class SurveyManager(User):
     """Concrete model for Survey Manager users using MTI."""
 
@@ -49,7 +49,7 @@ class SurveyManager(User):
         super().save(*args, **kwargs)
 
 
-@auditlog.register()
+@auditlog.register(exclude_fields=["last_login"])
 class Analyst(User):
     """Concrete model for Analyst users using MTI."""
 
@@ -62,7 +62,7 @@ class Analyst(User):
         super().save(*args, **kwargs)
 
 
-@auditlog.register()
+@auditlog.register(exclude_fields=["last_login"])
 class Participant(User):
     """Concrete model for Participant users using MTI."""
 
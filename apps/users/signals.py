@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from knox.models import get_token_model
+
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .models import Analyst, Participant, SurveyManager
+
+
+@receiver(post_delete, sender=get_token_model())
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.digest])
+
+
+# Saving a role subclass only sends the signal of the subclass
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=SurveyManager)
+@receiver(post_save, sender=Analyst)
+@receiver(post_save, sender=Participant)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which the cached user may keep
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    invalidate_user_tokens(instance.pk)
@@ -0,0 +1,17 @@
+import logging
+
+from config.celery import app
+
+from .authentication import flush_refreshes
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(ignore_result=True)
+def flush_token_refreshes():
+    try:
+        flushed = flush_refreshes()
+        if flushed:
+            logger.info(f"Refreshed the expiry of {flushed} auth tokens")
+    except Exception as e:
+        logger.error(f"Error flushing auth token refreshes: {e}")
@@ -1,3 +1,98 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from knox.models import AuthToken
+
+from apps.core.benchmarks.environment import fake_redis
+from apps.core.redis_client import get_redis
+
+from . import authentication
+from .authentication import (
+    REFRESH_BUFFER_KEY,
+    CachedTokenAuthentication,
+    buffer_refresh,
+    flush_refreshes,
+    token_cache_key,
+)
+from .models import Participant, User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.enterContext(fake_redis())
+        self.addCleanup(authentication._local_tokens.clear)
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="participant", role=User.Role.PARTICIPANT
+        )
+        self.auth_token, self.token = AuthToken.objects.create(self.user)
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(self.token.encode())
+
+    def is_cached(self):
+        digest = self.auth_token.digest
+        return (
+            cache.get(token_cache_key(digest)) is not None
+            or digest in authentication._local_tokens
+        )
+
+    def test_known_tokens_are_served_from_the_cache(self):
+        self.authenticate()
+
+        with self.assertNumQueries(0):
+            user, auth_token = self.authenticate()
+
+        self.assertEqual((user, auth_token.digest), (self.user, self.auth_token.digest))
+
+    def test_saving_the_user_drops_its_cached_tokens(self):
+        self.authenticate()
+
+        self.user.first_name = "Changed"
+        self.user.save()
+
+        self.assertFalse(self.is_cached())
+        user, _ = self.authenticate()
+        self.assertEqual(user.first_name, "Changed")
+
+    def test_saving_a_role_subclass_drops_its_cached_tokens(self):
+        participant = Participant.objects.create(username="subclass")
+        self.auth_token, self.token = AuthToken.objects.create(participant)
+        self.authenticate()
+
+        participant.first_name = "Changed"
+        participant.save()
+
+        self.assertFalse(self.is_cached())
+
+    def test_logins_keep_the_cached_tokens(self):
+        self.authenticate()
+
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+
+        self.assertTrue(self.is_cached())
+
+    def test_deleting_the_token_drops_it_from_the_cache(self):
+        self.authenticate()
+
+        self.auth_token.delete()
+
+        self.assertFalse(self.is_cached())
+
+    def test_buffered_refreshes_are_written_by_the_flush(self):
+        expiry = timezone.now() + timedelta(days=3)
+        self.auth_token.expiry = expiry
+        buffer_refresh(self.auth_token)
+        self.auth_token.refresh_from_db()
+        self.assertNotEqual(self.auth_token.expiry, expiry)
+
+        self.assertEqual(flush_refreshes(batch_size=1), 1)
 
-# Create your tests here.
+        self.auth_token.refresh_from_db()
+        self.assertAlmostEqual(
+            self.auth_token.expiry, expiry, delta=timedelta(milliseconds=1)
+        )
+        self.assertFalse(get_redis().exists(REFRESH_BUFFER_KEY))
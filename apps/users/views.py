@@ -4,7 +4,7 @@ from drf_spectacular.utils import extend_schema
 from knox.views import LoginView as KnoxLoginView
 from rest_framework import permissions
 
-from apps.core.throttling import ActionBasedThrottle
+from apps.core.throttling import CompositeThrottle
 from apps.users.serializers import UserSerializer
 
 from .serializers import LoginSerializer
@@ -12,7 +12,8 @@ from .serializers import LoginSerializer
 
 class LoginAPI(KnoxLoginView):
     permission_classes = (permissions.AllowAny,)
-    throttle_classes = KnoxLoginView.throttle_classes + [ActionBasedThrottle]
+    # The default anon/user rates and the login rate, in one Redis call
+    throttle_classes = [CompositeThrottle]
     throttle_map = {
         "post": "5/minute",
     }
@@ -1,6 +1,20 @@
 import os
 
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_ready,
+)
+
+from apps.core.metrics import (
+    stamp_published,
+    start_task_timer,
+    start_worker_metrics_server,
+    stop_task_timer,
+)
+from apps.core.query_budget import check_task_queries, record_task_queries
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
@@ -16,6 +30,16 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Check the queries of each task against its `query_budget` option
+task_prerun.connect(record_task_queries)
+task_postrun.connect(check_task_queries)
+
+# Task runtime and queue wait metrics, served by the worker (see `metrics`)
+before_task_publish.connect(stamp_published)
+task_prerun.connect(start_task_timer)
+task_postrun.connect(stop_task_timer)
+worker_ready.connect(start_worker_metrics_server)
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
@@ -0,0 +1,8 @@
+"""Gunicorn settings, see `compose/production/django/start`."""
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of the exited worker from the shared metrics
+    multiprocess.mark_process_dead(worker.pid)
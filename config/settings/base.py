@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third party apps
     "rest_framework",
     "knox",
@@ -49,18 +50,18 @@ INSTALLED_APPS = [
     "apps.submissions.apps.SubmissionsConfig",
     "apps.communications.apps.CommunicationsConfig",
     "apps.reports.apps.ReportsConfig",
+    "apps.analytics.apps.AnalyticsConfig",
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "knox.auth.TokenAuthentication",
+        # Knox tokens, cached instead of looked up on every request
+        "apps.users.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-    ],
+    # Anon/user rates and per-view throttle_map scopes, checked in one Redis call
+    "DEFAULT_THROTTLE_CLASSES": ["apps.core.throttling.CompositeThrottle"],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day",
         "user": "1000/day",
@@ -89,6 +90,9 @@ SPECTACULAR_SETTINGS = {
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "apps.core.metrics.MetricsMiddleware",
+    "apps.core.timing.ServerTimingMiddleware",
+    "apps.core.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -97,6 +101,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "auditlog.middleware.AuditlogMiddleware",
+    "apps.core.middleware.AuditLogBufferMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -128,10 +133,11 @@ DATABASES = {
 
 # Caches
 # ------------------------------------------------------------------------------
+REDIS_URL = env("REDIS_URL", default="redis://redis:6379/1")
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": env("REDIS_URL", default="redis://redis:6379/1"),
+        "LOCATION": REDIS_URL,
     }
 }
 
@@ -183,14 +189,124 @@ STATIC_ROOT = str(BASE_DIR / "staticfiles")
 
 MEDIA_URL = "media/"
 MEDIA_ROOT = str(BASE_DIR / "media")
+
+# Protected file downloads (report exports)
+# "django" streams from the worker, "nginx" uses X-Accel-Redirect and
+# "apache" uses X-Sendfile so the proxy does the transfer.
+SENDFILE_BACKEND = env("DJANGO_SENDFILE_BACKEND", default="django")
+# Internal nginx location aliased to MEDIA_ROOT (used by the "nginx" backend)
+SENDFILE_URL_PREFIX = env("DJANGO_SENDFILE_URL_PREFIX", default="/protected-media/")
+
 DEFAULT_FROM_EMAIL = env(
     "DJANGO_DEFAULT_FROM_EMAIL", default="Dynamic Survey <noreply@example.com>"
 )
 SERVER_EMAIL = env("DJANGO_SERVER_EMAIL", default=DEFAULT_FROM_EMAIL)
 SITE_URL = env("DJANGO_SITE_URL", default="http://localhost:8000")
+# Invitations sent by one task over one reused SMTP connection, at most.
+# Chunks are made smaller when INVITATION_SEND_WORKERS chunks sharing
+# INVITATION_SEND_RATE couldn't send them within half of
+# CELERY_TASK_SOFT_TIME_LIMIT (results are saved as they are sent, so an
+# interrupted chunk resumes without sending twice)
+INVITATION_SEND_CHUNK_SIZE = env.int("INVITATION_SEND_CHUNK_SIZE", default=100)
+# Worker processes expected to send chunks at the same time
+INVITATION_SEND_WORKERS = env.int("INVITATION_SEND_WORKERS", default=8)
+# Render the invitation templates for every recipient instead of once per batch
+INVITATION_RENDER_PER_RECIPIENT = env.bool(
+    "INVITATION_RENDER_PER_RECIPIENT", default=False
+)
+# Addresses inserted per transaction when importing a recipient list
+INVITATION_INGEST_BATCH_SIZE = env.int("INVITATION_INGEST_BATCH_SIZE", default=5000)
+# "sync" sends a chunk over one SMTP connection, "async" over
+# INVITATION_SEND_CONCURRENCY concurrent sessions (SMTP settings only)
+INVITATION_SENDER = env("INVITATION_SENDER", default="sync")
+INVITATION_SEND_CONCURRENCY = env.int("INVITATION_SEND_CONCURRENCY", default=10)
+# Email provider cap in messages per second across all workers (0 disables)
+INVITATION_SEND_RATE = env.float("INVITATION_SEND_RATE", default=10)
+INVITATION_SEND_BURST = env.int("INVITATION_SEND_BURST", default=10)
+# Lifetime of the cached token -> survey lookup used on redemption
+INVITATION_TOKEN_CACHE_TTL = env.int("INVITATION_TOKEN_CACHE_TTL", default=60 * 60)
+# Seconds between writes of the buffered invitation clicks to the database
+INVITATION_CLICK_FLUSH_INTERVAL = env.int("INVITATION_CLICK_FLUSH_INTERVAL", default=10)
+# Reminders to invitees who haven't completed the survey: at most
+# INVITATION_MAX_REMINDERS, and no sooner than INVITATION_REMINDER_COOLDOWN
+# hours after the previous email
+INVITATION_MAX_REMINDERS = env.int("INVITATION_MAX_REMINDERS", default=2)
+INVITATION_REMINDER_COOLDOWN = env.int("INVITATION_REMINDER_COOLDOWN", default=72)
+# Seconds the progress of a batch may be served from cache while polling
+INVITATION_BATCH_STATUS_CACHE_TTL = env.int(
+    "INVITATION_BATCH_STATUS_CACHE_TTL", default=2
+)
+
+# Analytics
+# Width of the value ranges used for the histograms of number questions
+ANALYTICS_NUMBER_BUCKET_WIDTH = env.int("ANALYTICS_NUMBER_BUCKET_WIDTH", default=10)
+# Lifetime of cached analytics results (also invalidated by new completions)
+ANALYTICS_CACHE_TTL = env.int("ANALYTICS_CACHE_TTL", default=60 * 60)
+
+# Audit log
+# Save the audit log entries of a request from a Celery task instead of at
+# the end of the request
+AUDIT_LOG_ASYNC = env.bool("AUDIT_LOG_ASYNC", default=False)
+
+# Query budgets
+# Share of the requests and tasks (0 to 1) whose queries are checked. Those
+# running more queries than their view's or task's `query_budget`
+# (QUERY_BUDGET_DEFAULT if unset), or the same query QUERY_REPEAT_THRESHOLD
+# times from one line (a likely N+1, unless in an `allow_repeats` block),
+# raise with QUERY_BUDGET_RAISE (defaults to DEBUG) and are logged otherwise.
+# Checked requests pay for a stack walk per query.
+QUERY_BUDGET_SAMPLE_RATE = env.float("QUERY_BUDGET_SAMPLE_RATE", default=0.0)
+QUERY_BUDGET_RAISE = env.bool("QUERY_BUDGET_RAISE", default=None)
+QUERY_BUDGET_DEFAULT = env.int("QUERY_BUDGET_DEFAULT", default=None)
+QUERY_REPEAT_THRESHOLD = env.int("QUERY_REPEAT_THRESHOLD", default=10)
+
+# Server timing
+# Share of the requests (0 to 1) timed span by span (auth, throttle, schema,
+# validate, answer writes, db...) into a Server-Timing header and a JSON log
+# line of `apps.core.timing`. Sampled requests pay for a few timer calls.
+SERVER_TIMING_SAMPLE_RATE = env.float("SERVER_TIMING_SAMPLE_RATE", default=0.0)
+
+# Metrics
+# Prometheus metrics of the requests and tasks, served at /metrics behind
+# `Authorization: Bearer <METRICS_TOKEN>` (refused when unset, unless DEBUG)
+# and by each Celery worker on WORKER_METRICS_PORT, which must stay internal.
+# Processes sharing them (gunicorn, prefork Celery workers) need
+# PROMETHEUS_MULTIPROC_DIR set to an empty directory; gunicorn also needs
+# config/gunicorn.py to drop the files of exited workers.
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+METRICS_TOKEN = env("METRICS_TOKEN", default=None)
+WORKER_METRICS_PORT = env.int("WORKER_METRICS_PORT", default=None)
+
+# Retention
+# Per model: rows whose `field` is older than `days` (and that match `filter`)
+# are deleted, or passed to the `archiver` function. Applied nightly; a
+# policy with no days is off. Archiving submissions is off by default:
+# crosstab and numeric summary queries only count the answers left in the
+# database (stats rebuilds and report exports read the archives).
+RETENTION_POLICIES = {
+    "auditlog.LogEntry": {
+        "field": "timestamp",
+        "days": env.int("AUDIT_LOG_RETENTION_DAYS", default=365),
+    },
+    "submissions.Submission": {
+        "field": "completed_at",
+        "days": env.int("SUBMISSION_ARCHIVE_AFTER_DAYS", default=0),
+        "filter": {"status": "completed", "archive__isnull": True},
+        "archiver": "apps.submissions.archive.archive_submissions",
+    },
+}
+# Rows per transaction, and transactions per task run
+RETENTION_BATCH_SIZE = env.int("RETENTION_BATCH_SIZE", default=1000)
+RETENTION_MAX_BATCHES = env.int("RETENTION_MAX_BATCHES", default=20)
 
 # Auth settings
 AUTH_USER_MODEL = "users.User"
+# Seconds an authenticated Knox token (and its user) is served from the shared
+# cache, and from each process's memory, before it is looked up again
+KNOX_TOKEN_CACHE_TTL = env.int("KNOX_TOKEN_CACHE_TTL", default=60)
+KNOX_TOKEN_LOCAL_CACHE_TTL = env.int("KNOX_TOKEN_LOCAL_CACHE_TTL", default=5)
+# Seconds between writes of the buffered token expiry refreshes
+KNOX_REFRESH_FLUSH_INTERVAL = env.int("KNOX_REFRESH_FLUSH_INTERVAL", default=60)
 
 # Celery
 # ------------------------------------------------------------------------------
@@ -201,9 +317,30 @@ CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+# apps.core isn't an installed app, so its tasks aren't autodiscovered
+CELERY_IMPORTS = ["apps.core.tasks"]
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_time_limit
 CELERY_TASK_TIME_LIMIT = 5 * 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_soft_time_limit
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-always-eager
 CELERY_TASK_ALWAYS_EAGER = False
+# https://docs.celeryq.dev/en/stable/userguide/periodic-tasks.html
+CELERY_BEAT_SCHEDULE = {
+    "flush-invitation-clicks": {
+        "task": "apps.communications.tasks.flush_invitation_clicks",
+        "schedule": INVITATION_CLICK_FLUSH_INTERVAL,
+    },
+    "send-invitation-reminders": {
+        "task": "apps.communications.tasks.send_invitation_reminders",
+        "schedule": 60 * 60,
+    },
+    "flush-token-refreshes": {
+        "task": "apps.users.tasks.flush_token_refreshes",
+        "schedule": KNOX_REFRESH_FLUSH_INTERVAL,
+    },
+    "apply-retention-policies": {
+        "task": "apps.core.tasks.apply_retention_policies",
+        "schedule": 24 * 60 * 60,
+    },
+}
@@ -25,11 +25,14 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from apps.core.metrics import metrics_view
+
 app_name = "config"
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("i18n/", include("django.conf.urls.i18n")),
+    path("metrics", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/schema/swagger-ui/",
@@ -50,6 +53,7 @@ urlpatterns = [
         include("apps.communications.urls", namespace="communications"),
     ),
     path("api/reports/", include("apps.reports.urls", namespace="reports")),
+    path("api/analytics/", include("apps.analytics.urls", namespace="analytics")),
 ]
 
 urlpatterns += i18n_patterns(